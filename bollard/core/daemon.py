@@ -0,0 +1,128 @@
+import json
+import logging
+import os
+import socket
+import typing
+from typing import Any, Callable
+
+if typing.TYPE_CHECKING:
+    import click
+
+# set when current process is bollard daemon
+IN_DAEMON = False
+
+# seconds to wait for the daemon; the command is run in current process on timeout
+FORWARD_TIMEOUT = 30
+
+logger = logging.getLogger(__name__)
+
+
+def get_socket_path() -> str:
+    """Get path to the unix socket that bollard daemon listens on."""
+    if runtime_dir := os.getenv("XDG_RUNTIME_DIR"):
+        return os.path.join(runtime_dir, "bollard.sock")
+    return f"/tmp/bollard-{os.getuid()}.sock"
+
+
+def forwardable(predicate: Callable[[dict[str, Any]], bool] | None = None):
+    """Mark the command could be run by bollard daemon. The predicate receives
+    the parsed parameters and decides if this invocation could be forwarded,
+    e.g. the ones that need user interaction could not."""
+
+    def decorator(cmd: "click.Command") -> "click.Command":
+        cmd.forwardable = predicate or (lambda _: True)
+        return cmd
+
+    return decorator
+
+
+def is_forwardable(ctx: "click.Context", args: list[str]) -> bool:
+    """Check if the command of the arguments is marked as forwardable."""
+    import click
+
+    cmd = ctx.command
+    while isinstance(cmd, click.Group):
+        if not args:
+            return False
+        name, cmd, args = cmd.resolve_command(ctx, args)
+
+    if not (predicate := getattr(cmd, "forwardable", None)):
+        return False
+
+    sub_ctx = cmd.make_context(name, list(args), parent=ctx, resilient_parsing=True)
+    return bool(predicate(sub_ctx.params))
+
+
+def build_request(args: list[str], color: bool) -> dict[str, Any]:
+    from bollard.constants import pkg_version
+    from bollard.utils import api
+
+    return {
+        "args": args,
+        "color": color,
+        "endpoint": api.get_socket_path(),
+        "version": pkg_version,
+    }
+
+
+def forward(
+    ctx: "click.Context", args: list[str], options: list[str] = ()
+) -> int | None:
+    """Run the command in bollard daemon when it is running. Returns the exit code,
+    or None when the command should be run in current process.
+
+    The `args` starts from the subcommand name, and `options` are the ones for
+    the main command."""
+    import sys
+
+    import click
+
+    if IN_DAEMON or not is_forwardable(ctx, args):
+        return None
+
+    path = get_socket_path()
+    if not is_trusted_socket(path):
+        return None
+
+    request = build_request([*options, *args], sys.stdout.isatty())
+    try:
+        response = send(path, request)
+    except (OSError, ValueError) as e:
+        logger.debug("Bollard daemon unavailable: %s", e)
+        return None
+
+    if response.get("status") != "ok":
+        return None
+
+    click.echo(response["stdout"], nl=False)
+    click.echo(response["stderr"], nl=False, err=True)
+    return response["exit_code"]
+
+
+def send(
+    path: str, request: dict[str, Any], timeout: float | None = None
+) -> dict[str, Any]:
+    """Send the request to daemon and wait for the response. Raises
+    :py:exc:`TimeoutError` when the daemon does not respond in time."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.settimeout(timeout or FORWARD_TIMEOUT)
+        s.connect(path)
+        s.sendall(json.dumps(request).encode() + b"\n")
+        with s.makefile("rb") as fp:
+            return json.loads(fp.readline())
+
+
+def is_trusted_socket(path: str) -> bool:
+    """Check if the socket is created by current user. Socket in shared directory
+    (e.g. `/tmp`) could be created by others to receive the requests."""
+    import stat
+
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+
+    if not stat.S_ISSOCK(st.st_mode) or st.st_uid != os.getuid():
+        logger.debug("Bollard daemon socket is not trusted: %s", path)
+        return False
+    return True
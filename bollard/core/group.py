@@ -30,6 +30,10 @@ class BollardGroup(click.Group):
     ) -> tuple[str | None, click.Command | None, list[str]]:
         """Invokes wrapped function when implemented, and fallback to docker
         when no match."""
+        # keep the arguments for forwarding the command to bollard daemon
+        if ctx.parent is None:
+            ctx.meta.setdefault("BOLLARD_COMMAND_ARGS", list(args))
+
         cmd_name = click.utils.make_str(args[0])
 
         # return the command's name, in case it is alias
@@ -45,8 +45,12 @@ class BollardFormatter(logging.Formatter):
 
 
 def setup_logger(level: int) -> None:
+    logging.root.setLevel(level)
+
+    # could be called multiple times in one process, e.g. bollard daemon
+    if any(isinstance(h, BollardHandler) for h in logging.root.handlers):
+        return
+
     h = BollardHandler()
     h.setFormatter(BollardFormatter())
-
-    logging.root.setLevel(level)
     logging.root.addHandler(h)
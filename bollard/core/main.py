@@ -2,6 +2,7 @@ import logging
 
 import click
 
+from bollard.core.daemon import forward
 from bollard.core.group import BollardGroup
 from bollard.core.logging import setup_logger
 from bollard.utils import append_parameters, rebuild_args
@@ -85,9 +86,20 @@ def main(ctx: click.Context, **extra):
     setup_logger(log_level)
 
     # add docker's options to context
-    docker_global_options = rebuild_args(extra, DOCKER_OPTIONS)
-    if docker_global_options:
+    if docker_global_options := rebuild_args(extra, DOCKER_OPTIONS):
         ctx.meta["DOCKER_GLOBAL_OPTION"] = docker_global_options
 
+    # options that may change the docker endpoint; log level does not
+    endpoint_options = rebuild_args({**extra, "log_level": None}, DOCKER_OPTIONS)
+    if endpoint_options:
+        ctx.meta["DOCKER_ENDPOINT_OPTION"] = endpoint_options
+
+    # hand over to bollard daemon when it is running
+    # daemon is bound to one docker endpoint, so these options are not supported
+    elif args := ctx.meta.get("BOLLARD_COMMAND_ARGS"):
+        options = ["--log-level", log_level_raw] if log_level_raw else []
+        if (exit_code := forward(ctx, args, options)) is not None:
+            ctx.exit(exit_code)
+
 
 append_parameters(main, DOCKER_OPTIONS)
@@ -1,4 +1,6 @@
+import bollard.image.cleanup
 import bollard.image.ls
+import bollard.image.preview
 import bollard.image.rm
 from bollard.core import main as _main
 from bollard.image.base import group
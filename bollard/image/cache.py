@@ -0,0 +1,166 @@
+import hashlib
+import logging
+import os
+from typing import Any, Iterable
+
+FORMAT_VERSION = 3
+
+# metadata fields that never change for an image id
+# RepoTags and RepoDigests are excluded since they are changed on tag / untag
+_IMMUTABLE_FIELDS = (
+    "Architecture",
+    "Created",
+    "Os",
+    "Parent",
+    "Size",
+    "Variant",
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ImageCache:
+    """Persistent storage for the immutable part of image metadata, keyed by the
+    image id.
+
+    Records are stored as tuples in a pickle file, which is compact and fast to
+    load. Mutable fields (RepoTags and RepoDigests) are not stored and should be
+    provided by the caller.
+
+    It also keeps the image summaries of docker's default listing, along with the
+    checkpoint (in nanoseconds) that the listing is synced with the daemon. The
+    `live` flag is set when the listing is kept in sync by an events stream."""
+
+    def __init__(self, path: str | None = None) -> None:
+        self.path = path
+        self.listing: dict[str, dict[str, Any]] | None = None
+        self.checkpoint: int = 0
+        self.live = False
+        self._data: dict[str, tuple] = {}
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, image_id: str) -> bool:
+        return image_id in self._data
+
+    @classmethod
+    def load(cls, path: str) -> "ImageCache":
+        """Load cache from file. Returns an empty cache when the file does not
+        exist or is broken."""
+        import pickle
+
+        cache = cls(path)
+        try:
+            with open(path, "rb") as fd:
+                version, *content = pickle.load(fd)
+        except FileNotFoundError:
+            return cache
+        except Exception as e:
+            logger.debug("Failed to load image cache %s: %s", path, e)
+            return cache
+
+        if version == FORMAT_VERSION:
+            cache._data, cache.listing, cache.checkpoint = content
+        return cache
+
+    def save(self) -> None:
+        """Write the cache to file when it is modified."""
+        import pickle
+        import tempfile
+
+        if not self._dirty or not self.path:
+            return
+
+        dirname = os.path.dirname(self.path)
+        try:
+            os.makedirs(dirname, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=dirname, prefix=".images-")
+            with os.fdopen(fd, "wb") as fp:
+                content = (FORMAT_VERSION, self._data, self.listing, self.checkpoint)
+                pickle.dump(content, fp, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.debug("Failed to write image cache %s: %s", self.path, e)
+            return
+
+        self._dirty = False
+
+    def set_listing(
+        self, summaries: Iterable[dict[str, Any]] | None, checkpoint: int
+    ) -> None:
+        """Store the summaries of default listing."""
+        if summaries is not None:
+            summaries = {data["Id"]: data for data in summaries}
+        self.listing = summaries
+        self.checkpoint = checkpoint
+        self._dirty = True
+
+    def get(self, image_id: str, mutable: dict[str, Any]) -> dict[str, Any] | None:
+        """Get image metadata. The mutable fields are merged into the output."""
+        row = self._data.get(image_id)
+        if row is None:
+            return None
+
+        *values, layers, labels = row
+        data = dict(zip(_IMMUTABLE_FIELDS, values))
+        data["Id"] = image_id
+        data["RootFS"] = {"Type": "layers", "Layers": list(layers)}
+        data["Config"] = {"Labels": labels}
+        data["RepoTags"] = list(mutable.get("RepoTags") or ())
+        data["RepoDigests"] = list(mutable.get("RepoDigests") or ())
+        return data
+
+    def put(self, data: dict[str, Any]) -> None:
+        """Store the immutable part of the image metadata."""
+        layers = (data.get("RootFS") or {}).get("Layers") or ()
+        labels = (data.get("Config") or {}).get("Labels")
+        row = (
+            *(data.get(field) for field in _IMMUTABLE_FIELDS),
+            tuple(layers),
+            labels,
+        )
+        if self._data.get(data["Id"]) != row:
+            self._data[data["Id"]] = row
+            self._dirty = True
+
+    def resolve(self, prefix: str) -> str | None:
+        """Get the stored image id that starts with the prefix. Returns None when
+        no record or more than one records match."""
+        prefix = prefix.lower()
+        if not prefix.startswith("sha256:"):
+            prefix = f"sha256:{prefix}"
+        if prefix in self._data:
+            return prefix
+
+        matched = [id_ for id_ in self._data if id_.startswith(prefix)]
+        if len(matched) == 1:
+            return matched[0]
+        return None
+
+    def discard(self, image_id: str) -> None:
+        """Remove the image from both the records and the listing."""
+        if self._data.pop(image_id, None) is not None:
+            self._dirty = True
+        if self.listing and self.listing.pop(image_id, None) is not None:
+            self._dirty = True
+
+    def retain(self, image_ids: Iterable[str]) -> None:
+        """Drop the records that are not in the given ids."""
+        keep = set(image_ids)
+        for id_ in [id_ for id_ in self._data if id_ not in keep]:
+            self.discard(id_)
+
+
+def get_cache_dir() -> str:
+    """Get the directory for cache files, follows XDG base directory spec."""
+    base = os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "bollard")
+
+
+def get_cache_path(endpoint: str) -> str:
+    """Get path to the image cache file. Caches are separated by daemon
+    endpoints."""
+    namespace = hashlib.sha1(endpoint.encode()).hexdigest()[:16]
+    return os.path.join(get_cache_dir(), namespace, "images.pickle")
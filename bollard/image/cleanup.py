@@ -0,0 +1,304 @@
+import logging
+import sys
+import time
+import typing
+from typing import Any, NamedTuple, Sequence
+
+import click
+
+from bollard.core.daemon import forwardable
+from bollard.image.base import group
+
+if typing.TYPE_CHECKING:
+    from bollard.image.record import ImageRecord
+
+REPORT_COLUMNS = ["id", "repo_tag", "created", "size"]
+
+logger = logging.getLogger(__name__)
+
+
+class Duration(click.ParamType):
+    name = "duration"
+
+    def convert(
+        self, value: Any, param: click.Parameter | None, ctx: click.Context | None
+    ) -> int:
+        from bollard.utils import parse_duration
+
+        if isinstance(value, int):
+            return value
+        try:
+            return parse_duration(value)
+        except ValueError as e:
+            self.fail(str(e), param, ctx)
+
+
+class ByteSize(click.ParamType):
+    name = "size"
+
+    def convert(
+        self, value: Any, param: click.Parameter | None, ctx: click.Context | None
+    ) -> int:
+        from bollard.utils import parse_size
+
+        if isinstance(value, int):
+            return value
+        try:
+            return parse_size(value)
+        except ValueError as e:
+            self.fail(str(e), param, ctx)
+
+
+class CleanupPolicy(NamedTuple):
+    keep_latest: int | None = None
+    older_than: int | None = None
+    keep_used: bool = True
+    max_size: int | None = None
+
+
+# only the report could be forwarded; removal must run in user's process, for
+# the progress and cancellation
+@forwardable(lambda params: params["dry_run"])
+@group.command(name="cleanup")
+@click.argument("selector", nargs=-1)
+@click.option(
+    "--keep-latest",
+    type=click.IntRange(min=0),
+    metavar="N",
+    help="Keep the newest N images of each repository",
+)
+@click.option(
+    "--older-than",
+    type=Duration(),
+    help="Only remove images created before the duration, e.g. 12h, 7d or 2w",
+)
+@click.option(
+    "--keep-used/--include-used",
+    default=True,
+    show_default=True,
+    help="Keep the images that are used by containers",
+)
+@click.option(
+    "--max-size",
+    type=ByteSize(),
+    help="Remove the oldest images until total size is under the cap, e.g. 10GB",
+)
+@click.option("-n", "--dry-run", is_flag=True, help="Only show the report")
+@click.option("-y", "--yes", is_flag=True, help="Proceed deletion without confirm")
+@click.option("-f", "--force", is_flag=True, help="Force removal of the images")
+def cleanup_images(
+    selector: Sequence[str],
+    keep_latest: int | None,
+    older_than: int | None,
+    keep_used: bool,
+    max_size: int | None,
+    dry_run: bool,
+    yes: bool,
+    force: bool,
+):
+    """
+    Remove images by policies
+
+    The main arguments are selectors to narrow down the images to be cleaned up;
+    all the tagged and dangling images are considered when no selector is given.
+    Intermediate images are removed along with their children.
+
+    Images kept by `--keep-latest` or `--keep-used` are never removed. Without
+    `--older-than` and `--max-size`, all the other images are removed.
+
+    The plan is computed from one snapshot of image metadata, and a report is
+    shown before anything is deleted.
+    """
+    from gettext import gettext as t
+
+    from bollard.image.data import discard_images
+    from bollard.image.rm import (
+        execute_removal,
+        get_all_records,
+        plan_removal,
+        print_plan_notes,
+    )
+
+    policy = CleanupPolicy(keep_latest, older_than, keep_used, max_size)
+    options = {"force": force}
+
+    # take snapshot
+    records = get_all_records()
+    used = require_used_image_ids(dry_run) if keep_used else set()
+
+    # decide
+    candidates = get_candidates(list(records.values()), selector)
+    reasons = apply_policy(candidates, used, policy, int(time.time()))
+    if not reasons:
+        click.secho(t("No image to be removed"), fg="yellow", bold=True, err=True)
+        return
+
+    plan = plan_removal(list(reasons), options, records)
+
+    # report
+    print_report(reasons)
+    print_plan_notes(plan, show_estimate=dry_run or not yes)
+
+    if dry_run:
+        return
+
+    # confirm
+    if yes:
+        click.echo(t("Removing..."))
+    else:
+        click.confirm(t("Proceed"), abort=True)
+
+    # proceed
+    result = execute_removal(plan, options)
+    discard_images(result.removed)
+
+    click.echo(result.summary(), err=True)
+    if result.cancelled:
+        sys.exit(130)
+    if result.failed:
+        sys.exit(1)
+
+
+def require_used_image_ids(dry_run: bool) -> set[str]:
+    """Get ids of the images that are used by containers. Exits when the data is
+    not available, since the images in use could not be protected; only the
+    report is allowed in that case."""
+    from gettext import gettext as t
+
+    if (used := get_used_image_ids()) is not None:
+        return used
+
+    msg = t("Failed to list containers; images in use are not known")
+    if not dry_run:
+        logger.error(msg)
+        sys.exit(1)
+
+    logger.warning(msg)
+    return set()
+
+
+def get_used_image_ids() -> set[str] | None:
+    """Get ids of the images that are used by containers. Returns None when the
+    data is not available."""
+    from bollard.image.data import list_containers
+
+    if (containers := list_containers()) is None:
+        return None
+    return {data["ImageID"] for data in containers if data.get("ImageID")}
+
+
+def get_candidates(
+    records: list["ImageRecord"], selectors: Sequence[str]
+) -> list["ImageRecord"]:
+    """Get the images that could be cleaned up; which are the ones in docker's
+    default listing (i.e. not intermediate images) that match the selectors."""
+    from bollard.image.selector import compile_selectors
+
+    parents = {record.parent for record in records if record.parent}
+    candidates = [r for r in records if r.repo_tags or r.id not in parents]
+
+    if selectors:
+        matcher = compile_selectors(selectors)
+        candidates = [r for r in candidates if matcher.match(r)]
+
+    return candidates
+
+
+def apply_policy(
+    candidates: list["ImageRecord"],
+    used: set[str],
+    policy: CleanupPolicy,
+    now: int,
+) -> dict[str, str]:
+    """Apply the policy. Returns the ids of images to be removed, oldest first,
+    with the reasons."""
+    from gettext import gettext as t
+
+    protected = set(used) if policy.keep_used else set()
+    if policy.keep_latest is not None:
+        protected |= find_latest(candidates, policy.keep_latest)
+
+    # oldest first
+    eligible = [r for r in candidates if r.id not in protected]
+    eligible.sort(key=lambda r: r.created or 0)
+
+    output = {}
+    if policy.older_than is not None:
+        cutoff = now - policy.older_than
+        for record in eligible:
+            if record.created is not None and record.created < cutoff:
+                output[record.id] = t("older than cutoff")
+    elif policy.max_size is None:
+        output = {record.id: t("not kept") for record in eligible}
+
+    if policy.max_size is not None:
+        remains = [r for r in candidates if r.id not in output]
+        output.update(find_over_size(eligible, remains, policy.max_size))
+
+    return output
+
+
+def find_over_size(
+    eligible: list["ImageRecord"], remains: list["ImageRecord"], max_size: int
+) -> dict[str, str]:
+    """Find the oldest eligible images to remove until the total size of remaining
+    images is under the cap. Sizes are the ones reported by docker, layers shared
+    by images are counted repeatedly."""
+    from gettext import gettext as t
+
+    from bollard.utils import format_size
+
+    remain_ids = {r.id for r in remains}
+    total_size = sum(r.size or 0 for r in remains)
+    reason = t("over {}").format(format_size(max_size))
+
+    output = {}
+    for record in eligible:
+        if total_size <= max_size:
+            break
+        if record.id in remain_ids:
+            output[record.id] = reason
+            total_size -= record.size or 0
+    return output
+
+
+def find_latest(records: list["ImageRecord"], num: int) -> set[str]:
+    """Find the newest images in each repository."""
+    repositories: dict[str, list["ImageRecord"]] = {}
+    for record in records:
+        for repo in {tag.repository for tag in record.repo_tags}:
+            repositories.setdefault(repo, []).append(record)
+
+    output = set()
+    for images in repositories.values():
+        images.sort(key=lambda r: r.created or 0, reverse=True)
+        output.update(r.id for r in images[:num])
+    return output
+
+
+def print_report(reasons: dict[str, str]) -> None:
+    """Print the images to be removed with the reasons."""
+    from gettext import gettext as t
+    from gettext import ngettext
+
+    from bollard.image.data import collect_raw_fields, format_rows
+    from bollard.image.display import get_table_spec
+    from bollard.utils.table import render_table
+
+    click.secho(
+        ngettext(
+            "Would remove this image:", "Would remove these images:", len(reasons)
+        ),
+        fg="red",
+        bold=True,
+    )
+    click.echo()
+
+    raw_rows = collect_raw_fields(list(reasons), REPORT_COLUMNS)
+    rows = format_rows(REPORT_COLUMNS, raw_rows)
+    data = ({**row, "reason": reasons[raw["id"]]} for raw, row in zip(raw_rows, rows))
+
+    table_spec = {**get_table_spec(REPORT_COLUMNS), "reason": {"title": t("REASON")}}
+    for line in render_table(table_spec, data):
+        click.echo(line)
+    click.echo()
@@ -1,21 +1,255 @@
+import bisect
 import collections.abc
 import logging
 import re
-from typing import Any, Iterator, Sequence
+import typing
+from typing import Any, Iterable, Iterator, Sequence
 
 import click
 
 from bollard.utils import check_docker_output
 
+if typing.TYPE_CHECKING:
+    from bollard.image.cache import ImageCache
+    from bollard.image.index import ImageIndex
+    from bollard.image.layers import LayerIndex
+    from bollard.image.record import ImageRecord
+    from bollard.image.selector import CompiledSelector
+
 FULL_LENGTH = 64
 
+# max age of the persisted image listing; it is a safety net for the changes that
+# are missed by both the events and the dangling images check
+LISTING_TTL = 60 * 10**9
+
 logger = logging.getLogger(__name__)
 regex_sha = re.compile(r"(?:sha256:)?([0-9a-f]{2,64})", re.RegexFlag.IGNORECASE)
 
 __cache_image_data = None
+__cache_image_summary = None
+__cache_disk = None
+__cache_disk_usage = None
+__image_index = None
+
+# budget of the in-memory caches; unbounded by default since an invocation only
+# holds the images it touches, long-running process should set the limits
+__cache_limits = {"max_entries": None, "max_bytes": None}
+
+# number of images fetched at a time when the rows are produced lazily
+FETCH_CHUNK = 500
+
+SOURCE_SUMMARY = "summary"
+SOURCE_INSPECT = "inspect"
+
+# fields provided by each data source
+# summary is the data from image list endpoint; and inspect is the full metadata
+_SOURCE_FIELDS = {
+    SOURCE_SUMMARY: frozenset({"Created", "Id", "RepoDigests", "RepoTags", "Size"}),
+}
+
+# fields required by each column
+_COLUMN_FIELDS = {
+    "architecture": ("Architecture", "Variant"),
+    "created:iso": ("Created",),
+    "created": ("Created",),
+    "digest": ("RepoDigests",),
+    "id": ("Id",),
+    "name": ("RepoTags",),
+    "os": ("Os",),
+    "platform": ("Architecture", "Os", "Variant"),
+    "registry": ("RepoTags",),
+    "repo_tag": ("RepoTags",),
+    "repository": ("RepoTags",),
+    "shared_size": ("Id",),
+    "size": ("Size",),
+    "tag": ("RepoTags",),
+    "unique_size": ("Id",),
+}
+
+# fields used for matching selectors
+_SELECTOR_FIELDS = ("Id", "RepoDigests", "RepoTags")
 
 
 def list_image_ids(incl_interm_img: bool = False, filters: list[str] = ()) -> list[str]:
+    from bollard.utils import api
+
+    try:
+        image_ids = list_image_ids_api(incl_interm_img, filters)
+    except api.FilterError as e:
+        logger.error("%s", e)
+        return []
+    except (OSError, ValueError, api.APIError) as e:
+        # including malformed response
+        logger.debug("Engine API unavailable, fallback to docker cli: %s", e)
+        image_ids = list_image_ids_cli(incl_interm_img, filters)
+
+    # output id from docker could be duplicated
+    # builtin dict is ordered, use it to preserve the order
+    unique_id_collection = {}
+    for id_ in image_ids:
+        unique_id_collection[id_] = None
+    return list(unique_id_collection)
+
+
+def list_image_ids_api(incl_interm_img: bool, filters: Sequence[str]) -> list[str]:
+    """List image ids via `GET /images/json`, and cache the summaries."""
+    global __cache_image_summary
+    from bollard.image.record import ImageRecord
+    from bollard.utils import api
+
+    if __cache_image_summary is None:
+        __cache_image_summary = PrefixDict(**__cache_limits)
+
+    if not incl_interm_img and not filters:
+        summaries = list_default_summaries()
+    else:
+        query = {"all": incl_interm_img}
+        if filters:
+            query["filters"] = api.build_filters(filters)
+        summaries = map(norm_summary, api.get_json("/images/json", query))
+
+    summaries = list(summaries)
+    output = [data["Id"] for data in summaries]
+
+    # daemon only returns the matched tags when `reference` filter is used,
+    # the summaries would be incomplete in that case
+    if not any(map(is_reference_filter, filters)):
+        records = [ImageRecord.from_dict(data) for data in summaries]
+        __cache_image_summary.update((record.id, record) for record in records)
+        index_records(records)
+        for record in records:
+            sync_mutable_fields(record)
+
+    # drop removed images from persistent cache when we get the complete list
+    if incl_interm_img and not filters:
+        disk_cache = get_disk_cache()
+        disk_cache.retain(output)
+        disk_cache.save()
+
+    return output
+
+
+def is_reference_filter(f: str) -> bool:
+    return f.partition("=")[0].strip().lower() == "reference"
+
+
+def can_push_down_filters(incl_interm_img: bool, filters: Sequence[str]) -> bool:
+    """Check if it is worth narrowing down the listing with selector-derived
+    `reference` filters. They could not be combined with user's reference filter
+    (daemon takes the union of them), and are not needed when the persisted
+    listing is fresh."""
+    import time
+
+    if any(map(is_reference_filter, filters)):
+        return False
+    if incl_interm_img or filters:
+        return True
+
+    disk_cache = get_disk_cache()
+    return (
+        disk_cache.listing is None
+        or time.time_ns() - disk_cache.checkpoint >= LISTING_TTL
+    )
+
+
+def sync_mutable_fields(summary: "ImageRecord") -> None:
+    """Update the tags of cached inspect data with the latest summary."""
+    if __cache_image_data and (record := __cache_image_data.get(summary.id)):
+        record.repo_tags = summary.repo_tags
+        record.repo_digests = summary.repo_digests
+
+
+def list_default_summaries() -> list[dict[str, Any]]:
+    """Get image summaries of docker's default listing. Reuse the persisted
+    listing and patch it with the daemon events when possible."""
+    import time
+
+    from bollard.utils import api
+
+    disk_cache = get_disk_cache()
+    now = time.time_ns()
+
+    listing = disk_cache.listing
+    is_fresh = listing is not None and now - disk_cache.checkpoint < LISTING_TTL
+    if is_fresh and patch_listing(disk_cache, now):
+        disk_cache.save()
+        return list(disk_cache.listing.values())
+
+    summaries = [norm_summary(d) for d in api.get_json("/images/json", {"all": False})]
+    disk_cache.set_listing(summaries, now)
+    disk_cache.save()
+    return summaries
+
+
+def patch_listing(disk_cache: "ImageCache", now: int) -> bool:
+    """Patch the persisted listing with the events and the dangling images.
+    Returns False when a full listing is required."""
+    from bollard.image import events
+    from bollard.utils import api
+
+    listing = disk_cache.listing
+    try:
+        is_patched = disk_cache.live or events.apply_events(
+            listing, events.fetch_events(disk_cache.checkpoint, now)
+        )
+        is_changed = is_patched and sync_dangling_summaries(listing)
+    except (OSError, ValueError, api.APIError) as e:
+        logger.debug("Failed to sync image listing: %s", e)
+        return False
+
+    if not is_patched:
+        return False
+
+    # the checkpoint is moved by the events stream in daemon
+    if not disk_cache.live:
+        disk_cache.set_listing(listing.values(), now)
+    elif is_changed:
+        disk_cache.set_listing(listing.values(), disk_cache.checkpoint)
+    return True
+
+
+def sync_dangling_summaries(listing: dict[str, dict[str, Any]]) -> bool:
+    """Patch the dangling images in the listing. Untagged build results come
+    without any image event, but the dangling images are cheap to list. Returns
+    True when the listing is changed."""
+    from bollard.utils import api
+
+    query = {"all": False, "filters": {"dangling": ["true"]}}
+    dangling = {d["Id"]: d for d in api.get_json("/images/json", query)}
+
+    removed = [
+        id_
+        for id_, data in listing.items()
+        if not data["RepoTags"] and id_ not in dangling
+    ]
+    added = [data for id_, data in dangling.items() if id_ not in listing]
+
+    for id_ in removed:
+        del listing[id_]
+    for data in added:
+        listing[data["Id"]] = norm_summary(data)
+    return bool(removed or added)
+
+
+def norm_summary(data: dict[str, Any]) -> dict[str, Any]:
+    """Normalize the image summary from the list endpoint, or the inspect data,
+    into the same form."""
+    from bollard.utils import parse_timestamp
+
+    return {
+        "Id": data["Id"],
+        "Created": parse_timestamp(data["Created"]),
+        "ParentId": data.get("ParentId") or data.get("Parent") or "",
+        "RepoDigests": [
+            d for d in data.get("RepoDigests") or () if d != "<none>@<none>"
+        ],
+        "RepoTags": [t for t in data.get("RepoTags") or () if t != "<none>:<none>"],
+        "Size": data["Size"],
+    }
+
+
+def list_image_ids_cli(incl_interm_img: bool, filters: Sequence[str]) -> list[str]:
+    """List image ids via `docker images` command."""
     args = ["images", "--quiet", "--no-trunc"]
     if incl_interm_img:
         args += ["--all"]
@@ -23,47 +257,86 @@ def list_image_ids(incl_interm_img: bool = False, filters: list[str] = ()) -> li
         args += ["--filter", f]
     data_bytes = check_docker_output(args, use_context=False)
     data_str = data_bytes.rstrip().decode()
+    return data_str.splitlines()
 
-    # output id from docker could be duplicated
-    # builtin dict is ordered, use it to preserve the order
-    unique_id_collection = {}
-    for id_ in data_str.splitlines():
-        unique_id_collection[id_] = None
-    return list(unique_id_collection)
 
+def plan_sources(columns: Sequence[str], selectors: Sequence[str] = ()) -> list[str]:
+    """Decide the minimal data sources to fetch for the columns and selectors."""
+    fields = set()
+    for col in columns:
+        fields.update(_COLUMN_FIELDS[col])
+    if selectors:
+        fields.update(_SELECTOR_FIELDS)
+
+    for source, provided in _SOURCE_FIELDS.items():
+        if fields <= provided:
+            return [source]
+    return [SOURCE_INSPECT]
 
-def inspect_image(image_ids: list[str]) -> list[dict[str, Any]]:
-    """Wrap `docker inspect` command and cache the result."""
+
+def get_image_data(
+    image_ids: Sequence[str], sources: Sequence[str] = (SOURCE_INSPECT,)
+) -> list["ImageRecord"]:
+    """Get image metadata from the given sources, in the order of the requested
+    ids. It fallbacks to inspect when the data is not available in the source."""
+    output: list["ImageRecord | None"] = [None] * len(image_ids)
+
+    query_ids = []
+    for i, id_ in enumerate(image_ids):
+        if SOURCE_SUMMARY in sources and __cache_image_summary:
+            output[i] = __cache_image_summary.get(id_)
+        if not output[i]:
+            query_ids.append(id_)
+
+    if query_ids:
+        inspected = PrefixDict()
+        inspected.update((record.id, record) for record in inspect_image(query_ids))
+        for i, id_ in enumerate(image_ids):
+            if not output[i]:
+                output[i] = inspected.get(id_)
+
+    return [data for data in output if data]
+
+
+def inspect_image(image_ids: list[str]) -> list["ImageRecord"]:
+    """Query image data through engine API, or `docker inspect` command as a
+    fallback, and cache the result."""
     global __cache_image_data
-    import json
+    from bollard.image.record import ImageRecord
 
     if __cache_image_data is None:
-        __cache_image_data = PrefixDict()
+        __cache_image_data = PrefixDict(**__cache_limits)
 
     output = []
 
     # use cache
     query_ids = []
     for id_ in image_ids:
-        if data := __cache_image_data.get(id_):
-            output.append(data)
+        if record := __cache_image_data.get(id_):
+            output.append(record)
+        elif record := get_persisted_image(id_):
+            __cache_image_data[record.id] = record
+            index_records([record])
+            output.append(record)
         else:
             query_ids.append(id_)
 
     # query
     if query_ids:
-        data_bytes = check_docker_output(
-            ["inspect", "--type", "image", *query_ids], use_context=False
-        )
-        for data in json.loads(data_bytes):
-            id_ = data["Id"]
-            __cache_image_data[id_] = data
-            output.append(data)
+        disk_cache = get_disk_cache()
+        queried = []
+        for data in query_image_data(query_ids):
+            disk_cache.put(data)
+            queried.append(ImageRecord.from_dict(data))
+        disk_cache.save()
+        __cache_image_data.update((record.id, record) for record in queried)
+        index_records(queried)
+        output += queried
 
     # check all requested data are fetched
     # the request id could be prefix only so we should comparing through the count
     request_ids = set(image_ids)
-    output_ids = {d["Id"] for d in output}
+    output_ids = {record.id for record in output}
     if len(request_ids) != len(output_ids):
         missing_ids = request_ids - output_ids
         for id_ in missing_ids:
@@ -72,177 +345,567 @@ def inspect_image(image_ids: list[str]) -> list[dict[str, Any]]:
     return output
 
 
-class PrefixDict(collections.abc.MutableMapping[str, Any]):
-    """A dict object that matches the prefix on key."""
+def get_image_index() -> "ImageIndex":
+    """Get the index of the images that are loaded in this process. It is built
+    from the loaded records on first use, and kept in sync afterward."""
+    global __image_index
+    from bollard.image.index import ImageIndex
 
-    def __init__(self):
-        self._data: dict[str, Any] = {}
-        self._alias: dict[str, str] = {}
+    if __image_index is None:
+        __image_index = ImageIndex()
+        for cache in (__cache_image_summary, __cache_image_data):
+            index_records(list((cache or {}).values()))
+    return __image_index
 
-    def __iter__(self) -> Iterator[str]:
-        return iter(self._data)
 
-    def __len__(self) -> int:
-        return len(self._data)
+def index_records(records: Sequence["ImageRecord"]) -> None:
+    """Add the records to the index. It is a no-op before the index is built."""
+    if __image_index is not None:
+        for record in records:
+            __image_index.add(record)
 
-    def __getitem__(self, __key: str) -> Any:
-        m = regex_sha.fullmatch(__key)
-        if not m:
-            raise KeyError(__key)
 
-        # direct query
-        sha = m.group(1).lower()
-        if len(sha) == FULL_LENGTH:
-            return self._data[sha]
+def discard_index(image_id: str) -> None:
+    if __image_index is not None:
+        __image_index.discard(image_id)
 
-        if orig_key := self._alias.get(sha):
-            return self._data[orig_key]
 
-        # match
-        for full_sha, data in self._data.items():
-            if full_sha.startswith(sha):
-                self._alias[sha] = full_sha
-                return data
+def is_index_worthwhile(selector: "CompiledSelector") -> bool:
+    """Building the index costs about the same as scanning the images once, it
+    pays off only when it is reused, i.e. in daemon or for several selectors."""
+    from bollard.core.daemon import IN_DAEMON
 
-        raise KeyError(__key)
+    return IN_DAEMON or __image_index is not None or len(selector.selectors) > 1
+
+
+def match_images(
+    image_ids: Sequence[str],
+    selector: "CompiledSelector",
+    sources: Sequence[str] = (SOURCE_INSPECT,),
+) -> list[str]:
+    """Get the ids of the images that matches the selector, in the order of the
+    given ids. Candidates are narrowed down through the index when it is worth,
+    and the images that are not indexed are always checked."""
+    if is_index_worthwhile(selector):
+        index = get_image_index()
+        if (candidates := selector.candidates(index)) is not None:
+            image_ids = [
+                id_ for id_ in image_ids if id_ in candidates or id_ not in index
+            ]
+
+    return [
+        record.id
+        for record in get_image_data(image_ids, sources)
+        if selector.match(record)
+    ]
+
+
+def get_disk_cache() -> "ImageCache":
+    """Get the persistent image cache for current daemon endpoint."""
+    global __cache_disk
+    from bollard.image.cache import ImageCache, get_cache_path
+    from bollard.utils import api
+
+    if __cache_disk is None:
+        if endpoint := api.get_socket_path():
+            __cache_disk = ImageCache.load(get_cache_path(endpoint))
+        else:
+            __cache_disk = ImageCache()
+
+    return __cache_disk
+
+
+def get_persisted_image(image_id: str) -> "ImageRecord | None":
+    """Get image metadata from persistent cache. Only available when the mutable
+    fields could be provided by the summary."""
+    from bollard.image.record import ImageRecord
+
+    if not __cache_image_summary:
+        return None
+    if not (summary := __cache_image_summary.get(image_id)):
+        return None
+    if not (data := get_disk_cache().get(summary.id, {})):
+        return None
+
+    record = ImageRecord.from_dict(data)
+    record.repo_tags = summary.repo_tags
+    record.repo_digests = summary.repo_digests
+    return record
+
+
+def get_cached_image(image_id: str) -> "ImageRecord | None":
+    """Get image metadata by id or prefix, from in-memory or persistent cache.
+    It queries the daemon only when the image is not cached."""
+    from bollard.image.record import ImageRecord
+
+    try:
+        if __cache_image_data:
+            return __cache_image_data[image_id]
+    except AmbiguousPrefixError:
+        return None
+    except KeyError:
+        pass
+
+    disk_cache = get_disk_cache()
+    if full_id := disk_cache.resolve(image_id):
+        mutable = (disk_cache.listing or {}).get(full_id, {})
+        return ImageRecord.from_dict(disk_cache.get(full_id, mutable))
+
+    records = inspect_image([image_id])
+    return records[0] if len(records) == 1 else None
+
+
+def discard_images(image_ids: Sequence[str], save: bool = True) -> None:
+    """Remove the images from both in-memory and persistent cache. Set `save` to
+    False to defer writing the persistent cache to the caller."""
+    disk_cache = get_disk_cache()
+    for id_ in image_ids:
+        for cache in (__cache_image_summary, __cache_image_data):
+            if cache and (record := cache.pop(id_, None)):
+                disk_cache.discard(record.id)
+                discard_index(record.id)
+        disk_cache.discard(id_)
+        discard_index(id_)
+    if save:
+        disk_cache.save()
+    reset_disk_usage()
+
+
+def set_cache_limits(max_entries: int | None, max_bytes: int | None) -> None:
+    """Set the budget for in-memory caches. Existing caches are dropped and
+    would be rebuilt within the budget."""
+    global __cache_image_data, __cache_image_summary
+    __cache_limits.update(max_entries=max_entries, max_bytes=max_bytes)
+    __cache_image_data = None
+    __cache_image_summary = None
+
+
+def get_cache_stats() -> dict[str, dict[str, int]]:
+    """Get usage counters of in-memory caches."""
+    output = {}
+    for name, cache in (
+        (SOURCE_SUMMARY, __cache_image_summary),
+        (SOURCE_INSPECT, __cache_image_data),
+    ):
+        if cache is not None:
+            output[name] = cache.stats
+    return output
+
+
+def query_disk_usage() -> dict[str, tuple[int, int]]:
+    """Get size and shared size of all images via `GET /system/df`. Returns empty
+    dict when the data is not available.
+
+    It is one of the slowest endpoints, so the result is kept until the images
+    are changed or `reset_disk_usage` is called."""
+    global __cache_disk_usage
+    if __cache_disk_usage is None:
+        __cache_disk_usage = query_disk_usage_api()
+    return __cache_disk_usage
+
+
+def reset_disk_usage() -> None:
+    global __cache_disk_usage
+    __cache_disk_usage = None
+
+
+def query_disk_usage_api() -> dict[str, tuple[int, int]]:
+    from bollard.utils import api
+
+    try:
+        rv = api.request("GET", "/system/df", {"type": "image"})
+        rv.raise_for_status()
+        images = rv.json().get("Images") or ()
+    except (OSError, ValueError, api.APIError) as e:
+        logger.debug("Failed to get disk usage: %s", e)
+        return {}
+
+    output = {}
+    for data in images:
+        # shared size is -1 when it is not calculated
+        if (shared_size := data.get("SharedSize", -1)) >= 0:
+            output[data["Id"]] = data["Size"], shared_size
+    return output
+
+
+def build_layer_index() -> "LayerIndex":
+    """Build the layer index of all the images for estimating disk usage. Only
+    the images that share layers with others are inspected; the rest are added
+    as a single block."""
+    from bollard.image.layers import LayerIndex
+
+    usage = query_disk_usage()
+
+    index = LayerIndex()
+    shared_ids = []
+    for id_, (size, shared_size) in usage.items():
+        if shared_size > 0:
+            shared_ids.append(id_)
+        else:
+            index.add(id_, [id_], size, shared_size)
+
+    for record in get_image_data(shared_ids, [SOURCE_INSPECT]):
+        size, shared_size = usage[record.id]
+        index.add(record.id, record.layers, size, shared_size)
+    return index
 
-    def __setitem__(self, __key: str, __value: Any) -> None:
-        m = regex_sha.fullmatch(__key)
-        if not m:
-            raise KeyError(__key)
 
-        sha = m.group(1).lower()
-        if len(sha) != FULL_LENGTH:
-            raise NotImplementedError
+def list_containers() -> list[dict[str, Any]] | None:
+    """List all containers via `GET /containers/json`. Returns None when the data
+    is not available."""
+    from bollard.utils import api
 
-        self._data[sha] = __value
+    try:
+        return api.get_json("/containers/json", {"all": True})
+    except (OSError, api.APIError) as e:
+        logger.debug("Failed to list containers: %s", e)
+        return None
+
+
+def query_image_data(image_ids: Sequence[str]) -> list[dict[str, Any]]:
+    """Get image metadata from docker. Images that does not exist are omitted."""
+    import json
+
+    from bollard.utils import api
+
+    try:
+        return list(inspect_image_api(image_ids))
+    except (OSError, api.APIError) as e:
+        logger.debug("Engine API unavailable, fallback to docker cli: %s", e)
+
+    data_bytes = check_docker_output(
+        ["inspect", "--type", "image", *image_ids], use_context=False
+    )
+    return json.loads(data_bytes)
+
+
+def inspect_image_api(image_ids: Sequence[str]) -> Iterator[dict[str, Any]]:
+    """Inspect images via `GET /images/{id}/json`."""
+    from bollard.utils import api
+
+    requests = [api.Request("GET", f"/images/{id_}/json") for id_ in image_ids]
+    for rv in api.pipeline(requests):
+        if rv.status == 404:
+            continue
+        rv.raise_for_status()
+        yield rv.json()
+
+
+class AmbiguousPrefixError(KeyError):
+    """The key prefix matches more than one stored key. It is a `KeyError`, so
+    `get`, `pop` and `in` treat it as a missing key."""
+
+    def __init__(self, prefix: str) -> None:
+        super().__init__(prefix)
+        self.prefix = prefix
+
+    def __str__(self) -> str:
+        return f"multiple IDs found with provided prefix: {self.prefix}"
+
+
+class PrefixDict(collections.abc.MutableMapping[str, Any]):
+    """A dict object that matches the prefix on key.
+
+    Keys are kept in a sorted list, so a prefix is resolved by binary search.
+    Looking up a prefix that matches multiple keys raises
+    :py:exc:`AmbiguousPrefixError`; `get`, `pop` and `in` treat it as missing.
+
+    When `max_entries` or `max_bytes` is given, the least recently used items
+    are evicted once the budget is exceeded. Memory usage is an estimation of
+    the stored values."""
+
+    def __init__(self, max_entries: int | None = None, max_bytes: int | None = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: collections.OrderedDict[str, Any] = collections.OrderedDict()
+        self._keys: list[str] = []
+        self._sizes: dict[str, int] = {}
+        self._total_size = 0
+
+    def __iter__(self) -> Iterator[str]:
+        # take a snapshot since reading an item changes the order
+        return iter(list(self._data))
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __getitem__(self, __key: str) -> Any:
+        try:
+            sha = self._resolve(__key)
+        except KeyError:
+            self.misses += 1
+            raise
+
+        self.hits += 1
+        self._data.move_to_end(sha)
+        return self._data[sha]
+
+    def __setitem__(self, __key: str, __value: Any) -> None:
+        sha = self._norm_key(__key)
+        if sha not in self._data:
+            bisect.insort(self._keys, sha)
+        self._store(sha, __value)
+        self._evict()
 
     def __delitem__(self, __key: str) -> None:
-        raise NotImplementedError
+        sha = self._resolve(__key)
+        del self._data[sha]
+        del self._keys[bisect.bisect_left(self._keys, sha)]
+        self._total_size -= self._sizes.pop(sha, 0)
+
+    def update(self, other=(), /, **kwds) -> None:
+        """Bulk load the items. The key list is sorted once after insertion."""
+        import itertools
+
+        items = other.items() if isinstance(other, collections.abc.Mapping) else other
+
+        new_keys = []
+        for key, value in itertools.chain(items, kwds.items()):
+            sha = self._norm_key(key)
+            if sha not in self._data:
+                new_keys.append(sha)
+            self._store(sha, value)
+
+        if new_keys:
+            self._keys += new_keys
+            self._keys.sort()
+
+        self._evict()
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._keys.clear()
+        self._sizes.clear()
+        self._total_size = 0
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """Usage counters of this cache."""
+        return {
+            "entries": len(self._data),
+            "bytes": self._total_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _norm_key(self, key: str) -> str:
+        m = regex_sha.fullmatch(key)
+        if not m:
+            raise KeyError(key)
+        return m.group(1).lower()
+
+    def _resolve(self, key: str) -> str:
+        """Get the stored key that matches the given key or prefix."""
+        sha = self._norm_key(key)
+        if sha in self._data:
+            return sha
+
+        i = bisect.bisect_left(self._keys, sha)
+        if i == len(self._keys) or not self._keys[i].startswith(sha):
+            raise KeyError(key)
+        if i + 1 < len(self._keys) and self._keys[i + 1].startswith(sha):
+            raise AmbiguousPrefixError(key)
+
+        return self._keys[i]
+
+    def _store(self, sha: str, value: Any) -> None:
+        self._data[sha] = value
+        self._data.move_to_end(sha)
+        if self.max_bytes is not None:
+            size = estimate_size(value)
+            self._total_size += size - self._sizes.get(sha, 0)
+            self._sizes[sha] = size
+
+    def _evict(self) -> None:
+        def is_over_budget():
+            if self.max_entries is not None and len(self._data) > self.max_entries:
+                return True
+            if self.max_bytes is not None and self._total_size > self.max_bytes:
+                return True
+            return False
+
+        while self._data and is_over_budget():
+            sha = next(iter(self._data))
+            del self[sha]
+            self.evictions += 1
+
+
+def estimate_size(obj: Any) -> int:
+    """Estimate memory usage of the JSON-like object or slotted record, in
+    bytes."""
+    import sys
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += estimate_size(key) + estimate_size(value)
+    elif isinstance(obj, (list, tuple)):
+        for value in obj:
+            size += estimate_size(value)
+    elif slots := getattr(type(obj), "__slots__", None):
+        for name in slots:
+            size += estimate_size(getattr(obj, name))
+    return size
 
 
 def collect_fields(
     image_ids: Sequence[str], columns: Sequence[str], formats: dict[str, Any] = None
 ) -> list[dict[str, str]]:
     """Collect image data into dicts."""
-    # query once for caching the data in memory
-    inspect_image(image_ids)
+    rows = collect_raw_fields(image_ids, columns)
+    return list(format_rows(columns, rows, formats))
 
-    # collect field data
-    collected = []
-    for id_ in image_ids:
-        data = {}
-        for col in columns:
-            data[col] = list(get_field_data(id_, col, formats))
-        collected.append(data)
+
+def collect_raw_fields(
+    image_ids: Sequence[str], columns: Sequence[str]
+) -> list[dict[str, Any]]:
+    """Collect image data into dicts of raw values, e.g. size in bytes and created
+    time in epoch seconds. Use `format_rows` to turn them into display texts."""
+    # query once from the minimal data sources
+    records = get_image_data(image_ids, plan_sources(columns))
+
+    # extract column by column
+    values = [extract_column(records, col) for col in columns]
 
     # explode nested list into multiple rows
     output = []
-    for data in collected:
-        output.extend(explode_rows(data))
+    for cells in zip(*values):
+        output.extend(explode_rows(dict(zip(columns, cells))))
     return output
 
 
-def explode_rows(source: dict[str, list[Any]]) -> list[dict]:
-    """Explodes single object into rows if there are multiple values inside"""
-    import itertools
-
-    # categorize
-    col_unique = {}
-    col_zipped = {}
-    for c, v in source.items():
-        if not v:
-            col_unique[c] = None
-        elif len(v) == 1:
-            (col_unique[c],) = v
-        else:
-            col_zipped[c] = v
+def iter_raw_fields(
+    image_ids: Sequence[str], columns: Sequence[str], chunk_size: int = FETCH_CHUNK
+) -> Iterator[dict[str, Any]]:
+    """Same as `collect_raw_fields`, but the images are fetched in chunks and the
+    rows are yielded once their chunk is ready."""
+    for i in range(0, len(image_ids), chunk_size):
+        yield from collect_raw_fields(image_ids[i : i + chunk_size], columns)
+
 
-    # early return
-    if not col_zipped:
-        yield col_unique
+def format_rows(
+    columns: Sequence[str],
+    rows: Iterable[dict[str, Any]],
+    formats: dict[str, Any] | None = None,
+) -> Iterator[dict[str, str]]:
+    """Format the raw values into display texts. Rows are formatted lazily."""
+    formatters = {col: get_formatter(col, formats) for col in columns}
+    for row in rows:
+        yield {
+            col: None if (value := row[col]) is None else formatters[col](value)
+            for col in columns
+        }
+
+
+def explode_rows(source: dict[str, list[Any]]) -> Iterator[dict]:
+    """Explodes single object into rows if there are multiple values inside"""
+    num_rows = max(map(len, source.values()), default=0)
+    if num_rows <= 1:
+        yield {c: v[0] if v else None for c, v in source.items()}
         return
 
-    # explode
-    for fv in itertools.zip_longest(*col_zipped.values()):
-        row = col_unique.copy()
-        for c, v in zip(col_zipped, fv):
-            row[c] = v
-        yield row
-
-
-def get_field_data(
-    image_id: str, column: str, formats: dict[str, Any] | None = None
-) -> Iterator[str]:
-    from bollard.utils import (
-        format_iso_time,
-        format_relative_time,
-        format_size,
-        split_repo_tag,
-    )
+    # columns with single value are repeated; the shorter ones are filled with None
+    for i in range(num_rows):
+        yield {
+            c: v[0] if len(v) == 1 else v[i] if i < len(v) else None
+            for c, v in source.items()
+        }
 
-    (data,) = inspect_image([image_id])
-    formats = formats or {}  # formats could be `None`
+
+def extract_column(records: Sequence["ImageRecord"], column: str) -> list[list[Any]]:
+    """Extract raw values of one column from all the records. Returns a list of
+    values for each record, since some fields could have multiple values."""
     match column:
         case "architecture":
-            yield get_architecture(data, formats)
-        case "created:iso":
-            yield format_iso_time(data["Created"])
-        case "created":
-            yield format_relative_time(data["Created"])
+            return [[(r.architecture or "", r.variant or "")] for r in records]
+        case "created" | "created:iso":
+            return [[r.created] for r in records]
         case "digest":
-            for d in data["RepoDigests"]:
-                _, digest = d.split("@", maxsplit=1)
-                yield format_digest(digest, formats)
+            return [[d.partition("@")[2] for d in r.repo_digests] for r in records]
         case "id":
-            yield format_digest(data["Id"], formats)
+            return [[r.id] for r in records]
         case "name":
-            for s in data["RepoTags"]:
-                _, name, _ = split_repo_tag(s)
-                yield name
+            return [[rt.name for rt in r.repo_tags] for r in records]
         case "os":
-            yield data["Os"]
+            return [[r.os] for r in records]
         case "platform":
-            (arch,) = get_field_data(image_id, "architecture", formats)
-            (os,) = get_field_data(image_id, "os", formats)
-            yield f"{os}/{arch}"
+            return [
+                [(r.os or "", r.architecture or "", r.variant or "")] for r in records
+            ]
         case "registry":
-            for s in data["RepoTags"]:
-                registry, _, _ = split_repo_tag(s)
-                yield registry
+            return [[rt.registry for rt in r.repo_tags] for r in records]
         case "repo_tag":
-            for repo, tag in zip(
-                get_field_data(image_id, "repository", formats),
-                get_field_data(image_id, "tag", formats),
-            ):
-                yield f"{repo}:{tag}"
+            return [[str(rt) for rt in r.repo_tags] for r in records]
         case "repository":
-            for s in data["RepoTags"]:
-                registry, name, _ = split_repo_tag(s)
-                if registry:
-                    yield f"{registry}/{name}"
-                else:
-                    yield name
+            return [[rt.repository for rt in r.repo_tags] for r in records]
+        case "shared_size" | "unique_size":
+            usage = query_disk_usage()
+            return [[get_usage_size(usage.get(r.id), column)] for r in records]
         case "size":
-            yield format_size(data["Size"])
+            return [[r.size] for r in records]
         case "tag":
-            for s in data["RepoTags"]:
-                _, _, tag = split_repo_tag(s)
-                yield tag
+            return [[rt.tag for rt in r.repo_tags] for r in records]
         case _:
             logger.critical("Internal error - Unmapped column %s", column)
+            return [[] for _ in records]
+
+
+def get_usage_size(usage: tuple[int, int] | None, column: str) -> int | None:
+    if not usage:
+        return None
+    size, shared_size = usage
+    return shared_size if column == "shared_size" else size - shared_size
+
+
+def get_formatter(
+    column: str, formats: dict[str, Any] | None = None
+) -> typing.Callable[[Any], str]:
+    """Get the function that formats raw values of the column."""
+    import functools
+    import platform
+
+    from bollard.utils import format_iso_time, format_relative_time, format_size
+
+    formats = formats or {}  # formats could be `None`
+    match column:
+        case "architecture":
+            machine = platform.machine()
+            return lambda v: format_architecture(*v, formats, machine)
+        case "created:iso":
+            return format_iso_time
+        case "created":
+            return format_relative_time
+        case "digest" | "id":
+            return functools.partial(format_digest, formats=formats)
+        case "platform":
+            machine = platform.machine()
+            return lambda v: f"{v[0]}/{format_architecture(*v[1:], formats, machine)}"
+        case "shared_size" | "size" | "unique_size":
+            return format_size
+        case _:
+            return str
 
 
-def get_architecture(data: dict[str, str], formats: dict[str, Any]) -> str:
+def format_architecture(
+    arch: str | None,
+    variant: str | None,
+    formats: dict[str, Any],
+    machine: str | None = None,
+) -> str:
     import platform
     from gettext import gettext as t
 
-    out = arch = data.get("Architecture", t("unknown"))
-    if variant := data.get("Variant"):
+    out = arch = arch or t("unknown")
+    if variant:
         out = f"{arch}/{variant}"
 
+    machine = machine if machine is not None else platform.machine()
     fmt_highlight = formats.get("highlight_architecture", True)
-    if fmt_highlight and platform.machine().upper() != arch.upper():
+    if fmt_highlight and machine.upper() != arch.upper():
         out = click.style(out, fg="yellow", bold=True)
 
     return out
@@ -1,8 +1,12 @@
-from typing import Sequence
+import typing
+from typing import Any, Iterable, Sequence
+
+if typing.TYPE_CHECKING:
+    from bollard.utils.template import Template
 
 COLUMN_DISPLAY_FORMAT = {
     "architecture": {"title": "ARCH"},
-    "created:iso": {"title": "CREATED TIME", "align": "right"},
+    "created:iso": {"title": "CREATED TIME", "align": "right", "width": 25},
     "created": {"title": "CREATED", "align": "right"},
     "digest": {"title": "DIGEST"},
     "id": {"title": "ID"},
@@ -12,30 +16,171 @@ COLUMN_DISPLAY_FORMAT = {
     "registry": {"title": "REGISTRY"},
     "repo_tag": {"title": "REPO TAG"},
     "repository": {"title": "REPOSITORY"},
-    "size": {"title": "SIZE", "align": "right"},
+    "shared_size": {"title": "SHARED SIZE", "align": "right", "width": 9},
+    "size": {"title": "SIZE", "align": "right", "width": 9},
     "tag": {"title": "TAG"},
+    "unique_size": {"title": "UNIQUE SIZE", "align": "right", "width": 9},
+}
+
+# fields for `--format` templates, in the same form as docker's outputs
+FORMAT_COLUMNS = ["id", "repository", "tag", "digest", "created", "size"]
+FORMAT_HEADERS = {
+    "Containers": "CONTAINERS",
+    "CreatedAt": "CREATED AT",
+    "CreatedSince": "CREATED",
+    "Digest": "DIGEST",
+    "ID": "IMAGE ID",
+    "Repository": "REPOSITORY",
+    "SharedSize": "SHARED SIZE",
+    "Size": "SIZE",
+    "Tag": "TAG",
+    "UniqueSize": "UNIQUE SIZE",
+    "VirtualSize": "VIRTUAL SIZE",
 }
+DEFAULT_FORMAT = (
+    "table {{.Repository}}\t{{.Tag}}\t{{.ID}}\t{{.CreatedSince}}\t{{.Size}}"
+)
+
+# number of rows written in each flush on machine readable outputs
+CHUNK_ROWS = 1000
+
+# max width of relative time, e.g. `1 year, 10 months ago`
+RELATIVE_TIME_WIDTH = 21
 
+# width of sha256 digest in short and full form
+DIGEST_WIDTH = {True: 12, False: 71}
 
-def build_table(
-    columns: Sequence[str], data: list[dict], show_header: bool = True
-) -> str:
-    from bollard.utils import tabulate
 
-    # build table spec
+def get_table_spec(
+    columns: Sequence[str], formats: dict[str, Any] | None = None
+) -> dict[str, dict]:
+    """Build the table spec. Widths are given for the fixed-width columns so they
+    are not measured from the rows."""
+    formats = formats or {}
+
     table_spec = {}
     for col in columns:
         table_spec[col] = COLUMN_DISPLAY_FORMAT[col]
+        if col in ("digest", "id"):
+            width = DIGEST_WIDTH[formats.get("short_digest", True)]
+            table_spec[col] = {**table_spec[col], "width": width}
 
-    # build table and print
-    table = tabulate(table_spec, data, show_header=show_header)
-    return table
+    return table_spec
 
 
 def print_table(
-    columns: Sequence[str], data: list[dict], show_header: bool = True
+    columns: Sequence[str],
+    data: Iterable[dict],
+    show_header: bool = True,
+    formats: dict[str, Any] | None = None,
+) -> None:
+    """Print the table. Rows are written as they are produced."""
+    import click
+
+    from bollard.utils.table import render_table
+
+    table_spec = get_table_spec(columns, formats)
+    for line in render_table(table_spec, data, show_header):
+        click.echo(line)
+
+
+def write_rows(columns: Sequence[str], data: Iterable[dict], output: str) -> None:
+    """Write raw rows in machine readable format (jsonl, csv or tsv). Outputs are
+    flushed in chunks."""
+    import csv
+    import io
+    import json
+
+    import click
+
+    buffer = io.StringIO()
+    writer = None
+    if output != "jsonl":
+        dialect = "excel-tab" if output == "tsv" else "excel"
+        writer = csv.writer(buffer, dialect, lineterminator="\n")
+        writer.writerow(columns)
+
+    for i, row in enumerate(data, 1):
+        values = {col: to_plain_value(col, row[col]) for col in columns}
+        if writer:
+            writer.writerow(values.values())
+        else:
+            buffer.write(json.dumps(values) + "\n")
+
+        if i % CHUNK_ROWS == 0:
+            click.echo(buffer.getvalue(), nl=False)
+            buffer.seek(0)
+            buffer.truncate()
+
+    click.echo(buffer.getvalue(), nl=False)
+
+
+def to_plain_value(column: str, value: Any) -> Any:
+    """Convert the raw value into a json-serializable one."""
+    from bollard.utils import format_iso_time
+
+    if value is None:
+        return None
+    if column == "created:iso":
+        return format_iso_time(value)
+    if isinstance(value, tuple):
+        return "/".join(filter(None, value))
+    return value
+
+
+def compile_format(format_: str) -> "Template":
+    """Compile `--format` template. Raises `TemplateError` when the template is not
+    supported or refers to unknown fields."""
+    from bollard.utils.template import compile_template
+
+    if format_.strip() == "table":
+        format_ = DEFAULT_FORMAT
+
+    template = compile_template(format_)
+    template.render(FORMAT_HEADERS)  # validate fields
+    return template
+
+
+def print_formatted(
+    template: "Template", data: Iterable[dict], formats: dict[str, Any] | None = None
 ) -> None:
+    """Print raw rows with the `--format` template."""
+    import itertools
+
     import click
 
-    table = build_table(columns, data, show_header)
-    click.echo(table)
+    from bollard.utils.table import align_tabs
+
+    lines = (template.render(get_format_context(row, formats)) for row in data)
+    if template.is_table:
+        lines = itertools.chain([template.render(FORMAT_HEADERS)], lines)
+        lines = align_tabs(itertools.chain.from_iterable(s.split("\n") for s in lines))
+
+    for line in lines:
+        click.echo(line)
+
+
+def get_format_context(
+    row: dict[str, Any], formats: dict[str, Any] | None = None
+) -> dict[str, str]:
+    """Build template context from raw row, values are the same as docker's."""
+    import datetime
+
+    from bollard.utils import format_digest, format_docker_size, format_relative_time
+
+    formats = formats or {}
+    created = datetime.datetime.fromtimestamp(row["created"]).astimezone()
+    size = format_docker_size(row["size"])
+    return {
+        "Containers": "N/A",
+        "CreatedAt": created.strftime("%Y-%m-%d %H:%M:%S %z %Z"),
+        "CreatedSince": format_relative_time(row["created"]),
+        "Digest": row["digest"] or "<none>",
+        "ID": format_digest(row["id"], formats.get("short_digest", True)),
+        "Repository": row["repository"] or "<none>",
+        "SharedSize": "N/A",
+        "Size": size,
+        "Tag": row["tag"] or "<none>",
+        "UniqueSize": "N/A",
+        "VirtualSize": size,
+    }
@@ -0,0 +1,125 @@
+import json
+import logging
+from typing import Any, Iterator, Sequence
+
+# image actions that changes the image list or tags
+IMAGE_ACTIONS = ("delete", "import", "load", "pull", "tag", "untag")
+
+# daemon only keeps recent events in memory, older events are discarded
+# https://github.com/moby/moby/blob/master/daemon/events/events.go
+EVENTS_LIMIT = 256
+
+logger = logging.getLogger(__name__)
+
+
+def fetch_events(since: int, until: int) -> list[dict[str, Any]]:
+    """Get the image events happened in the given time range (in nanoseconds)."""
+    from bollard.utils import api
+
+    rv = api.request("GET", "/events", build_query(since, until))
+    rv.raise_for_status()
+    return list(parse_json_stream(rv.body))
+
+
+def stream_events(since: int) -> Iterator[dict[str, Any]]:
+    """Follow the image events since the given time (in nanoseconds)."""
+    from bollard.utils import api
+
+    return api.stream_json("/events", build_query(since))
+
+
+def build_query(since: int, until: int | None = None) -> dict[str, Any]:
+    query = {
+        "since": format_timestamp(since),
+        "filters": {
+            "type": ["image", "container"],
+            # container commit creates image without image event
+            "event": [*IMAGE_ACTIONS, "commit"],
+        },
+    }
+    if until:
+        query["until"] = format_timestamp(until)
+    return query
+
+
+def format_timestamp(ns: int) -> str:
+    """Format timestamp into `seconds.nanoseconds` form that daemon accepts."""
+    seconds, nanoseconds = divmod(ns, 10**9)
+    return f"{seconds}.{nanoseconds:09d}"
+
+
+def parse_json_stream(data: bytes) -> Iterator[dict[str, Any]]:
+    """Parse concatenated JSON objects."""
+    decoder = json.JSONDecoder()
+    text = data.decode()
+    pos = 0
+    while True:
+        while pos < len(text) and text[pos].isspace():
+            pos += 1
+        if pos >= len(text):
+            return
+        obj, pos = decoder.raw_decode(text, pos)
+        yield obj
+
+
+def apply_events(
+    listing: dict[str, dict[str, Any]], events: Sequence[dict[str, Any]]
+) -> bool:
+    """Patch the image summaries with the events. Returns False when the listing
+    could not be patched and a full refresh is required."""
+    from bollard.image.data import norm_summary
+
+    if len(events) >= EVENTS_LIMIT:
+        return False
+
+    # collect the images to be refreshed
+    refresh = {}
+    for event in events:
+        if event.get("Type") != "image":
+            return False
+        actor = event["Actor"]["ID"]
+        if event["Action"] == "delete":
+            listing.pop(actor, None)
+            refresh.pop(actor, None)
+        else:
+            refresh[actor] = None
+
+    # query current state
+    for actor, data in zip(refresh, query_refs(list(refresh))):
+        if data:
+            update_summary(listing, norm_summary(data))
+        else:
+            listing.pop(actor, None)
+
+    # align docker's order
+    ordered = sorted(listing.values(), key=lambda d: d["Created"], reverse=True)
+    listing.clear()
+    listing.update((d["Id"], d) for d in ordered)
+
+    return True
+
+
+def query_refs(refs: Sequence[str]) -> list[dict[str, Any] | None]:
+    """Inspect images by id or reference. Returns None for the missing ones."""
+    from bollard.utils import api
+
+    requests = [api.Request("GET", f"/images/{ref}/json") for ref in refs]
+
+    output = []
+    for rv in api.pipeline(requests):
+        if rv.status == 404:
+            output.append(None)
+            continue
+        rv.raise_for_status()
+        output.append(rv.json())
+
+    return output
+
+
+def update_summary(listing: dict[str, dict[str, Any]], summary: dict[str, Any]):
+    """Set the image summary; the tags are moved from other images."""
+    tags = set(summary["RepoTags"])
+    for other in listing.values():
+        if other["Id"] != summary["Id"] and tags.intersection(other["RepoTags"]):
+            other["RepoTags"] = [t for t in other["RepoTags"] if t not in tags]
+    listing[summary["Id"]] = summary
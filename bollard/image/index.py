@@ -0,0 +1,87 @@
+import bisect
+import typing
+from typing import Iterator
+
+if typing.TYPE_CHECKING:
+    from bollard.image.record import ImageRecord
+
+
+class ImageIndex:
+    """Inverted index from the image fields (registry, name, tag, etc) to image
+    ids, for resolving selectors without scanning all the images.
+
+    Keys are stored in lower case. Exact values are resolved by hash lookup, and
+    prefix globs (e.g. `nginx*`) are resolved by binary search on the sorted
+    keys. Lookup result is a superset of the matched images; the exact pattern
+    should still be applied on the candidates."""
+
+    def __init__(self) -> None:
+        self._maps: dict[str, dict[str, set[str]]] = {}
+        self._sorted: dict[str, list[str]] = {}
+        self._entries: dict[str, list[tuple[str, str]]] = {}
+
+    def __contains__(self, image_id: str) -> bool:
+        return image_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, record: "ImageRecord") -> None:
+        """Index the record. Existing entries of the same image are replaced."""
+        self.discard(record.id)
+
+        entries = list(dict.fromkeys(iter_index_keys(record)))
+        for field, key in entries:
+            keys = self._maps.setdefault(field, {})
+            if key not in keys:
+                keys[key] = set()
+                self._sorted.pop(field, None)
+            keys[key].add(record.id)
+
+        self._entries[record.id] = entries
+
+    def discard(self, image_id: str) -> None:
+        for field, key in self._entries.pop(image_id, ()):
+            ids = self._maps[field][key]
+            ids.discard(image_id)
+            if not ids:
+                del self._maps[field][key]
+                self._sorted.pop(field, None)
+
+    def lookup(self, field: str, pattern: str) -> set[str] | None:
+        """Get ids of the images that the field could match the wildcard pattern.
+        Returns None when the pattern could not be resolved by the index, i.e.
+        the wildcard is not at the end."""
+        head, wildcard, tail = pattern.lower().partition("*")
+        keys = self._maps.get(field, {})
+
+        if not wildcard:
+            return set(keys.get(head, ()))
+        if tail or not head:
+            return None
+
+        if (sorted_keys := self._sorted.get(field)) is None:
+            sorted_keys = self._sorted[field] = sorted(keys)
+
+        output = set()
+        i = bisect.bisect_left(sorted_keys, head)
+        while i < len(sorted_keys) and sorted_keys[i].startswith(head):
+            output |= keys[sorted_keys[i]]
+            i += 1
+        return output
+
+
+def iter_index_keys(record: "ImageRecord") -> Iterator[tuple[str, str]]:
+    """Yields the (field, key) pairs of the record. The field names are the same
+    as the ones used in selectors."""
+    yield "ID", record.id.lower()
+    for digest in record.repo_digests:
+        yield "DIGEST", digest.partition("@")[2].lower()
+    for repo_tag in record.repo_tags:
+        yield "REGISTRY", repo_tag.registry.lower()
+        yield "NAME", repo_tag.name.lower()
+        yield "TAG", repo_tag.tag.lower()
+        yield "REPO", repo_tag.repository.lower()
+        yield "REPO_TAG", str(repo_tag).lower()
+        if repo_tag.registry:
+            yield "REPO_TAG", f"{repo_tag.name}:{repo_tag.tag}".lower()
@@ -0,0 +1,110 @@
+from typing import Iterable, Sequence
+
+
+class _Node:
+    __slots__ = ("parent", "children", "num_images", "size")
+
+    def __init__(self, parent: "_Node | None" = None) -> None:
+        self.parent = parent
+        self.children: dict[str, _Node] = {}
+        self.num_images = 0
+        self.size: int | None = None  # total size of the layer chain
+
+    def path(self) -> Iterable["_Node"]:
+        node = self
+        while node.parent:
+            yield node
+            node = node.parent
+
+
+class LayerIndex:
+    """Index of the layer chains of all images, for estimating the disk space
+    used by images.
+
+    Docker stores a layer once for all the images that share the same chain of
+    layers below it, so the chains are kept in a trie. The engine API does not
+    provide size of each layer; chain sizes are taken from the disk usage data
+    instead: image size is the size of the whole chain, and shared size is the
+    size of the deepest chain used by other images. Layers between the known
+    points are counted as one block."""
+
+    def __init__(self) -> None:
+        self._root = _Node()
+        self._root.size = 0
+        self._tips: dict[str, _Node] = {}
+        self._shared: dict[str, int] = {}
+        self._blocks: dict[_Node, int] | None = None
+
+    def __contains__(self, image_id: str) -> bool:
+        return image_id in self._tips
+
+    def __len__(self) -> int:
+        return len(self._tips)
+
+    def add(
+        self, image_id: str, layers: Sequence[str], size: int, shared_size: int
+    ) -> None:
+        node = self._root
+        for layer in layers:
+            if (child := node.children.get(layer)) is None:
+                child = node.children[layer] = _Node(node)
+            child.num_images += 1
+            node = child
+
+        if node is not self._root:
+            node.size = size
+        self._tips[image_id] = node
+        self._shared[image_id] = shared_size
+        self._blocks = None
+
+    def reclaimable_size(self, image_ids: Iterable[str]) -> int:
+        """Get bytes that would be freed when all the given images are removed,
+        i.e. the layers that are not used by any other image."""
+        blocks = self._get_blocks()
+
+        selected: dict[_Node, int] = {}
+        for id_ in set(image_ids):
+            if tip := self._tips.get(id_):
+                for node in tip.path():
+                    selected[node] = selected.get(node, 0) + 1
+
+        return sum(
+            blocks.get(node, 0)
+            for node, count in selected.items()
+            if count == node.num_images
+        )
+
+    def _mark_shared_sizes(self) -> None:
+        """Set size of the deepest shared chain of each image."""
+        for id_, tip in self._tips.items():
+            node = next((n for n in tip.path() if n.num_images > 1), None)
+            if node and node.size is None:
+                node.size = self._shared[id_]
+
+    def _get_blocks(self) -> dict[_Node, int]:
+        """Split the chains into blocks at the nodes that sizes are known. Returns
+        size of each block, keyed by the top node."""
+        if self._blocks is not None:
+            return self._blocks
+
+        self._mark_shared_sizes()
+
+        blocks = {}
+        for tip in self._tips.values():
+            for node in tip.path():
+                if node in blocks:
+                    break
+                if node.size is None:
+                    continue
+                blocks[node] = max(node.size - get_base_size(node), 0)
+
+        self._blocks = blocks
+        return blocks
+
+
+def get_base_size(node: _Node) -> int:
+    """Get size of the nearest ancestor chain that size is known."""
+    while node := node.parent:
+        if node.size is not None:
+            return node.size
+    return 0
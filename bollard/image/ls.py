@@ -1,10 +1,11 @@
 import itertools
 import logging
 import sys
-from typing import Any, NoReturn, Sequence
+from typing import Any, Callable, NoReturn, Sequence
 
 import click
 
+from bollard.core.daemon import forwardable
 from bollard.image.base import group
 from bollard.utils import append_parameters, is_docker_ready, rebuild_args, run_docker
 
@@ -20,8 +21,10 @@ _COLUMNS = [
     "registry",
     "repo_tag",
     "repository",
+    "shared_size",
     "size",
     "tag",
+    "unique_size",
 ]
 
 _COLUMN_ALIAS = {
@@ -54,6 +57,7 @@ class OrderByField(click.Choice):
             return False, v
 
 
+@forwardable(lambda params: is_format_supported(params.get("format")))
 @group.command(name="ls")
 @click.argument("selector", nargs=-1)
 @click.option(
@@ -71,10 +75,18 @@ class OrderByField(click.Choice):
     help="Order the output by the column. "
     "Default in ascending, add minus as prefix for decending order",
 )
+@click.option(
+    "--output",
+    type=click.Choice(["table", "jsonl", "csv", "tsv"], False),
+    default="table",
+    show_default=True,
+    help="Output format. Values are written without styling in non-table formats",
+)
 def list_images(
     selector: Sequence[str],
     column: Sequence[str],
     order_by: tuple[bool, str] | None,
+    output: str,
     **extra,
 ):
     """List images
@@ -133,10 +145,14 @@ def list_images(
           Repository name and tag (e.g. `nginx:stable`)
        repository (repo)
           Repository name
+       shared_size
+          Size of the layers that are shared with other images
        size
           Image size
        tag
           Image tag
+       unique_size
+          Size of the layers that are only used by this image
 
     Also there are some keywords that would be exploded into multiple columns:
 
@@ -147,19 +163,31 @@ def list_images(
        compact
           Converts to id and repo_tag
     """
-    from bollard.image.data import collect_fields
-    from bollard.image.display import print_table
+    from bollard.image.data import collect_raw_fields, format_rows, iter_raw_fields
+    from bollard.image.display import (
+        FORMAT_COLUMNS,
+        compile_format,
+        print_formatted,
+        print_table,
+        write_rows,
+    )
+    from bollard.utils.template import TemplateError
 
     # check input & env
-    if selector and extra.get("format"):
-        logger.error("Selector are not supported to use with format")
-        sys.exit(1)
     if not is_docker_ready():
         sys.exit(1)
 
-    # preserve docker's behavior
-    if extra.get("format"):
-        list_images_fallback(extra)
+    # evaluate format template by ourself; fallback to docker when not supported
+    quiet = is_quiet(extra.get("format"), extra.get("quiet"))
+    template = None
+    if extra.get("format") and not quiet:
+        try:
+            template = compile_format(extra["format"])
+        except TemplateError as e:
+            if selector:
+                logger.error("Unsupported format template: %s", e)
+                sys.exit(1)
+            list_images_fallback(extra)
 
     # pop top-n arg from selectors
     selectors, top_n = parse_top_n_arg(selector)
@@ -176,29 +204,46 @@ def list_images(
         column,
         flag_digest=extra.get("digests"),
         flag_format=extra.get("format"),
-        flag_quiet=extra.get("quiet"),
-    )
-
-    data = collect_fields(
-        image_ids, columns, {"short_digest": not extra.get("no_trunc")}
+        flag_quiet=quiet,
     )
+    if template:
+        columns = FORMAT_COLUMNS
+
+    if order_by and order_by[1] not in columns:
+        logger.warning(
+            "`--order-by` field (%s) not in selected columns (%s). "
+            "Discard this setting.",
+            order_by[1],
+            ", ".join(columns),
+        )
+        order_by = None
 
-    if order_by:
-        desc, key = order_by
-        if key in columns:
+    # rank on the sort key first, rows are only built for the winning images
+    if top_n > 0:
+        image_ids = pick_top_images(image_ids, order_by, top_n)
+
+    # sort and slice on raw values, only the printed rows are formatted; rows are
+    # streamed when they need not be sorted
+    if order_by or top_n > 0:
+        data = collect_raw_fields(image_ids, columns)
+        if order_by:
+            desc, key = order_by
             data = order_dict(data, key, desc)
-        else:
-            logger.warning(
-                "`--order-by` field (%s) not in selected columns (%s). "
-                "Discard this setting.",
-                key,
-                ", ".join(columns),
-            )
+        if top_n > 0:
+            data = data[:top_n]
+    else:
+        data = iter_raw_fields(image_ids, columns)
 
-    if top_n > 0:
-        data = data[:top_n]
+    formats = {"short_digest": not extra.get("no_trunc")}
+    if template:
+        print_formatted(template, data, formats)
+        return
+
+    if output != "table":
+        write_rows(columns, data, output)
+        return
 
-    print_table(columns, data)
+    print_table(columns, format_rows(columns, data, formats), formats=formats)
 
 
 group.add_alias("list", ["ls"])
@@ -272,27 +317,51 @@ def list_images_fallback(values: dict) -> NoReturn:
     sys.exit(rv.returncode)
 
 
+def is_quiet(format_: str | None, quiet: bool) -> bool:
+    """Check if `--quiet` takes effect. Docker only applies it on the default
+    table format, custom templates are still honored."""
+    return bool(quiet) and (not format_ or format_.strip() == "table")
+
+
+def is_format_supported(format_: str | None) -> bool:
+    """Check if the format template could be evaluated by bollard. Unsupported
+    ones fallback to docker."""
+    from bollard.image.display import compile_format
+    from bollard.utils.template import TemplateError
+
+    if not format_:
+        return True
+    try:
+        compile_format(format_)
+    except TemplateError:
+        return False
+    return True
+
+
 def select_images(
     selectors: Sequence[str], incl_interm_img: bool, filters: Sequence[str]
 ) -> list[str]:
-    from bollard.image.data import inspect_image, list_image_ids
-    from bollard.image.selector import is_image_match_selector
+    from bollard.image.data import (
+        can_push_down_filters,
+        list_image_ids,
+        match_images,
+        plan_sources,
+    )
+    from bollard.image.selector import compile_selectors, to_reference_filters
+
+    # narrow down the list with daemon-side filter; the result is a superset and
+    # selectors are still applied on it
+    filters = list(filters or ())
+    if selectors and can_push_down_filters(incl_interm_img, filters):
+        filters += to_reference_filters(selectors, match_all=True)
 
     # get all image list
     image_ids = list_image_ids(incl_interm_img=incl_interm_img, filters=filters)
 
     # apply selectors
     if selectors:
-        selected = []
-        for data in inspect_image(image_ids):
-            is_match = True
-            for selector in selectors:
-                if not is_image_match_selector(data, selector):
-                    is_match = False
-                    break
-            if is_match:
-                selected.append(data["Id"])
-        image_ids = selected
+        matcher = compile_selectors(selectors, match_all=True)
+        image_ids = match_images(image_ids, matcher, plan_sources((), selectors))
 
     return image_ids
 
@@ -314,13 +383,50 @@ def parse_top_n_arg(selectors: Sequence[str]) -> tuple[Sequence[str], int]:
     return remain, top_n
 
 
-def order_dict(data: list[dict], column: str, desc: bool) -> list[str]:
-    def _get_key(d: dict):
-        nonlocal column
-        v = d[column]
+def pick_top_images(
+    image_ids: Sequence[str], order_by: tuple[bool, str] | None, top_n: int
+) -> Sequence[str]:
+    """Pick the images that the top N rows come from. Every image produces at least
+    one row, so the rows are from at most N images. Images are ranked by their best
+    value of the sort key, and only the data source of the key is queried."""
+    import heapq
+
+    from bollard.image.data import extract_column, get_image_data, plan_sources
+
+    if not order_by:
+        return image_ids[:top_n]
+    if len(image_ids) <= top_n:
+        return image_ids
+
+    desc, column = order_by
+    records = get_image_data(image_ids, plan_sources([column]))
+
+    # images without data are dropped, so keys are paired with records; not ids
+    sort_key = get_sort_key(desc)
+    best = max if desc else min
+    ranked = [
+        (best(map(sort_key, values or [None])), i)
+        for i, values in enumerate(extract_column(records, column))
+    ]
+
+    # both are stable on ties, same as the sorting in `order_dict`
+    select = heapq.nlargest if desc else heapq.nsmallest
+    winners = select(top_n, ranked, key=lambda item: item[0])
+    return [records[i].id for i in sorted(i for _, i in winners)]
+
+
+def get_sort_key(desc: bool) -> Callable[[Any], tuple]:
+    def _get_key(v: Any) -> tuple:
+        # empty values are always placed at the end, and are not compared since
+        # they could be in different types (e.g. None and 0)
         if v:
             return (desc, v)
         else:
-            return (not desc, v)
+            return (not desc,)
+
+    return _get_key
+
 
-    return sorted(data, key=_get_key, reverse=desc)
+def order_dict(data: list[dict], column: str, desc: bool) -> list[dict]:
+    sort_key = get_sort_key(desc)
+    return sorted(data, key=lambda d: sort_key(d[column]), reverse=desc)
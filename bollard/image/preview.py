@@ -0,0 +1,102 @@
+import typing
+from typing import Any, Iterator
+
+import click
+
+from bollard.core.daemon import forwardable
+from bollard.image.base import group
+
+if typing.TYPE_CHECKING:
+    from bollard.image.record import ImageRecord
+
+# max number of layers listed in preview
+MAX_LAYERS = 20
+
+
+@forwardable()
+@group.command(name="preview", hidden=True)
+@click.argument("image_id")
+def preview_image(image_id: str):
+    """
+    Print image summary for the preview pane of interactive selection
+
+    Data is read from the image cache, so it is fast enough to be called on
+    every cursor move. Run it through bollard daemon to keep the cache in memory.
+    """
+    from gettext import gettext as t
+
+    from bollard.image.data import get_cached_image
+
+    if not (record := get_cached_image(image_id)):
+        click.secho(t("No such image: {}").format(image_id), fg="yellow", err=True)
+        return
+
+    for line in render_preview(record, list_image_containers(record.id)):
+        click.echo(line)
+
+
+def render_preview(
+    record: "ImageRecord", containers: list[dict[str, Any]] | None
+) -> Iterator[str]:
+    """Render the image summary lines. Containers are omitted when it is None."""
+    from gettext import gettext as t
+
+    yield from render_overview(record)
+
+    if containers is not None:
+        lines = []
+        for data in containers:
+            names = ", ".join(n.removeprefix("/") for n in data.get("Names") or ())
+            lines.append(f"{names} ({data.get('State', '')})")
+        yield from render_section(t("Containers ({}):").format(len(lines)), lines)
+
+    if record.labels:
+        lines = [f"{k}={v}" for k, v in sorted(record.labels.items())]
+        yield from render_section(t("Labels:"), lines)
+
+    if record.layers:
+        lines = [layer.removeprefix("sha256:")[:12] for layer in record.layers]
+        if len(lines) > MAX_LAYERS:
+            lines[MAX_LAYERS:] = ["..."]
+        yield from render_section(t("Layers ({}):").format(len(record.layers)), lines)
+
+
+def render_overview(record: "ImageRecord") -> Iterator[str]:
+    from gettext import gettext as t
+
+    from bollard.image.data import format_architecture
+    from bollard.utils import format_iso_time, format_relative_time, format_size
+
+    yield style_title(t("ID:")) + " " + record.id
+    for repo_tag in record.repo_tags:
+        yield style_title(t("Tag:")) + " " + str(repo_tag)
+    if record.created is not None:
+        yield style_title(t("Created:")) + " {} ({})".format(
+            format_iso_time(record.created), format_relative_time(record.created)
+        )
+    if record.size is not None:
+        yield style_title(t("Size:")) + " " + format_size(record.size)
+    if record.os:
+        arch = format_architecture(record.architecture, record.variant, {})
+        yield style_title(t("Platform:")) + f" {record.os}/{arch}"
+
+
+def render_section(title: str, lines: list[str]) -> Iterator[str]:
+    yield ""
+    yield style_title(title)
+    for line in lines:
+        yield "  " + line
+
+
+def style_title(s: str) -> str:
+    return click.style(s, fg="cyan", bold=True)
+
+
+def list_image_containers(image_id: str) -> list[dict[str, Any]] | None:
+    """List the containers that are created from the image. Returns None when
+    the data is not available."""
+    from bollard.image.data import list_containers
+
+    if (containers := list_containers()) is None:
+        return None
+    return [data for data in containers if data.get("ImageID") == image_id]
@@ -0,0 +1,76 @@
+import dataclasses
+import sys
+from typing import Any, NamedTuple
+
+_intern = sys.intern
+
+
+class RepoTag(NamedTuple):
+    registry: str
+    name: str
+    tag: str
+
+    @classmethod
+    def parse(cls, s: str) -> "RepoTag":
+        """Split `registry/name:tag` string. The parts are interned since they
+        are heavily repeated across images."""
+        from bollard.utils import split_repo_tag
+
+        registry, name, tag = split_repo_tag(s)
+        return cls(_intern(registry), _intern(name), _intern(tag))
+
+    @property
+    def repository(self) -> str:
+        if self.registry:
+            return f"{self.registry}/{self.name}"
+        return self.name
+
+    def __str__(self) -> str:
+        return f"{self.repository}:{self.tag}"
+
+
+@dataclasses.dataclass(slots=True)
+class ImageRecord:
+    """Compact image metadata. Only the fields used by bollard are kept, and the
+    values are parsed on creation.
+
+    The record could be built from either image summary or inspect data; the
+    fields that are not provided by the source are left as None."""
+
+    id: str
+    repo_tags: tuple[RepoTag, ...] = ()
+    repo_digests: tuple[str, ...] = ()
+    created: int | None = None
+    size: int | None = None
+    architecture: str | None = None
+    variant: str | None = None
+    os: str | None = None
+    parent: str | None = None
+    layers: tuple[str, ...] = ()
+    labels: dict[str, str] | None = None
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "ImageRecord":
+        """Build record from the image data in Engine API form."""
+        from bollard.utils import parse_timestamp
+
+        def intern_or_none(s: str | None) -> str | None:
+            return _intern(s) if s else None
+
+        created = data.get("Created")
+        layers = (data.get("RootFS") or {}).get("Layers") or ()
+        labels = data.get("Labels") or (data.get("Config") or {}).get("Labels")
+
+        return cls(
+            id=data["Id"],
+            repo_tags=tuple(RepoTag.parse(s) for s in data.get("RepoTags") or ()),
+            repo_digests=tuple(data.get("RepoDigests") or ()),
+            created=parse_timestamp(created) if created is not None else None,
+            size=data.get("Size"),
+            architecture=intern_or_none(data.get("Architecture")),
+            variant=intern_or_none(data.get("Variant")),
+            os=intern_or_none(data.get("Os")),
+            parent=data.get("Parent") or data.get("ParentId") or None,
+            layers=tuple(_intern(layer) for layer in layers),
+            labels=labels or None,
+        )
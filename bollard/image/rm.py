@@ -1,11 +1,26 @@
+import logging
 import sys
-from typing import Sequence
+import typing
+from typing import Iterable, Iterator, NamedTuple, Sequence
 
 import click
 
 from bollard.image.base import group
 from bollard.utils import append_parameters, rebuild_args, run_docker
 
+if typing.TYPE_CHECKING:
+    import concurrent.futures
+
+    from bollard.image.record import ImageRecord
+
+# max number of concurrent remove requests
+MAX_WORKERS = 4
+
+# max number of images in each `docker image rm` call on cli fallback
+BATCH_SIZE = 50
+
+logger = logging.getLogger(__name__)
+
 
 @group.command(name="rm")
 @click.argument("selector", nargs=-1)
@@ -22,7 +37,7 @@ def remove_images(selector: Sequence[str], yes: bool, **extra):
     from gettext import gettext as t
     from gettext import ngettext
 
-    from bollard.image.data import collect_fields
+    from bollard.image.data import collect_fields, discard_images
     from bollard.image.display import print_table
 
     # get images
@@ -44,11 +59,15 @@ def remove_images(selector: Sequence[str], yes: bool, **extra):
     )
     click.echo()
 
-    cols = ["id", "repository", "tag"]
+    cols = ["id", "repository", "tag", "unique_size"]
     data = collect_fields(images, cols)
     print_table(cols, data)
     click.echo()
 
+    # plan the order and check conflicts before anything is deleted
+    plan = plan_removal(images, extra)
+    print_plan_notes(plan, show_estimate=not yes)
+
     # confirm
     if yes:
         click.echo(t("Removing..."))
@@ -56,9 +75,15 @@ def remove_images(selector: Sequence[str], yes: bool, **extra):
         click.confirm(t("Proceed"), abort=True)
 
     # proceed
-    args = ["image", "rm"] + rebuild_args(extra, _DOCKER_OPTIONS)
-    for id_ in images:
-        run_docker(args + [id_])
+    result = execute_removal(plan, extra)
+    discard_images(result.removed)
+
+    if len(images) > 1 or result.cancelled:
+        click.echo(result.summary(), err=True)
+    if result.cancelled:
+        sys.exit(130)
+    if result.failed:
+        sys.exit(1)
 
 
 group.add_alias("remove", ["rm"])
@@ -71,56 +96,466 @@ _DOCKER_OPTIONS = [
 append_parameters(remove_images, _DOCKER_OPTIONS)
 
 
+class RemovalResult(NamedTuple):
+    removed: list[str]
+    failed: dict[str, str]
+    cancelled: list[str]
+
+    def summary(self) -> str:
+        from gettext import gettext as t
+        from gettext import ngettext
+
+        text = ngettext(
+            "Removed {} image", "Removed {} images", len(self.removed)
+        ).format(len(self.removed))
+        if self.failed:
+            text += t(", {} failed").format(len(self.failed))
+        if self.cancelled:
+            text += t(", {} cancelled").format(len(self.cancelled))
+        return text
+
+
+class Progress:
+    """Live progress line on stderr. It is only shown on terminal."""
+
+    def __init__(self, total: int) -> None:
+        self.total = total
+        self.done = 0
+        self.enabled = sys.stderr.isatty()
+
+    def advance(self, n: int = 1) -> None:
+        self.done += n
+        self.show()
+
+    def show(self) -> None:
+        from gettext import gettext as t
+
+        if self.enabled:
+            text = t("Removing images... {}/{}").format(self.done, self.total)
+            click.echo(f"\r{text}", err=True, nl=False)
+
+    def clear(self) -> None:
+        if self.enabled:
+            click.echo("\r\033[K", err=True, nl=False)
+
+    def echo(self, message: str, err: bool = False) -> None:
+        self.clear()
+        click.echo(message, err=err)
+        self.show()
+
+
+class RemovalPlan(NamedTuple):
+    """Deletion plan. Images are removed wave by wave; images in the same wave do
+    not depend on each other. Each image is removed by the references in order,
+    where the last one is always the image id."""
+
+    waves: list[dict[str, list[str]]]
+    pruned: dict[str, set[str]]
+    conflicts: dict[str, str]
+
+
+def plan_removal(
+    image_ids: Sequence[str],
+    options: dict,
+    records: dict[str, "ImageRecord"] | None = None,
+) -> RemovalPlan:
+    """Build the deletion plan from the parent/child and tag relations of all the
+    images. Children are removed before their parents, images tagged in multiple
+    repositories are untagged before removal, and the images that could not be
+    removed are reported as conflicts.
+
+    The `records` is the metadata of all the images keyed by id; it is fetched
+    when not given."""
+    if records is None:
+        records = get_all_records()
+
+    selected = resolve_image_ids(image_ids, records)
+
+    children: dict[str, set[str]] = {}
+    for record in records.values():
+        if record.parent:
+            children.setdefault(record.parent, set()).add(record.id)
+
+    conflicts = find_conflicts(selected, children)
+
+    # leaves first
+    depth = {}
+    for id_ in selected:
+        if id_ not in conflicts:
+            get_depth(id_, children, depth)
+
+    # untagged parents are pruned by docker along with the last child
+    pruned = {}
+    if not options.get("no_prune"):
+        pruned = find_pruned(list(depth), children, records)
+
+    waves = [{} for _ in range(max(depth.values(), default=-1) + 1)]
+    for id_ in selected:
+        if id_ in depth and id_ not in pruned:
+            waves[depth[id_]][id_] = get_references(id_, records, options)
+
+    return RemovalPlan([w for w in waves if w], pruned, conflicts)
+
+
+def get_all_records() -> dict[str, "ImageRecord"]:
+    """Get metadata of all the images, including the intermediate ones. The
+    summaries from the listing carry the tags and parents needed for planning,
+    images are only inspected when the summaries are not available."""
+    from bollard.image.data import SOURCE_SUMMARY, get_image_data, list_image_ids
+
+    all_ids = list_image_ids(incl_interm_img=True)
+    return {r.id: r for r in get_image_data(all_ids, [SOURCE_SUMMARY]) if r}
+
+
+def find_conflicts(
+    selected: Sequence[str], children: dict[str, set[str]]
+) -> dict[str, str]:
+    """Find the images that have children not to be removed; docker refuses to
+    remove them even it is forced."""
+    from gettext import gettext as t
+
+    blocked = set()
+    selected_set = set(selected)
+    changed = True
+    while changed:
+        changed = False
+        for id_ in selected_set - blocked:
+            if any(
+                c not in selected_set or c in blocked for c in children.get(id_, ())
+            ):
+                blocked.add(id_)
+                changed = True
+
+    reason = t("image has dependent child images")
+    return {id_: reason for id_ in selected if id_ in blocked}
+
+
+def find_pruned(
+    image_ids: Sequence[str],
+    children: dict[str, set[str]],
+    records: dict[str, "ImageRecord"],
+) -> dict[str, set[str]]:
+    """Find the untagged images that are removed along with their children, from
+    the given images and their ancestors. The output is ordered children first,
+    so an image comes after all of its pruned descendants."""
+    candidates = list(image_ids)
+    for id_ in image_ids:
+        candidates += iter_ancestors(id_, records)
+
+    candidates = [
+        id_
+        for id_ in dict.fromkeys(candidates)
+        if children.get(id_) and is_prunable(records, id_)
+    ]
+
+    removed = set(image_ids)
+    output = {}
+    changed = True
+    while changed:
+        changed = False
+        for id_ in candidates:
+            if id_ not in output and children[id_] <= removed:
+                output[id_] = children[id_]
+                removed.add(id_)
+                changed = True
+    return output
+
+
+def iter_ancestors(image_id: str, records: dict[str, "ImageRecord"]) -> Iterator[str]:
+    record = records.get(image_id)
+    while record and record.parent:
+        yield record.parent
+        record = records.get(record.parent)
+
+
+def is_prunable(records: dict[str, "ImageRecord"], image_id: str) -> bool:
+    record = records.get(image_id)
+    return bool(record and not record.repo_tags and not record.repo_digests)
+
+
+def resolve_image_ids(image_ids: Sequence[str], records: dict) -> list[str]:
+    """Map the short ids into full ids. Unknown ones are kept as is."""
+    short_ids = {id_.removeprefix("sha256:")[:12]: id_ for id_ in records}
+
+    output = []
+    for id_ in image_ids:
+        if id_ not in records:
+            id_ = short_ids.get(id_.removeprefix("sha256:")[:12], id_)
+        output.append(id_)
+
+    return output
+
+
+def get_depth(image_id: str, children: dict[str, set[str]], depth: dict[str, int]):
+    if image_id not in depth:
+        depth[image_id] = 1 + max(
+            (get_depth(c, children, depth) for c in children.get(image_id, ())),
+            default=-1,
+        )
+    return depth[image_id]
+
+
+def get_references(
+    image_id: str, records: dict[str, "ImageRecord"], options: dict
+) -> list[str]:
+    """Get the references to remove the image. Docker refuses to remove image by
+    id when it is tagged in multiple repositories, so the tags are removed first
+    when not forced."""
+    record = records.get(image_id)
+    if not record or options.get("force"):
+        return [image_id]
+    if len({tag.repository for tag in record.repo_tags}) <= 1:
+        return [image_id]
+    return [str(tag) for tag in record.repo_tags[:-1]] + [image_id]
+
+
+def print_plan_notes(plan: RemovalPlan, show_estimate: bool) -> None:
+    """Print the skipped images and the estimated reclaimed space. The estimate
+    needs disk usage and layers of the images, so it is skipped when it is not
+    going to be read, e.g. on `--yes`."""
+    from gettext import gettext as t
+
+    from bollard.utils import format_digest, format_size
+
+    for id_, reason in plan.conflicts.items():
+        msg = t("Skip {}: {}").format(format_digest(id_, True), reason)
+        click.secho(msg, fg="yellow", err=True)
+    if plan.conflicts:
+        click.echo(err=True)
+
+    if show_estimate and (reclaimable := estimate_reclaimable(plan)) is not None:
+        click.echo(t("Total reclaimed space: {}").format(format_size(reclaimable)))
+        click.echo()
+
+
+def estimate_reclaimable(plan: RemovalPlan) -> int | None:
+    """Estimate the disk space freed by the plan. Returns None when the disk
+    usage data is not available."""
+    from bollard.image.data import build_layer_index
+
+    image_ids = [id_ for wave in plan.waves for id_ in wave] + list(plan.pruned)
+    index = build_layer_index()
+    if not any(id_ in index for id_ in image_ids):
+        return None
+    return index.reclaimable_size(image_ids)
+
+
+def execute_removal(plan: RemovalPlan, options: dict) -> RemovalResult:
+    """Remove the images in the plan. Requests are sent concurrently via engine
+    API, and `docker image rm` is called in batches as a fallback. Ctrl-C cancels
+    the pending ones."""
+    planned = [id_ for wave in plan.waves for id_ in wave]
+    result = RemovalResult([], dict(plan.conflicts), [])
+    progress = Progress(len(planned))
+    progress.show()
+
+    # docker's endpoint options (e.g. `--context`) could only be handled by cli
+    ctx = click.get_current_context(silent=True)
+    use_api = not (ctx and ctx.meta.get("DOCKER_ENDPOINT_OPTION"))
+
+    try:
+        for wave in plan.waves:
+            pending = wave
+            if use_api:
+                pending = remove_images_api(wave, options, result, progress)
+            remove_images_cli(pending, options, result, progress)
+
+    except KeyboardInterrupt:
+        handled = {*result.removed, *result.failed}
+        result.cancelled.extend(id_ for id_ in planned if id_ not in handled)
+
+    finally:
+        progress.clear()
+
+    collect_pruned(plan.pruned, result)
+    return result
+
+
+def collect_pruned(pruned: dict[str, set[str]], result: RemovalResult) -> None:
+    """Record the images pruned along with their children. The `pruned` is ordered
+    children first, so a chain of untagged parents is resolved in one pass."""
+    from gettext import gettext as t
+
+    removed = set(result.removed)
+    for id_, children in pruned.items():
+        if children <= removed:
+            result.removed.append(id_)
+            removed.add(id_)
+        elif result.cancelled:
+            result.cancelled.append(id_)
+        else:
+            result.failed[id_] = t("image has dependent child images")
+
+
+def remove_images_api(
+    steps: dict[str, list[str]],
+    options: dict,
+    result: RemovalResult,
+    progress: Progress,
+) -> dict[str, list[str]]:
+    """Remove images via engine API with bounded concurrency. Returns the ones
+    that could not be sent to the daemon."""
+    import concurrent.futures
+
+    executor = concurrent.futures.ThreadPoolExecutor(MAX_WORKERS)
+    futures = {
+        executor.submit(remove_image_refs, refs, options): id_
+        for id_, refs in steps.items()
+    }
+
+    unsent = set()
+    pending = set(futures)
+    try:
+        for future in concurrent.futures.as_completed(futures):
+            pending.discard(future)
+            if not collect_removal(futures[future], future, result, progress):
+                unsent.add(futures[future])
+
+    except KeyboardInterrupt:
+        # requests in flight could not be cancelled, wait for them
+        executor.shutdown(cancel_futures=True)
+        for future in pending:
+            if not future.cancelled():
+                collect_removal(futures[future], future, result, progress)
+        raise
+
+    finally:
+        executor.shutdown()
+
+    return {id_: refs for id_, refs in steps.items() if id_ in unsent}
+
+
+def remove_image_refs(references: list[str], options: dict) -> list[str]:
+    output = []
+    for ref in references:
+        output += remove_image_api(ref, options)
+    return output
+
+
+def collect_removal(
+    image_id: str,
+    future: "concurrent.futures.Future",
+    result: RemovalResult,
+    progress: Progress,
+) -> bool:
+    """Record the result of the remove request. Returns False when the request is
+    not sent."""
+    from bollard.utils import api
+
+    try:
+        lines = future.result()
+    except OSError as e:
+        logger.debug("Engine API unavailable, fallback to docker cli: %s", e)
+        return False
+    except api.APIError as e:
+        result.failed[image_id] = e.message
+        progress.echo(f"Error response from daemon: {e.message}", err=True)
+    else:
+        result.removed.append(image_id)
+        progress.echo("\n".join(lines))
+
+    progress.advance()
+    return True
+
+
+def remove_image_api(image_id: str, options: dict) -> list[str]:
+    """Remove an image via `DELETE /images/{id}`. Returns the output lines that
+    aligns docker's."""
+    from bollard.utils import api
+
+    query = {"force": options.get("force"), "noprune": options.get("no_prune")}
+    rv = api.request("DELETE", f"/images/{image_id}", query)
+    rv.raise_for_status()
+
+    output = []
+    for item in rv.json():
+        for action, target in item.items():
+            output.append(f"{action}: {target}")
+    return output
+
+
+def remove_images_cli(
+    steps: dict[str, list[str]],
+    options: dict,
+    result: RemovalResult,
+    progress: Progress,
+) -> None:
+    """Remove images by `docker image rm` command, with multiple images in each
+    call."""
+    from bollard.image.data import list_image_ids
+
+    args = ["image", "rm"] + rebuild_args(options, _DOCKER_OPTIONS)
+    image_ids = list(steps)
+    for i in range(0, len(image_ids), BATCH_SIZE):
+        batch = image_ids[i : i + BATCH_SIZE]
+        refs = [ref for id_ in batch for ref in steps[id_]]
+
+        progress.clear()
+        if run_docker(args + refs).returncode == 0:
+            result.removed.extend(batch)
+        else:
+            # docker removes the others when some of them failed
+            remains = list_image_ids(incl_interm_img=True)
+            for id_ in batch:
+                if any(is_same_image(id_, r) for r in remains):
+                    result.failed[id_] = "see docker output"
+                else:
+                    result.removed.append(id_)
+
+        progress.advance(len(batch))
+
+
+def is_same_image(short_id: str, full_id: str) -> bool:
+    return full_id.removeprefix("sha256:").startswith(short_id.removeprefix("sha256:"))
+
+
 def select_images(selectors: Sequence[str]) -> list[str]:
-    from bollard.image.data import inspect_image, list_image_ids
-    from bollard.image.selector import is_image_match_selector
+    from bollard.image.data import (
+        can_push_down_filters,
+        list_image_ids,
+        match_images,
+        plan_sources,
+    )
+    from bollard.image.selector import compile_selectors, to_reference_filters
 
-    selected = []
-    for data in inspect_image(list_image_ids()):
-        for selector in selectors:
-            if is_image_match_selector(data, selector):
-                selected.append(data["Id"])
-                break
+    filters = []
+    if can_push_down_filters(False, ()):
+        filters = to_reference_filters(selectors, match_all=False)
 
-    return selected
+    matcher = compile_selectors(selectors)
+    image_ids = list_image_ids(filters=filters)
+    return match_images(image_ids, matcher, plan_sources((), selectors))
 
 
 def interactive_select_image() -> set[str]:
     from gettext import gettext as t
 
-    from bollard.image.data import collect_fields, list_image_ids
-    from bollard.image.display import build_table
+    from bollard.image.data import format_rows, iter_raw_fields, list_image_ids
+    from bollard.image.display import RELATIVE_TIME_WIDTH, get_table_spec
     from bollard.utils import interactive_select
+    from bollard.utils.table import render_table
 
     COLUMNS = ["id", "size", "created", "repo_tag"]
 
     # get data
     image_ids = list_image_ids()
-    image_data = collect_fields(image_ids, COLUMNS)
-
-    # format into colored table
-    last_id = None
-    for data in image_data:
-        # sometimes one image have multiple name and tags
-        # check if image on current row is the same as last row
-        is_duplicated = (id_ := data["id"]) == last_id
-        last_id = id_
+    if not image_ids:
+        return set()
 
-        if is_duplicated:
-            # set these fields to gray for duplicated image
-            for field in ("id", "size", "created"):
-                data[field] = click.style(data[field], fg=242)
-        else:
-            data["id"] = click.style(data["id"], fg="cyan", bold=True)
-            data["size"] = click.style(data["size"], fg="yellow", dim=True)
+    # use fixed width columns, so rows could be sent to fzf once rendered
+    table_spec = get_table_spec(COLUMNS)
+    table_spec["created"] = {**table_spec["created"], "width": RELATIVE_TIME_WIDTH}
 
-    head, *rows = build_table(COLUMNS, image_data).splitlines()
+    rows = format_rows(COLUMNS, iter_raw_fields(image_ids, COLUMNS))
+    lines = render_table(table_spec, style_rows(rows))
+    head = next(lines)
 
     # call fzf
     selected = interactive_select(
         prompt=t("Tab to select images to remove, enter to continue."),
         header=head,
-        items=rows,
+        items=lines,
+        preview=get_preview_command(),
     )
 
     # extract id
@@ -130,3 +565,30 @@ def interactive_select_image() -> set[str]:
         output.add(id_)
 
     return output
+
+
+def get_preview_command() -> str:
+    """Get the command for fzf to preview the image on the first field."""
+    import shlex
+
+    return shlex.join([sys.executable, "-m", "bollard", "image", "preview"]) + " {1}"
+
+
+def style_rows(rows: Iterable[dict[str, str]]) -> Iterator[dict[str, str]]:
+    """Colorize the rows for interactive selection."""
+    last_id = None
+    for data in rows:
+        # sometimes one image have multiple name and tags
+        # check if image on current row is the same as last row
+        is_duplicated = (id_ := data["id"]) == last_id
+        last_id = id_
+
+        if is_duplicated:
+            # set these fields to gray for duplicated image
+            for field in ("id", "size", "created"):
+                data[field] = click.style(data[field], fg=242)
+        else:
+            data["id"] = click.style(data["id"], fg="cyan", bold=True)
+            data["size"] = click.style(data["size"], fg="yellow", dim=True)
+
+        yield data
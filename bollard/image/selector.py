@@ -1,104 +1,198 @@
 import logging
-from typing import Iterator, Pattern
+import typing
+from typing import Iterator, NamedTuple, Pattern, Sequence
+
+if typing.TYPE_CHECKING:
+    from bollard.image.index import ImageIndex
+    from bollard.image.record import ImageRecord
 
 logger = logging.getLogger(__name__)
 
 __warned_selector = set()
 
 
-def is_image_match_selector(metadata: dict, selector: str) -> bool:
-    from bollard.utils import split_repo_tag
+class CompiledSelector:
+    """Selectors compiled into one pattern per field.
+
+    With `match_all`, an image must match every selector ('AND' operation);
+    otherwise matching any of them is enough ('OR' operation)."""
+
+    def __init__(self, selectors: Sequence[str], match_all: bool) -> None:
+        self.selectors = tuple(selectors)
+        globs = [translate_globs(s) for s in selectors]
+        if match_all:
+            self._groups = globs
+        else:
+            self._groups = [[g for group in globs for g in group]]
+        self._patterns = [_merge_patterns(group) for group in self._groups]
+
+    def match(self, record: "ImageRecord") -> bool:
+        return all(_match_fields(record, patterns) for patterns in self._patterns)
+
+    def candidates(self, index: "ImageIndex") -> set[str] | None:
+        """Get the ids of images that could match the selectors through the
+        index. The result is a superset of matched images, and it returns None
+        when a full scan is required."""
+        output = None
+        for group in self._groups:
+            ids = set()
+            for glob in group:
+                if (found := index.lookup(glob.field, glob.pattern)) is None:
+                    ids = None
+                    break
+                ids |= found
+
+            if ids is not None:
+                output = ids if output is None else output & ids
+
+        return output
+
+
+def compile_selectors(
+    selectors: Sequence[str], match_all: bool = False
+) -> CompiledSelector:
+    return CompiledSelector(selectors, match_all)
+
+
+def _merge_patterns(globs: Sequence["Glob"]) -> dict[str, Pattern]:
+    """Merge patterns into one alternation per field."""
+    import re
+
+    sources: dict[str, dict[str, None]] = {}
+    for glob in globs:
+        pattern = glob.to_regex()
+        source = pattern.pattern
+        if glob.ignore_case:
+            source = f"(?i:{source})"
+        sources.setdefault(glob.field, {})[f"(?:{source})"] = None
+
+    return {
+        field: re.compile("|".join(items), re.RegexFlag.ASCII)
+        for field, items in sources.items()
+    }
 
-    for type_, pattern in translate_selector(selector):
+
+def _match_fields(record: "ImageRecord", patterns: dict[str, Pattern]) -> bool:
+    for type_, pattern in patterns.items():
         match type_:
             case "ID":
-                if pattern.fullmatch(metadata["Id"]):
+                if pattern.fullmatch(record.id):
                     return True
             case "DIGEST":
-                values = metadata.get("RepoDigests", [])
-                if any(pattern.search(v) for v in values):
+                values = {v.partition("@")[2] for v in record.repo_digests}
+                if any(pattern.fullmatch(v) for v in values):
                     return True
             case "REGISTRY" | "NAME" | "TAG":
                 v_place = {"REGISTRY": 0, "NAME": 1, "TAG": 2}[type_]
-                values = set()
-                for repo_tag in metadata.get("RepoTags", []):
-                    value = split_repo_tag(repo_tag)[v_place]
-                    values.add(value)
+                values = {repo_tag[v_place] for repo_tag in record.repo_tags}
                 if any(pattern.fullmatch(v) for v in values):
                     return True
             case "REPO":
-                values = set()
-                for repo_tag in metadata.get("RepoTags", []):
-                    registry, name, _ = split_repo_tag(repo_tag)
-                    if registry:
-                        values.add(f"{registry}/{name}")
-                    else:
-                        values.add(name)
+                values = {repo_tag.repository for repo_tag in record.repo_tags}
                 if any(pattern.fullmatch(v) for v in values):
                     return True
             case "REPO_TAG":
                 values = set()
-                for repo_tag in metadata.get("RepoTags", []):
-                    values.add(repo_tag)
-                    registry, name, tag = split_repo_tag(repo_tag)
-                    if registry:
-                        values.add(f"{name}:{tag}")
+                for repo_tag in record.repo_tags:
+                    values.add(str(repo_tag))
+                    if repo_tag.registry:
+                        values.add(f"{repo_tag.name}:{repo_tag.tag}")
                 if any(pattern.fullmatch(v) for v in values):
                     return True
     return False
 
 
-def translate_selector(selector: str) -> list[tuple[str, Pattern]]:
-    """Translate selector to regex patterns"""
-    output = list(_translate_selector(selector))
-    if not output and selector not in __warned_selector:
-        logger.warning("Selector '%s' is not a valid pattern", selector)
-        __warned_selector.add(selector)
-    return output
+def to_reference_filters(selectors: Sequence[str], match_all: bool) -> list[str]:
+    """Translate selectors into docker's `reference` filters, which select a
+    superset of the matched images. Returns an empty list when the selectors
+    could not be expressed safely."""
+    references = [_to_reference(s) for s in selectors]
+    if match_all:
+        # any one of them narrows down the result
+        references = [r for r in references if r][:1]
+    elif not all(references):
+        return []
+    return [f"reference={r}" for r in dict.fromkeys(references)]
+
 
+def _to_reference(selector: str) -> str | None:
+    """Get the repository name in the selector. Only the selectors with literal
+    repository name are translated, since wildcard in docker's filter does not
+    match the slashes.
 
-def _translate_selector(selector: str) -> Iterator[tuple[str, Pattern]]:
+    Tag is left to client-side matching as the filter is case-sensitive."""
     import re
 
-    def build_regex(pattern: str, allowed_chars: str, ignore_case: bool) -> str:
-        pattern = pattern.replace(r".", r"\.")
-        pattern = pattern.replace(r"*", f"[{allowed_chars}]*")
+    if "/" not in selector:
+        return None
+
+    repository, sep, tag = selector.rpartition(":")
+    if not sep or "/" in tag:
+        repository = selector
+
+    component = r"[a-z0-9]+(?:[._-]+[a-z0-9]+)*"
+    regex_repository = re.compile(rf"{component}(?::[0-9]+)?(?:/{component})+", re.I)
+    if not regex_repository.fullmatch(repository):
+        return None
+
+    return repository.lower()
+
+
+class Glob(NamedTuple):
+    """Wildcard pattern on one field of image."""
+
+    field: str
+    pattern: str
+    allowed_chars: str
+    ignore_case: bool
+
+    def to_regex(self) -> Pattern:
+        import re
+
+        pattern = self.pattern.replace(r".", r"\.")
+        pattern = pattern.replace(r"*", f"[{self.allowed_chars}]*")
 
         flag = re.RegexFlag.ASCII
-        if ignore_case:
+        if self.ignore_case:
             flag |= re.RegexFlag.IGNORECASE
 
         return re.compile(pattern, flag)
 
+
+def translate_globs(selector: str) -> list[Glob]:
+    """Translate selector to the wildcard patterns on image fields"""
+    output = list(_translate_selector(selector))
+    if not output and selector not in __warned_selector:
+        logger.warning("Selector '%s' is not a valid pattern", selector)
+        __warned_selector.add(selector)
+    return output
+
+
+def _translate_selector(selector: str) -> Iterator[Glob]:
+    import re
+
     regex_hex = re.compile(r"(sha256:)?([0-9a-f]{2,64})", re.I)
     if m := regex_hex.fullmatch(selector):
         digest = m.group(2).lower()
-        yield "ID", re.compile(f"sha256:{digest}[0-9a-f]*")
-        yield "DIGEST", re.compile(f"@sha256:{digest}[0-9a-f]*$")
+        yield Glob("ID", f"sha256:{digest}*", "0-9a-f", False)
+        yield Glob("DIGEST", f"sha256:{digest}*", "0-9a-f", False)
 
     regex_tag = re.compile(r":([a-z0-9_*][a-z0-9._*-]{,127})", re.I)
     if m := regex_tag.fullmatch(selector):
-        pattern = m.group(1)
-        pattern = build_regex(pattern, r"a-z0-9._-", True)
-        yield "TAG", pattern
+        yield Glob("TAG", m.group(1), r"a-z0-9._-", True)
 
     regex_name = re.compile(r"[a-z0-9*][a-z0-9*._-]+", re.I)
     if m := regex_name.fullmatch(selector):
         pattern = selector.lower()
-        yield "NAME", build_regex(pattern, r"a-z0-9._-", False)
-        yield "REGISTRY", build_regex(pattern, r"a-z0-9.-", False)
-
-        regex_repo = build_regex(pattern, r"a-z0-9/._-", False)
-        if selector.startswith("*"):
-            yield "REPO", regex_repo
-        if selector.endswith("*"):
-            yield "REPO", regex_repo
+        yield Glob("NAME", pattern, r"a-z0-9._-", False)
+        yield Glob("REGISTRY", pattern, r"a-z0-9.-", False)
+        if selector.startswith("*") or selector.endswith("*"):
+            yield Glob("REPO", pattern, r"a-z0-9/._-", False)
 
     # test for valid chars
     regex_valid_chars = re.compile(r"([a-z0-9/:*._-]+)")
     if regex_valid_chars.fullmatch(selector):
-        regex_any = build_regex(selector, r"a-z0-9/:._-", True)
         if selector.rfind(":") > 0:
-            yield "REPO_TAG", regex_any
+            yield Glob("REPO_TAG", selector, r"a-z0-9/:._-", True)
         elif "/" in selector:
-            yield "REPO", regex_any
+            yield Glob("REPO", selector, r"a-z0-9/:._-", True)
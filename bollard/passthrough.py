@@ -0,0 +1,95 @@
+"""Fast path for the commands that bollard does not wrap. This module must not
+import click or any other bollard module, since it runs before them."""
+
+import os
+from collections.abc import Sequence
+
+# docker's global options that take a value, and the ones that do not
+_OPTIONS_WITH_VALUE = frozenset(
+    {
+        "--config",
+        "--context",
+        "--host",
+        "--log-level",
+        "--tlscacert",
+        "--tlscert",
+        "--tlskey",
+        "-H",
+        "-c",
+        "-l",
+    }
+)
+_FLAGS = frozenset({"--debug", "--tls", "--tlsverify", "-D"})
+
+# commands implemented by bollard; for groups, the subcommands (and aliases) that
+# are implemented, or None when the whole command is handled by bollard
+# keep in sync with the registered commands; it is verified by tests
+WRAPPED_COMMANDS: dict[str, frozenset[str] | None] = {
+    "completion": None,
+    "daemon": None,
+    "image": frozenset({"cleanup", "list", "ls", "preview", "remove", "rm", "rmi"}),
+    "version": None,
+}
+
+# aliases on the main command
+ALIASES = {
+    "containers": ("container", "ls"),
+    "images": ("image", "ls"),
+    "networks": ("network", "ls"),
+    "rmi": ("image", "rm"),
+    "volumes": ("volume", "ls"),
+}
+
+
+def exec_unwrapped(argv: Sequence[str]) -> None:
+    """Replace current process with docker when the command is not wrapped by
+    bollard. Returns when bollard should handle it, or docker is not found."""
+    if os.getenv("_BOLLARD_COMPLETE"):
+        return
+    if (args := get_passthrough_args(argv)) is None:
+        return
+
+    try:
+        os.execvp("docker", ["docker", *args])
+    except OSError:
+        pass  # leave the error message to the full interface
+
+
+def get_passthrough_args(argv: Sequence[str]) -> list[str] | None:
+    """Get the arguments for docker with the aliases expanded. Returns None when
+    the command is wrapped by bollard or could not be decided without parsing."""
+    i = count_global_options(argv)
+    if i is None or i >= len(argv):
+        return None
+
+    options = list(argv[:i])
+    name, *args = argv[i:]
+    if expanded := ALIASES.get(name):
+        name, *args = *expanded, *args
+
+    if is_wrapped(name, args):
+        return None
+    return [*options, name, *args]
+
+
+def count_global_options(argv: Sequence[str]) -> int | None:
+    """Get number of the leading arguments that are docker's global options.
+    Returns None when there is unknown option."""
+    i = 0
+    while i < len(argv) and argv[i].startswith("-"):
+        name, eq, _ = argv[i].partition("=")
+        if name in _OPTIONS_WITH_VALUE:
+            i += 1 if eq else 2
+        elif name in _FLAGS and not eq:
+            i += 1
+        else:
+            return None  # e.g. --help
+    return i
+
+
+def is_wrapped(name: str, args: Sequence[str]) -> bool:
+    if name not in WRAPPED_COMMANDS:
+        return False
+    if (subcommands := WRAPPED_COMMANDS[name]) is None:
+        return True
+    return not args or args[0].startswith("-") or args[0] in subcommands
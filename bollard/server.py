@@ -0,0 +1,285 @@
+import contextlib
+import json
+import logging
+import socketserver
+import sys
+import threading
+import time
+import typing
+from typing import Any, Iterator
+
+import click
+
+from bollard.core import main
+
+if typing.TYPE_CHECKING:
+    from bollard.image.cache import ImageCache
+
+# seconds to wait for the running command before telling the client to run the
+# command by itself
+BUSY_TIMEOUT = 0.5
+
+logger = logging.getLogger(__name__)
+
+
+@main.command()
+@click.option(
+    "--cache-entries",
+    type=click.IntRange(min=1),
+    default=50000,
+    show_default=True,
+    help="Max number of images kept in each in-memory cache",
+)
+@click.option(
+    "--cache-size",
+    type=click.IntRange(min=1),
+    default=256,
+    show_default=True,
+    help="Max memory (in MiB) used by each in-memory cache",
+)
+def daemon(cache_entries: int, cache_size: int):
+    """Run bollard daemon in foreground
+
+    The daemon keeps the image index in memory, and keeps it in sync with the
+    events from docker daemon. Non-interactive commands (e.g. `image ls`) are
+    forwarded to the daemon when it is running, which saves the startup and
+    metadata query time.
+    """
+    from bollard.core.daemon import get_socket_path
+    from bollard.image.data import set_cache_limits
+    from bollard.utils import is_docker_ready
+
+    if not is_docker_ready():
+        sys.exit(1)
+
+    path = get_socket_path()
+    if is_daemon_running(path):
+        logger.error("Bollard daemon is already running on %s", path)
+        sys.exit(1)
+
+    set_cache_limits(cache_entries, cache_size * 2**20)
+    serve(path)
+
+
+def is_daemon_running(path: str) -> bool:
+    """Check if the daemon is running. Remove the socket file if it is stale."""
+    import os
+    import socket
+
+    if not os.path.exists(path):
+        return False
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        try:
+            s.connect(path)
+            return True
+        except OSError:
+            pass
+
+    os.unlink(path)
+    return False
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str) -> None:
+        # commands are ran one by one, since they share the process-wide states
+        # (e.g. caches and log level), and the lock is shared with events follower
+        self.lock = threading.Lock()
+        super().__init__(path, RequestHandler)
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    server: DaemonServer
+
+    def handle(self) -> None:
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError:
+            return
+
+        # do not queue behind a slow command; client runs it by itself instead
+        if self.server.lock.acquire(timeout=BUSY_TIMEOUT):
+            try:
+                response = handle_request(request)
+            finally:
+                self.server.lock.release()
+        else:
+            response = {"status": "busy"}
+
+        self.wfile.write(json.dumps(response).encode() + b"\n")
+
+
+def serve(path: str) -> None:
+    import os
+    import signal
+
+    import bollard.core.daemon
+    from bollard.image.data import get_disk_cache, list_default_summaries
+
+    bollard.core.daemon.IN_DAEMON = True
+
+    # warm up
+    list_default_summaries()
+
+    old_umask = os.umask(0o077)
+    try:
+        server = DaemonServer(path)
+    finally:
+        os.umask(old_umask)
+
+    stop = threading.Event()
+    follower = threading.Thread(
+        target=follow_events, args=(get_disk_cache(), server.lock, stop), daemon=True
+    )
+    follower.start()
+
+    # shutdown gracefully on termination
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    logger.info("Bollard daemon is listening on %s", path)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+        os.unlink(path)
+        get_disk_cache().save()
+
+
+def handle_request(request: dict[str, Any]) -> dict[str, Any]:
+    """Run the command in the request and returns the outputs."""
+    from bollard.constants import pkg_version
+    from bollard.image.data import get_cache_stats, get_disk_cache, reset_disk_usage
+    from bollard.utils import api
+
+    if not isinstance(request, dict):
+        return {"status": "error", "message": "invalid request"}
+    if request.get("version") != pkg_version:
+        return {"status": "unsupported"}
+    if request.get("endpoint") != api.get_socket_path():
+        return {"status": "unsupported"}
+    if not isinstance(args := request.get("args"), list):
+        return {"status": "error", "message": "invalid arguments"}
+
+    # disk usage is kept for one invocation
+    reset_disk_usage()
+    exit_code, stdout, stderr = run_command(args, request.get("color"))
+    # changes from the events are written here, once per command
+    get_disk_cache().save()
+    logger.debug("Cache stats: %s", get_cache_stats())
+    return {
+        "status": "ok",
+        "exit_code": exit_code,
+        "stdout": stdout,
+        "stderr": stderr,
+    }
+
+
+def run_command(args: list[str], color: bool | None) -> tuple[int, str, str]:
+    """Run bollard command in current process and capture the outputs."""
+    import io
+
+    stdout, stderr = io.StringIO(), io.StringIO()
+    with capture_outputs(stdout, stderr):
+        exit_code = invoke_main(args, color)
+
+    return exit_code, stdout.getvalue(), stderr.getvalue()
+
+
+class ThreadLocalStream:
+    """Stream proxy that writes to the stream set for current thread, or to the
+    original one. The server is threaded, so replacing `sys.stdout` for the
+    whole process would capture outputs (e.g. logs) from the other threads."""
+
+    def __init__(self, default: typing.TextIO) -> None:
+        self._default = default
+        self._local = threading.local()
+
+    def set(self, stream: typing.TextIO | None) -> None:
+        self._local.stream = stream
+
+    def __getattr__(self, name: str) -> Any:
+        stream = getattr(self._local, "stream", None) or self._default
+        return getattr(stream, name)
+
+
+@contextlib.contextmanager
+def capture_outputs(stdout: typing.TextIO, stderr: typing.TextIO) -> Iterator[None]:
+    """Redirect stdout and stderr of current thread."""
+    proxies = []
+    for name, stream in (("stdout", stdout), ("stderr", stderr)):
+        if not isinstance(proxy := getattr(sys, name), ThreadLocalStream):
+            proxy = ThreadLocalStream(proxy)
+            setattr(sys, name, proxy)
+        proxy.set(stream)
+        proxies.append(proxy)
+
+    try:
+        yield
+    finally:
+        for proxy in proxies:
+            proxy.set(None)
+
+
+def invoke_main(args: list[str], color: bool | None) -> int:
+    try:
+        rv = main.main(args, "bollard", standalone_mode=False, color=color)
+    except click.ClickException as e:
+        e.show()
+        return e.exit_code
+    except click.Abort:
+        click.echo("Aborted!", err=True)
+        return 1
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        return 1
+    except Exception:
+        logger.exception("Unexpected error on command: %s", args)
+        return 1
+
+    return rv if isinstance(rv, int) else 0
+
+
+def follow_events(
+    cache: "ImageCache", lock: threading.Lock, stop: threading.Event
+) -> None:
+    """Keep the image listing in sync with the events stream."""
+    from bollard.image import events
+    from bollard.utils import api
+
+    while not stop.is_set():
+        try:
+            cache.live = True
+            for event in events.stream_events(cache.checkpoint or time.time_ns()):
+                with lock:
+                    apply_event(cache, event)
+        except (OSError, ValueError, api.APIError) as e:
+            logger.warning("Lost connection to events stream: %s", e)
+        finally:
+            cache.live = False
+
+        stop.wait(5)
+
+
+def apply_event(cache: "ImageCache", event: dict[str, Any]) -> None:
+    from bollard.image import events
+    from bollard.image.data import discard_images
+
+    if event.get("Action") == "delete":
+        discard_images([event["Actor"]["ID"]], save=False)
+
+    if cache.listing is None:
+        return
+
+    if events.apply_events(cache.listing, [event]):
+        cache.set_listing(
+            cache.listing.values(), event.get("timeNano") or time.time_ns()
+        )
+    else:
+        # full refresh on next query
+        cache.set_listing(None, 0)
@@ -1,8 +1,12 @@
 from bollard.utils.format import (
     format_digest,
+    format_docker_size,
     format_iso_time,
     format_relative_time,
     format_size,
+    parse_duration,
+    parse_size,
+    parse_timestamp,
 )
 from bollard.utils.name import split_repo_tag
 from bollard.utils.params import append_parameters, rebuild_args
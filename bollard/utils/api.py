@@ -0,0 +1,465 @@
+import functools
+import json
+import logging
+import os
+import socket
+import threading
+import typing
+from typing import Any, Iterator, Mapping, NamedTuple, Sequence
+
+DEFAULT_SOCKET_PATH = "/var/run/docker.sock"
+
+DEFAULT_CONTEXT = "default"
+
+# seconds to wait on connect and each read; `/system/df` could take a while on
+# hosts with lots of images
+TIMEOUT = 60
+
+logger = logging.getLogger(__name__)
+
+
+class APIError(Exception):
+    """Error response from docker daemon."""
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(status, message)
+        self.status = status
+        self.message = message
+
+    def __str__(self) -> str:
+        return f"{self.message} (HTTP {self.status})"
+
+
+class FilterError(ValueError):
+    """The filter is not in `key=value` form."""
+
+
+class Request(NamedTuple):
+    method: str
+    path: str
+    query: Mapping[str, Any] | None = None
+    body: Any = None
+
+
+class Response(NamedTuple):
+    status: int
+    reason: str
+    headers: dict[str, str]
+    body: bytes
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+    def raise_for_status(self) -> None:
+        if self.status < 400:
+            return
+        message = self.reason
+        try:
+            message = self.json()["message"]
+        except (ValueError, KeyError, TypeError):
+            pass
+        raise APIError(self.status, message)
+
+
+def get_socket_path() -> str | None:
+    """Get path to the daemon socket that docker cli targets. Returns None when
+    the daemon is not listening on an unix socket, e.g. `DOCKER_HOST` points to a
+    tcp address, or the endpoint could not be resolved."""
+    if host := os.getenv("DOCKER_HOST"):
+        return get_unix_path(host)
+
+    context = get_current_context()
+    if context == DEFAULT_CONTEXT:
+        return DEFAULT_SOCKET_PATH
+    return get_unix_path(get_context_host(context) or "")
+
+
+def get_unix_path(host: str) -> str | None:
+    if host.startswith("unix://"):
+        return host.removeprefix("unix://")
+    return None
+
+
+def get_config_dir() -> str:
+    return os.getenv("DOCKER_CONFIG") or os.path.expanduser("~/.docker")
+
+
+def get_current_context() -> str:
+    """Get name of the docker context in use, resolved in the same order as
+    docker cli: `DOCKER_CONTEXT`, then `currentContext` in config file."""
+    if context := os.getenv("DOCKER_CONTEXT"):
+        return context
+
+    try:
+        with open(os.path.join(get_config_dir(), "config.json"), "rb") as fd:
+            config = json.load(fd)
+    except FileNotFoundError:
+        return DEFAULT_CONTEXT
+    except (OSError, ValueError) as e:
+        logger.debug("Failed to read docker config: %s", e)
+        return DEFAULT_CONTEXT
+
+    return config.get("currentContext") or DEFAULT_CONTEXT
+
+
+def get_context_host(context: str) -> str | None:
+    """Get the docker endpoint of the context from its metadata. Returns None
+    when it is not available."""
+    import hashlib
+
+    digest = hashlib.sha256(context.encode()).hexdigest()
+    path = os.path.join(get_config_dir(), "contexts", "meta", digest, "meta.json")
+    try:
+        with open(path, "rb") as fd:
+            meta = json.load(fd)
+        return meta["Endpoints"]["docker"]["Host"]
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.debug("Failed to read metadata of context %s: %s", context, e)
+        return None
+
+
+class Connection:
+    """HTTP/1.1 connection to the docker daemon over unix socket.
+
+    This is a minimal client that only implements the part of HTTP used by
+    the Engine API. Responses are read according to `Content-Length` or chunked
+    transfer encoding."""
+
+    def __init__(self, path: str, timeout: float | None = None) -> None:
+        self.path = path
+        self.timeout = timeout
+        self._sock: socket.socket | None = None
+        self._fp: typing.BinaryIO | None = None
+
+    @property
+    def is_connected(self) -> bool:
+        return self._sock is not None
+
+    def __enter__(self) -> "Connection":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def connect(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        self._sock = sock
+        self._fp = sock.makefile("rb")
+
+    def close(self) -> None:
+        if self._fp:
+            self._fp.close()
+            self._fp = None
+        if self._sock:
+            self._sock.close()
+            self._sock = None
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        query: Mapping[str, Any] | None = None,
+        body: Any = None,
+    ) -> Response:
+        self.send(method, path, query, body)
+        return self.read_response(method)
+
+    def send(
+        self,
+        method: str,
+        path: str,
+        query: Mapping[str, Any] | None = None,
+        body: Any = None,
+    ) -> None:
+        if not self._sock:
+            self.connect()
+        self._sock.sendall(build_request(method, path, query, body))
+
+    def read_response(self, method: str = "GET") -> Response:
+        status, reason, headers = self._read_head()
+
+        if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+            body = b""
+        elif headers.get("transfer-encoding", "").lower() == "chunked":
+            body = b"".join(self._iter_chunks())
+        elif (length := headers.get("content-length")) is not None:
+            body = self._read_exact(int(length))
+        else:
+            body = self._fp.read()
+            self.close()
+
+        if headers.get("connection", "").lower() == "close":
+            self.close()
+
+        return Response(status, reason, headers, body)
+
+    def stream(
+        self, method: str, path: str, query: Mapping[str, Any] | None = None
+    ) -> Iterator[bytes]:
+        """Send the request and yields the response body in chunks as they are
+        received. For endpoints that keep the response open, e.g. `/events`.
+
+        The timeout applies until the response head is received; the body could
+        be idle for long."""
+        self.send(method, path, query)
+        status, reason, headers = self._read_head()
+        self._sock.settimeout(None)
+
+        if status >= 400:
+            body = self._read_exact(int(headers.get("content-length", 0)))
+            Response(status, reason, headers, body).raise_for_status()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            yield from self._iter_chunks()
+        else:
+            while chunk := self._fp.read1(65536):
+                yield chunk
+
+        self.close()
+
+    def _read_head(self) -> tuple[int, str, dict[str, str]]:
+        if not self._fp:
+            raise ConnectionError("Connection is not established")
+
+        line = self._fp.readline(65537)
+        if not line:
+            raise ConnectionError("Connection closed by daemon")
+
+        # e.g. `HTTP/1.1 200 OK`
+        _, status, *reason = line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+
+        headers = {}
+        while line := self._fp.readline(65537):
+            if line in (b"\r\n", b"\n"):
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+
+        return int(status), "".join(reason), headers
+
+    def _iter_chunks(self) -> Iterator[bytes]:
+        while True:
+            line = self._fp.readline(65537)
+            if not line:
+                raise ConnectionError("Connection closed by daemon")
+            size = int(line.split(b";", 1)[0], 16)
+            if size == 0:
+                # skip trailers
+                while (line := self._fp.readline(65537)) not in (b"\r\n", b"\n", b""):
+                    pass
+                return
+            yield self._read_exact(size)
+            self._read_exact(2)  # CRLF after chunk data
+
+    def _read_exact(self, size: int) -> bytes:
+        data = self._fp.read(size)
+        if len(data) < size:
+            raise ConnectionError("Connection closed by daemon")
+        return data
+
+
+def build_request(
+    method: str,
+    path: str,
+    query: Mapping[str, Any] | None = None,
+    body: Any = None,
+) -> bytes:
+    """Build raw HTTP request bytes."""
+    from urllib.parse import quote, urlencode
+
+    from bollard.constants import pkg_version
+
+    target = quote(path, safe="/:@")
+    if query := encode_query(query):
+        target += "?" + urlencode(query)
+
+    lines = [
+        f"{method} {target} HTTP/1.1",
+        "Host: docker",
+        f"User-Agent: bollard/{pkg_version}",
+    ]
+
+    payload = b""
+    if body is not None:
+        payload = json.dumps(body).encode()
+        lines += ["Content-Type: application/json"]
+    if payload or method in ("POST", "PUT"):
+        lines += [f"Content-Length: {len(payload)}"]
+
+    head = "\r\n".join(lines) + "\r\n\r\n"
+    return head.encode("latin-1") + payload
+
+
+def encode_query(query: Mapping[str, Any] | None) -> dict[str, str]:
+    """Encode query parameters into the form that the Engine API accepts."""
+    output = {}
+    for key, value in (query or {}).items():
+        if value is None:
+            continue
+        elif isinstance(value, bool):
+            output[key] = "1" if value else "0"
+        elif isinstance(value, (dict, list)):
+            output[key] = json.dumps(value)
+        else:
+            output[key] = str(value)
+    return output
+
+
+def build_filters(filters: Sequence[str]) -> dict[str, list[str]]:
+    """Convert docker cli style `key=value` filters into the Engine API form."""
+    output = {}
+    for f in filters:
+        key, sep, value = f.partition("=")
+        if not sep:
+            raise FilterError(f"Bad format of filter (expected name=value): {f}")
+        output.setdefault(key.strip().lower(), []).append(value)
+    return output
+
+
+class ConnectionPool:
+    """Keeps idle keep-alive connections to the daemon for reuse, so all the
+    requests in one process could share the same connection."""
+
+    def __init__(self, path: str, max_idle: int = 4, window: int = 32) -> None:
+        self.path = path
+        self.max_idle = max_idle
+        self.window = window
+        self._idle: list[Connection] = []
+        self._lock = threading.Lock()
+
+    def acquire(self) -> tuple[Connection, bool]:
+        """Get a connection. Returns the connection object and a flag indicates
+        if it is a reused one."""
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+        return Connection(self.path, TIMEOUT), False
+
+    def release(self, conn: Connection) -> None:
+        """Return the connection to the pool."""
+        if not conn.is_connected:
+            return
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        query: Mapping[str, Any] | None = None,
+        body: Any = None,
+    ) -> Response:
+        (rv,) = self.pipeline([Request(method, path, query, body)])
+        return rv
+
+    def pipeline(self, requests: Sequence[Request]) -> list[Response]:
+        """Send the requests over one connection without waiting for each
+        response, and returns the responses in the same order.
+
+        Requests are sent in batches of :py:attr:`window` to prevent both sides
+        from blocking on full socket buffers."""
+        output = []
+        for i in range(0, len(requests), self.window):
+            output += self._exchange(requests[i : i + self.window])
+        return output
+
+    def _exchange(self, requests: Sequence[Request]) -> list[Response]:
+        conn, reused = self.acquire()
+
+        responses = []
+        try:
+            for req in requests:
+                logger.debug(
+                    "Invoke engine API: %s %s %s",
+                    req.method,
+                    req.path,
+                    req.query or "",
+                )
+                conn.send(*req)
+            for req in requests:
+                responses.append(conn.read_response(req.method))
+
+        except OSError:
+            conn.close()
+            # idle connection could be closed by the daemon; nothing is processed
+            # when no response is received, so it is safe to retry
+            if reused and not responses:
+                return self._exchange(requests)
+            raise
+
+        self.release(conn)
+        return responses
+
+
+def get_pool() -> ConnectionPool:
+    """Get the connection pool of this process.
+
+    Raises :py:exc:`ConnectionError` when the daemon socket is not available."""
+    if not (socket_path := get_socket_path()):
+        raise ConnectionError("Docker daemon is not listening on unix socket")
+    return _get_pool(socket_path)
+
+
+@functools.cache
+def _get_pool(socket_path: str) -> ConnectionPool:
+    return ConnectionPool(socket_path)
+
+
+def request(
+    method: str,
+    path: str,
+    query: Mapping[str, Any] | None = None,
+    body: Any = None,
+) -> Response:
+    """Send a request to docker daemon.
+
+    Raises :py:exc:`ConnectionError` when the daemon socket is not available."""
+    return get_pool().request(method, path, query, body)
+
+
+def pipeline(requests: Sequence[Request]) -> list[Response]:
+    """Send multiple requests to docker daemon in a row. See
+    :py:meth:`ConnectionPool.pipeline`."""
+    if not requests:
+        return []
+    return get_pool().pipeline(requests)
+
+
+def stream_json(path: str, query: Mapping[str, Any] | None = None) -> Iterator[Any]:
+    """Send GET request to an endpoint that streams JSON objects line by line,
+    and yields the objects as they are received. It uses a dedicated connection
+    since the response could be kept open for a long time."""
+    if not (socket_path := get_socket_path()):
+        raise ConnectionError("Docker daemon is not listening on unix socket")
+
+    with Connection(socket_path, TIMEOUT) as conn:
+        buffer = b""
+        for chunk in conn.stream("GET", path, query):
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def get_json(path: str, query: Mapping[str, Any] | None = None) -> Any:
+    """Send GET request and returns the parsed JSON body. Raises
+    :py:exc:`APIError` on error response."""
+    rv = request("GET", path, query)
+    rv.raise_for_status()
+    return rv.json()
@@ -4,14 +4,14 @@ if typing.TYPE_CHECKING:
     import datetime
 
 
-def format_iso_time(s: typing.Union[str, "datetime.datetime"]) -> str:
+def format_iso_time(s: typing.Union[str, int, "datetime.datetime"]) -> str:
     t = _to_time_object(s)
     t = t.replace(microsecond=0)
     t = t.astimezone()
     return t.isoformat()
 
 
-def format_relative_time(s: typing.Union[str, "datetime.datetime"]) -> str:
+def format_relative_time(s: typing.Union[str, int, "datetime.datetime"]) -> str:
     import datetime
 
     import humanize
@@ -28,7 +28,38 @@ def format_digest(s: str, short: bool) -> str:
     return s
 
 
-def _to_time_object(s: str) -> "datetime.datetime":
+def parse_timestamp(s: typing.Union[str, int, "datetime.datetime"]) -> int:
+    """Convert time into unix timestamp in seconds."""
+    if isinstance(s, (int, float)):
+        return int(s)
+    return int(_to_time_object(s).timestamp())
+
+
+def parse_duration(s: str) -> int:
+    """Parse duration like `30m`, `12h`, `7d` or `2w` into seconds."""
+    import re
+
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+    m = re.fullmatch(r"\s*(\d+)\s*([smhdw])\s*", s.lower())
+    if not m:
+        raise ValueError(f"invalid duration: {s}")
+    return int(m.group(1)) * units[m.group(2)]
+
+
+def parse_size(s: str) -> int:
+    """Parse size like `500MB` or `10GiB` into bytes."""
+    import re
+
+    m = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*(?:([kmgtp])(i)?)?b?\s*", s.lower())
+    if not m:
+        raise ValueError(f"invalid size: {s}")
+
+    number, prefix, binary = m.groups()
+    exponent = "kmgtp".index(prefix) + 1 if prefix else 0
+    return int(float(number) * (1024 if binary else 1000) ** exponent)
+
+
+def _to_time_object(s: str | int) -> "datetime.datetime":
     import datetime
 
     if isinstance(s, str):
@@ -38,6 +69,9 @@ def _to_time_object(s: str) -> "datetime.datetime":
         t = datetime.datetime.fromisoformat(s)
         t = t.replace(tzinfo=datetime.timezone.utc)
         return t
+    elif isinstance(s, (int, float)):
+        # unix timestamp, provided by image list endpoint
+        return datetime.datetime.fromtimestamp(s, datetime.timezone.utc)
     elif isinstance(s, datetime.datetime):
         return s
     else:
@@ -48,3 +82,13 @@ def format_size(s: float) -> str:
     import humanize
 
     return humanize.naturalsize(s)
+
+
+def format_docker_size(s: float) -> str:
+    """Format size in the same form as docker cli (e.g. `1.23MB`)."""
+    units = ["B", "kB", "MB", "GB", "TB", "PB", "EB", "ZB", "YB"]
+    i = 0
+    while s >= 1000 and i < len(units) - 1:
+        s /= 1000
+        i += 1
+    return f"{s:.3g}{units[i]}"
@@ -1,7 +1,7 @@
 import functools
 import logging
 import typing
-from typing import Optional, Sequence, cast
+from typing import Iterable, Optional, Sequence, cast
 
 import click
 
@@ -23,42 +23,19 @@ def get_command_path(name: str) -> str | None:
 @functools.cache
 def is_docker_daemon_running() -> bool:
     """Check if dockerd is running."""
-    import socket
+    from bollard.utils import api
 
-    from bollard.constants import pkg_version
+    if not api.get_socket_path():
+        # daemon is not listening on unix socket, leave the check to docker cli
+        return True
 
-    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
-        try:
-            # https://docs.docker.com/engine/api/v1.18/#1-brief-introduction
-            s.connect("/var/run/docker.sock")
-
-            # https://docs.docker.com/engine/api/v1.18/#ping-the-docker-server
-            request = b"\r\n".join(
-                [
-                    b"GET /_ping HTTP/1.1",
-                    b"Host: localhost",
-                    b"User-Agent: bollard/" + pkg_version.encode(),
-                    b"Accept: text/plain",
-                    b"",
-                    b"",
-                ]
-            )
-            s.sendall(request)
-
-            response = s.recv(64)
-
-        except socket.error:
-            return False
-
-    if response:
-        # response should be like:
-        #   HTTP/1.1 200 OK
-        #   ...
-        _, code, _ = response.split(maxsplit=2)
-        if code == b"200":
-            return True
+    try:
+        # https://docs.docker.com/engine/api/v1.18/#ping-the-docker-server
+        rv = api.request("GET", "/_ping")
+    except OSError:
+        return False
 
-    return False
+    return rv.status == 200
 
 
 @functools.cache
@@ -117,19 +94,26 @@ def check_docker_output(args: Sequence[str], *, use_context: bool = True) -> byt
 
 
 def interactive_select(
-    items: Sequence[str],
+    items: Iterable[str],
     multi: bool = True,
     header: str | None = None,
     prompt: str | None = None,
+    preview: str | None = None,
 ) -> list[str]:
-    """Run fzf as an interactive interface to select the item(s)."""
-    import os
+    """Run fzf as an interactive interface to select the item(s). fzf is started
+    once the first item is available, and the items are written to it as they
+    are produced.
+
+    The `preview` is the command that fzf runs to show details of the current
+    item; placeholders like `{1}` are replaced by the fields of the item."""
+    import itertools
     import subprocess
     from gettext import gettext as t
 
     import click
 
-    if not items:
+    items = iter(items)
+    if (first := next(items, None)) is None:
         return []
 
     # check installed
@@ -158,14 +142,20 @@ def interactive_select(
         args += ["--header", header]
     if prompt:
         args += ["--prompt", prompt]
+    if preview:
+        args += ["--preview", preview, "--preview-window", "right,50%,wrap"]
 
     # run
-    data = os.linesep.join(items).encode()
-    rv = subprocess.run(
-        args,
-        input=data,
-        stdout=subprocess.PIPE,
-    )
-
-    resp = cast(bytes, rv.stdout)
+    proc = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    try:
+        # flush each item, so fzf shows it while the next ones are produced
+        for item in itertools.chain([first], items):
+            proc.stdin.write(item.encode() + b"\n")
+            proc.stdin.flush()
+        proc.stdin.close()
+    except BrokenPipeError:
+        pass  # fzf exits before all the items are written
+
+    resp = cast(bytes, proc.stdout.read())
+    proc.wait()
     return resp.decode().splitlines()
@@ -1,42 +1,135 @@
+import itertools
+from typing import Iterable, Iterator
+
+# number of rows used to decide the column widths
+LOOKAHEAD_ROWS = 100
+
+# separator between columns, and the min padding added to headers
+COLUMN_SEP = "  "
+MIN_PADDING = 2
+
+
 def tabulate(
     columns: list | dict[str, dict], data: list[dict], show_header: bool = True
-):
+) -> str:
+    return "\n".join(render_table(columns, data, show_header))
+
+
+def render_table(
+    columns: list | dict[str, dict],
+    data: Iterable[dict],
+    show_header: bool = True,
+    lookahead: int = LOOKAHEAD_ROWS,
+) -> Iterator[str]:
+    """Render the rows into lines of plain table as they are produced.
+
+    Column widths are decided by the `width` in column config, or by the rows in
+    the look-ahead window. Later cells that are wider than the column are not
+    truncated and shift the rest of the row."""
     from gettext import gettext as t
 
     import click
-    import tabulate
 
-    if not data:
-        return click.style(t("No data selected"), fg="yellow", dim=True)
+    headers, aligns, widths = get_column_configs(columns)
+
+    # build rows
+    EMPTY_MARKER = click.style("-", fg=238, dim=True)
+    rows = (
+        [str(row_data[col] or EMPTY_MARKER) for col in columns] for row_data in data
+    )
+
+    # last column needs no padding when it is left-aligned
+    if widths and widths[-1] is None and aligns[-1] == "left":
+        widths[-1] = 0
+
+    # measure the columns that width is not given
+    window = list(itertools.islice(rows, lookahead if None in widths else 1))
+
+    if not window:
+        yield click.style(t("No data selected"), fg="yellow", dim=True)
+        return
+
+    for i, header in enumerate(headers):
+        if widths[i] is None:
+            widths[i] = max(get_width(row[i]) for row in window)
+        if show_header:
+            widths[i] = max(widths[i], get_width(header) + MIN_PADDING)
 
-    # get column configs
+    # render
+    if show_header:
+        yield format_line(headers, widths, aligns)
+    for row in itertools.chain(window, rows):
+        yield format_line(row, widths, aligns)
+
+
+def align_tabs(
+    lines: Iterable[str],
+    lookahead: int = LOOKAHEAD_ROWS,
+    min_width: int = 10,
+    padding: int = 3,
+) -> Iterator[str]:
+    """Align tab-separated cells into columns as Go's tabwriter does; defaults are
+    the settings docker uses. Column widths are decided by the lines in the
+    look-ahead window and the text after the last tab is not aligned."""
+    lines = iter(lines)
+    window = list(itertools.islice(lines, lookahead))
+
+    widths = []
+    for line in window:
+        cells = line.split("\t")[:-1]
+        widths.extend([min_width] * (len(cells) - len(widths)))
+        for i, cell in enumerate(cells):
+            widths[i] = max(widths[i], get_width(cell) + padding)
+
+    for line in itertools.chain(window, lines):
+        *cells, last = line.split("\t")
+        parts = []
+        for i, cell in enumerate(cells):
+            width = widths[i] if i < len(widths) else min_width
+            parts.append(cell + " " * max(width - get_width(cell), padding))
+        parts.append(last)
+        yield "".join(parts)
+
+
+def get_column_configs(
+    columns: list | dict[str, dict],
+) -> tuple[list[str], list[str], list[int | None]]:
     headers = []
-    colalign = []
+    aligns = []
+    widths = []
     for col in columns:
-        title = col
-        align = "left"
-        if isinstance(columns, dict) and (cfg := columns[col]):
-            title = cfg.get("title", col)
-            align = cfg.get("align", align)
-        headers.append(title)
-        colalign.append(align)
+        cfg = {}
+        if isinstance(columns, dict):
+            cfg = columns[col] or {}
+        headers.append(cfg.get("title", col))
+        aligns.append(cfg.get("align", "left"))
+        widths.append(cfg.get("width"))
+    return headers, aligns, widths
 
-    if not show_header:
-        headers = ()
 
-    # build rows
-    EMPTY_MARKER = click.style("-", fg=238, dim=True)
-    rows = []
-    for row_data in data:
-        row = []
-        for col in columns:
-            row.append(row_data[col] or EMPTY_MARKER)
-        rows.append(row)
-
-    # render table
-    return tabulate.tabulate(
-        tablefmt="plain",
-        headers=headers,
-        colalign=colalign,
-        tabular_data=rows,
-    )
+def format_line(cells: list[str], widths: list[int], aligns: list[str]) -> str:
+    parts = []
+    for cell, width, align in zip(cells, widths, aligns):
+        padding = max(width - get_width(cell), 0)
+        if align == "right":
+            parts.append(" " * padding + cell)
+        elif align == "center":
+            left = padding // 2
+            parts.append(" " * left + cell + " " * (padding - left))
+        else:
+            parts.append(cell + " " * padding)
+    return COLUMN_SEP.join(parts).rstrip()
+
+
+def get_width(s: str) -> int:
+    """Get the width of the text on terminal. Styles are ignored and wide chars
+    are counted."""
+    import click
+    import wcwidth
+
+    s = click.unstyle(s)
+    if s.isascii():
+        return len(s)
+
+    width = wcwidth.wcswidth(s)
+    return width if width >= 0 else len(s)
@@ -0,0 +1,149 @@
+import re
+from typing import Any, Callable
+
+_regex_action = re.compile(r"{{(-\s)?\s*(.*?)\s*(\s-)?}}", re.DOTALL)
+_regex_field = re.compile(r"\.([A-Za-z_]\w*)?")
+
+
+class TemplateError(ValueError):
+    """The template is invalid or uses the syntax that is not supported."""
+
+
+class Template:
+    """Compiled template. Parts are either literal text or the functions that
+    evaluate the actions on the context."""
+
+    def __init__(self, parts: list[str | Callable[[dict], str]], is_table: bool):
+        self.parts = parts
+        self.is_table = is_table
+
+    def render(self, context: dict[str, Any]) -> str:
+        return "".join(p if isinstance(p, str) else p(context) for p in self.parts)
+
+
+def compile_template(text: str) -> Template:
+    """Compile the template in Go template syntax as docker's `--format` does.
+
+    Only a subset is supported: field access (`{{.Name}}`), functions `json`,
+    `upper`, `lower`, `title` and `truncate`, pipelines of them, whitespace
+    trimming markers and the `table` directive. Raises `TemplateError` for the
+    other syntax."""
+    # docker's preprocessing
+    is_table = text.startswith("table")
+    if is_table:
+        text = text.removeprefix("table").strip(" ")
+    text = text.replace(r"\t", "\t").replace(r"\n", "\n")
+
+    parts = []
+    trim_next = False
+    pos = 0
+    for m in _regex_action.finditer(text):
+        literal = text[pos : m.start()]
+        if trim_next:
+            literal = literal.lstrip()
+        if m.group(1):
+            literal = literal.rstrip()
+        parts.append(literal)
+
+        parts.append(compile_pipeline(m.group(2)))
+        trim_next = bool(m.group(3))
+        pos = m.end()
+
+    literal = text[pos:]
+    if trim_next:
+        literal = literal.lstrip()
+    if "{{" in literal or "}}" in literal:
+        raise TemplateError(f"unclosed action: {literal}")
+    parts.append(literal)
+
+    return Template([p for p in parts if p], is_table)
+
+
+def compile_pipeline(action: str) -> Callable[[dict], str]:
+    """Compile `arg`, `func arg` or `arg | func ...` into function."""
+    if not action:
+        raise TemplateError("missing value for command")
+
+    head, *funcs = (cmd.strip() for cmd in action.split("|"))
+    first = compile_command(head)
+    funcs = [compile_command(cmd, piped=True) for cmd in funcs]
+
+    def _eval(context: dict) -> str:
+        value = first(context, None)
+        for func in funcs:
+            value = func(context, value)
+        return to_text(value)
+
+    return _eval
+
+
+def compile_command(command: str, piped: bool = False) -> Callable[[dict, Any], Any]:
+    name, *args = command.split()
+    if not piped and not args and _regex_field.fullmatch(name):
+        getter = compile_field(name)
+        return lambda context, _: getter(context)
+
+    func = _FUNCTIONS.get(name)
+    if not func:
+        raise TemplateError(f'function "{name}" not defined')
+
+    getters = []
+    for arg in args:
+        if _regex_field.fullmatch(arg):
+            getters.append(compile_field(arg))
+        elif arg.isdigit():
+            getters.append(lambda _, v=int(arg): v)
+        else:
+            raise TemplateError(f"unsupported argument: {arg}")
+
+    def _call(context: dict, piped_value: Any) -> Any:
+        values = [getter(context) for getter in getters]
+        if piped:
+            values.append(piped_value)
+        try:
+            return func(*values)
+        except TypeError as e:
+            raise TemplateError(f"error calling {name}: {e}") from e
+
+    return _call
+
+
+def compile_field(expr: str) -> Callable[[dict], Any]:
+    field = expr[1:]
+    if not field:
+        return lambda context: context
+
+    def _get(context: dict) -> Any:
+        try:
+            return context[field]
+        except KeyError:
+            raise TemplateError(f"can't evaluate field {field}") from None
+
+    return _get
+
+
+def to_json(value: Any) -> str:
+    """Serialize value in the same form as Go's `json.Marshal`."""
+    import json
+
+    text = json.dumps(value, separators=(",", ":"), sort_keys=True)
+    return text.replace("<", "\\u003c").replace(">", "\\u003e").replace("&", "\\u0026")
+
+
+def to_text(value: Any) -> str:
+    if value is None:
+        return "<no value>"
+    return str(value)
+
+
+def truncate(s: Any, length: int) -> str:
+    return to_text(s)[:length]
+
+
+_FUNCTIONS = {
+    "json": to_json,
+    "lower": lambda s: to_text(s).lower(),
+    "title": lambda s: to_text(s).title(),
+    "truncate": truncate,
+    "upper": lambda s: to_text(s).upper(),
+}
@@ -11,3 +11,13 @@ def _with_click_context():
 @pytest.fixture()
 def runner() -> click.testing.CliRunner:
     return click.testing.CliRunner()
+
+
+@pytest.fixture(autouse=True)
+def _isolate_cache(monkeypatch: pytest.MonkeyPatch, tmp_path):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.setattr("bollard.image.data.__cache_disk", None)
+    monkeypatch.setattr("bollard.image.data.__cache_disk_usage", None)
+    monkeypatch.setattr("bollard.image.data.__image_index", None)
+    monkeypatch.setattr("bollard.image.data.__cache_image_data", None)
+    monkeypatch.setattr("bollard.image.data.__cache_image_summary", None)
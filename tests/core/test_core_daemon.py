@@ -0,0 +1,139 @@
+import json
+import os
+import socket
+import socketserver
+import threading
+
+import click
+import pytest
+
+import bollard.core.daemon as t
+
+
+@pytest.fixture()
+def cli():
+    @click.group()
+    def cli(): ...
+
+    @t.forwardable(lambda params: not params["interactive"])
+    @cli.command()
+    @click.option("-i", "--interactive", is_flag=True)
+    def foo(interactive): ...
+
+    @cli.command()
+    def bar(): ...
+
+    return cli
+
+
+def test_get_socket_path(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", "/run/user/1000")
+    assert t.get_socket_path() == "/run/user/1000/bollard.sock"
+    monkeypatch.delenv("XDG_RUNTIME_DIR")
+    assert t.get_socket_path().startswith("/tmp/bollard-")
+
+
+def test_is_forwardable(cli: click.Group):
+    ctx = click.Context(cli)
+    assert t.is_forwardable(ctx, ["foo"]) is True
+    assert t.is_forwardable(ctx, ["foo", "-i"]) is False
+    assert t.is_forwardable(ctx, ["bar"]) is False
+    assert t.is_forwardable(ctx, []) is False
+
+
+def test_is_forwardable_bollard():
+    from bollard.core import main
+
+    ctx = click.Context(main)
+    assert t.is_forwardable(ctx, ["image", "ls", "nginx"]) is True
+    assert t.is_forwardable(ctx, ["image", "ls", "--format", "{{.ID}}"]) is True
+    assert t.is_forwardable(ctx, ["image", "ls", "--format", "{{if .ID}}"]) is False
+    # destructive commands are never forwarded
+    assert t.is_forwardable(ctx, ["image", "rm", "-y", "nginx"]) is False
+    assert t.is_forwardable(ctx, ["image", "rm", "nginx"]) is False
+    assert t.is_forwardable(ctx, ["image", "rm", "-y"]) is False
+    assert t.is_forwardable(ctx, ["image", "cleanup", "-y"]) is False
+    assert t.is_forwardable(ctx, ["image", "cleanup", "--dry-run"]) is True
+
+
+@pytest.fixture()
+def bollard_socket(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            request = json.loads(self.rfile.readline())
+            self.server.requests.append(request)
+            response = {
+                "status": "ok",
+                "exit_code": 3,
+                "stdout": "output\n",
+                "stderr": "",
+            }
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+
+    path = str(tmp_path / "bollard.sock")
+    server = socketserver.UnixStreamServer(path, Handler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    monkeypatch.setattr(t, "get_socket_path", lambda: path)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_forward(cli: click.Group, bollard_socket, capsys: pytest.CaptureFixture):
+    ctx = click.Context(cli)
+    assert t.forward(ctx, ["foo"], ["--log-level", "debug"]) == 3
+    assert capsys.readouterr().out == "output\n"
+
+    (request,) = bollard_socket.requests
+    assert request["args"] == ["--log-level", "debug", "foo"]
+
+    # not forwardable
+    assert t.forward(ctx, ["foo", "-i"]) is None
+    assert len(bollard_socket.requests) == 1
+
+
+def test_forward_unavailable(cli: click.Group, tmp_path, monkeypatch):
+    monkeypatch.setattr(t, "get_socket_path", lambda: str(tmp_path / "no.sock"))
+    ctx = click.Context(cli)
+    assert t.forward(ctx, ["foo"]) is None
+
+
+def test_forward_timeout(cli: click.Group, tmp_path, monkeypatch):
+    # daemon accepts the connection but never responds
+    path = str(tmp_path / "bollard.sock")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+        server.bind(path)
+        server.listen()
+        monkeypatch.setattr(t, "get_socket_path", lambda: path)
+        monkeypatch.setattr(t, "FORWARD_TIMEOUT", 0.01)
+
+        ctx = click.Context(cli)
+        assert t.forward(ctx, ["foo"]) is None
+
+
+def test_is_trusted_socket(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    path = str(tmp_path / "bollard.sock")
+    assert t.is_trusted_socket(path) is False
+
+    # regular file
+    (tmp_path / "bollard.sock").touch()
+    assert t.is_trusted_socket(path) is False
+    os.unlink(path)
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.bind(path)
+        assert t.is_trusted_socket(path) is True
+
+        # created by other user
+        monkeypatch.setattr("os.getuid", lambda: os.stat(path).st_uid + 1)
+        assert t.is_trusted_socket(path) is False
+
+
+def test_forward_in_daemon(cli: click.Group, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(t, "IN_DAEMON", True)
+    monkeypatch.setattr(t, "send", None)
+    ctx = click.Context(cli)
+    assert t.forward(ctx, ["foo"]) is None
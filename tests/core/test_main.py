@@ -0,0 +1,26 @@
+import importlib
+from unittest.mock import patch
+
+import click.testing
+
+import bollard.image  # noqa: F401
+
+# the module is shadowed by the `main` command in package namespace
+t = importlib.import_module("bollard.core.main")
+
+
+def test_forward(runner: click.testing.CliRunner):
+    # log level is forwarded along with the command
+    with patch.object(t, "forward", return_value=0) as forward:
+        rv = runner.invoke(t.main, ["-l", "debug", "image", "ls"])
+    assert rv.exit_code == 0
+    forward.assert_called_once()
+    assert forward.call_args.args[1:] == (["image", "ls"], ["--log-level", "debug"])
+
+    # daemon is bound to one endpoint
+    with (
+        patch.object(t, "forward", return_value=0) as forward,
+        patch("bollard.image.ls.list_images.callback"),
+    ):
+        runner.invoke(t.main, ["-H", "unix:///tmp/other.sock", "image", "ls"])
+    forward.assert_not_called()
@@ -0,0 +1,89 @@
+import os
+
+import pytest
+
+import bollard.image.cache as t
+
+INSPECT_DATA = {
+    "Id": "sha256:aaaa",
+    "RepoTags": ["foo:latest"],
+    "RepoDigests": ["foo@sha256:bbbb"],
+    "Parent": "",
+    "Created": "2023-04-05T06:07:05.910Z",
+    "Size": 1234,
+    "Architecture": "arm64",
+    "Variant": "v8",
+    "Os": "linux",
+    "Config": {"Env": ["PATH=/usr/bin"], "Labels": {"foo": "bar"}},
+    "RootFS": {"Type": "layers", "Layers": ["sha256:cccc", "sha256:dddd"]},
+}
+
+
+def test_image_cache(tmp_path):
+    path = str(tmp_path / "test" / "images.pickle")
+
+    # empty
+    cache = t.ImageCache.load(path)
+    assert len(cache) == 0
+
+    # put & save
+    cache.put(INSPECT_DATA)
+    cache.save()
+    assert os.path.isfile(path)
+
+    # load
+    cache = t.ImageCache.load(path)
+    assert "sha256:aaaa" in cache
+    assert cache.get("sha256:aaaa", {"RepoTags": ["bar:latest"]}) == {
+        "Id": "sha256:aaaa",
+        "RepoTags": ["bar:latest"],
+        "RepoDigests": [],
+        "Parent": "",
+        "Created": "2023-04-05T06:07:05.910Z",
+        "Size": 1234,
+        "Architecture": "arm64",
+        "Variant": "v8",
+        "Os": "linux",
+        "Config": {"Labels": {"foo": "bar"}},
+        "RootFS": {"Type": "layers", "Layers": ["sha256:cccc", "sha256:dddd"]},
+    }
+    assert cache.get("sha256:ffff", {}) is None
+
+    # listing
+    cache.set_listing([{"Id": "sha256:aaaa"}], 1234)
+    cache.save()
+    cache = t.ImageCache.load(path)
+    assert cache.listing == {"sha256:aaaa": {"Id": "sha256:aaaa"}}
+    assert cache.checkpoint == 1234
+
+    # retain
+    cache.retain(["sha256:ffff"])
+    assert len(cache) == 0
+    assert cache.listing == {}
+    cache.save()
+    assert len(t.ImageCache.load(path)) == 0
+
+
+def test_image_cache_broken(tmp_path):
+    path = tmp_path / "images.pickle"
+    path.write_bytes(b"not a pickle")
+    assert len(t.ImageCache.load(str(path))) == 0
+
+
+def test_get_cache_path(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", "/tmp/test-cache")
+    path_1 = t.get_cache_path("/var/run/docker.sock")
+    path_2 = t.get_cache_path("/tmp/docker.sock")
+    assert path_1.startswith("/tmp/test-cache/bollard/")
+    assert path_1 != path_2
+
+
+def test_resolve():
+    cache = t.ImageCache()
+    cache.put({**INSPECT_DATA, "Id": "sha256:aaaa1111"})
+    cache.put({**INSPECT_DATA, "Id": "sha256:aaaa2222"})
+
+    assert cache.resolve("sha256:aaaa1111") == "sha256:aaaa1111"
+    assert cache.resolve("AAAA2") == "sha256:aaaa2222"
+    assert cache.resolve("aaaa") is None  # ambiguous
+    assert cache.resolve("bbbb") is None
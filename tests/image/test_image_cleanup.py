@@ -0,0 +1,118 @@
+from unittest.mock import patch
+
+import click.testing
+import pytest
+
+import bollard.image.cleanup as t
+from bollard.image.record import ImageRecord
+
+DAY = 86400
+NOW = 100 * DAY
+
+
+def make_image(id_: str, tags: tuple, age: int, size: int = 100, **kwargs):
+    return ImageRecord.from_dict(
+        {
+            "Id": f"sha256:{id_}",
+            "RepoTags": list(tags),
+            "Created": NOW - age * DAY,
+            "Size": size,
+            **kwargs,
+        }
+    )
+
+
+IMAGES = [
+    make_image("aaaa", ["foo:3"], 1),
+    make_image("bbbb", ["foo:2"], 10),
+    make_image("cccc", ["foo:1", "bar:latest"], 20),
+    make_image("dddd", [], 30),
+    make_image("eeee", [], 40, Parent="sha256:ffff"),
+    make_image("ffff", [], 50),  # intermediate
+]
+
+
+def test_get_candidates():
+    assert [r.id for r in t.get_candidates(IMAGES, [])] == [
+        "sha256:aaaa",
+        "sha256:bbbb",
+        "sha256:cccc",
+        "sha256:dddd",
+        "sha256:eeee",
+    ]
+    assert [r.id for r in t.get_candidates(IMAGES, ["foo:1"])] == ["sha256:cccc"]
+
+
+def test_find_latest():
+    assert t.find_latest(IMAGES, 1) == {"sha256:aaaa", "sha256:cccc"}
+    assert t.find_latest(IMAGES, 0) == set()
+
+
+@pytest.mark.parametrize(
+    ("policy", "used", "expect"),
+    [
+        # remove all the others
+        (t.CleanupPolicy(keep_latest=2), set(), ["eeee", "dddd"]),
+        # keep used
+        (t.CleanupPolicy(keep_latest=1), {"sha256:eeee"}, ["dddd", "bbbb"]),
+        (
+            t.CleanupPolicy(keep_latest=1, keep_used=False),
+            {"sha256:eeee"},
+            ["eeee", "dddd", "bbbb"],
+        ),
+        # cutoff
+        (t.CleanupPolicy(older_than=15 * DAY), set(), ["eeee", "dddd", "cccc"]),
+        (t.CleanupPolicy(keep_latest=1, older_than=15 * DAY), set(), ["eeee", "dddd"]),
+        # size cap
+        (t.CleanupPolicy(max_size=300), set(), ["eeee", "dddd"]),
+        (
+            t.CleanupPolicy(older_than=35 * DAY, max_size=200),
+            set(),
+            ["eeee", "dddd", "cccc"],
+        ),
+        (t.CleanupPolicy(max_size=1000), set(), []),
+    ],
+)
+def test_apply_policy(policy: t.CleanupPolicy, used: set, expect: list):
+    candidates = t.get_candidates(IMAGES, [])
+    output = t.apply_policy(candidates, used, policy, NOW)
+    assert list(output) == [f"sha256:{id_}" for id_ in expect]
+
+
+def test_cli(runner: click.testing.CliRunner):
+    records = {r.id: r for r in IMAGES}
+    with (
+        patch("bollard.image.rm.get_all_records", return_value=records),
+        patch.object(t, "get_used_image_ids", return_value=None),
+        patch(
+            "bollard.image.data.get_image_data",
+            side_effect=lambda ids, _: [records[i] for i in ids],
+        ),
+        patch("bollard.image.rm.estimate_reclaimable", return_value=1000),
+        patch("bollard.image.rm.execute_removal") as execute,
+        patch("time.time", return_value=NOW),
+    ):
+        # dry run
+        rv = runner.invoke(t.cleanup_images, ["--older-than", "15d", "--dry-run"])
+        assert rv.exit_code == 0
+        assert "Would remove these images:" in rv.output
+        assert "older than cutoff" in rv.output
+        assert "Total reclaimed space: 1.0 kB" in rv.output
+        execute.assert_not_called()
+
+        # nothing matched
+        rv = runner.invoke(
+            t.cleanup_images, ["foo", "--older-than", "1w", "--keep-latest", "5", "-n"]
+        )
+        assert rv.exit_code == 0
+        assert "No image to be removed" in rv.output
+
+        # container listing failed; refuse to remove
+        rv = runner.invoke(t.cleanup_images, ["--older-than", "15d", "-fy"])
+        assert rv.exit_code == 1
+        execute.assert_not_called()
+
+        # invalid option
+        rv = runner.invoke(t.cleanup_images, ["--max-size", "lots"])
+        assert rv.exit_code == 2
+        assert "invalid size: lots" in rv.output
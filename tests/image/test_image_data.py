@@ -1,4 +1,5 @@
 import re
+import time
 from unittest.mock import patch
 
 import click
@@ -6,6 +7,8 @@ import freezegun
 import pytest
 
 import bollard.image.data as t
+from bollard.image.record import ImageRecord, RepoTag
+from bollard.image.selector import compile_selectors
 
 
 def test_list_image_ids():
@@ -14,8 +17,25 @@ def test_list_image_ids():
         assert re.fullmatch("sha256:[0-9a-f]{64}", image_id)
 
 
+def test_list_image_ids_error(caplog: pytest.LogCaptureFixture):
+    # malformed response falls back to cli
+    with (
+        patch.object(t, "list_image_ids_api", side_effect=ValueError("bad json")),
+        patch.object(t, "list_image_ids_cli", return_value=["sha256:aaaa"]) as cli,
+    ):
+        assert t.list_image_ids() == ["sha256:aaaa"]
+    cli.assert_called_once()
+
+    # bad filter is reported
+    with patch.object(t, "list_image_ids_cli") as cli:
+        assert t.list_image_ids(filters=["no-equal-sign"]) == []
+    cli.assert_not_called()
+    assert "Bad format of filter" in caplog.text
+
+
 def test_inspect_image(caplog: pytest.LogCaptureFixture):
     with (
+        patch.object(t, "inspect_image_api", side_effect=ConnectionError),
         patch.object(
             t,
             "check_docker_output",
@@ -34,12 +54,12 @@ def test_inspect_image(caplog: pytest.LogCaptureFixture):
         assert t.inspect_image(
             ["sha256:ffffffff", "sha256:eeeeeeee", "sha256:dddddddd"]
         ) == [
-            {"Id": "sha256:ffffffff"},
-            {"Id": "sha256:eeeeeeee"},
+            ImageRecord("sha256:ffffffff"),
+            ImageRecord("sha256:eeeeeeee"),
         ]
 
         # use cache
-        assert t.inspect_image(["sha256:ffffffff"]) == [{"Id": "sha256:ffffffff"}]
+        assert t.inspect_image(["sha256:ffffffff"]) == [ImageRecord("sha256:ffffffff")]
 
     # check call count - the second call should not fire subprocess
     assert chk.call_count == 1
@@ -48,6 +68,300 @@ def test_inspect_image(caplog: pytest.LogCaptureFixture):
     assert "No such image: sha256:dddddddd" in caplog.text
 
 
+def test_list_image_ids_api():
+    summary = {
+        "Id": "sha256:" + "a" * 64,
+        "Created": 1680674825,
+        "RepoDigests": ["<none>@<none>"],
+        "RepoTags": ["foo:latest"],
+        "Size": 1234,
+        "SharedSize": -1,
+    }
+    with (
+        patch("bollard.utils.api.get_json", return_value=[summary]) as get,
+        patch.object(t, "__cache_image_summary", t.PrefixDict()) as cache,
+    ):
+        assert t.list_image_ids(True, ["dangling=true"]) == ["sha256:" + "a" * 64]
+        assert cache["aaaa"] == ImageRecord(
+            id="sha256:" + "a" * 64,
+            repo_tags=(RepoTag("", "foo", "latest"),),
+            created=1680674825,
+            size=1234,
+        )
+
+    # summary is incomplete when reference filter is used
+    with (
+        patch("bollard.utils.api.get_json", return_value=[summary]),
+        patch.object(t, "__cache_image_summary", t.PrefixDict()) as cache,
+    ):
+        t.list_image_ids(False, ["reference=foo"])
+        assert len(cache) == 0
+
+    get.assert_called_once_with(
+        "/images/json", {"all": True, "filters": {"dangling": ["true"]}}
+    )
+
+
+def test_can_push_down_filters():
+    assert t.can_push_down_filters(False, []) is True
+    assert t.can_push_down_filters(True, ["dangling=false"]) is True
+    assert t.can_push_down_filters(False, ["reference=foo"]) is False
+
+    # fresh listing is cheaper
+    t.get_disk_cache().set_listing([], time.time_ns())
+    assert t.can_push_down_filters(False, []) is False
+    assert t.can_push_down_filters(True, []) is True
+
+
+def test_list_default_summaries():
+    summary = {
+        "Id": "sha256:" + "a" * 64,
+        "Created": 1680674825,
+        "ParentId": "",
+        "RepoDigests": [],
+        "RepoTags": ["foo:latest"],
+        "Size": 1234,
+    }
+
+    # cold: full listing
+    with patch("bollard.utils.api.get_json", return_value=[summary]) as get:
+        assert t.list_default_summaries() == [summary]
+    get.assert_called_once_with("/images/json", {"all": False})
+
+    # warm: patch listing with events and dangling images
+    with (
+        patch.object(t, "__cache_disk", None),
+        patch("bollard.utils.api.get_json", return_value=[]) as get,
+        patch("bollard.image.events.fetch_events", return_value=[]) as fetch,
+    ):
+        assert t.list_default_summaries() == [summary]
+    get.assert_called_once_with(
+        "/images/json", {"all": False, "filters": {"dangling": ["true"]}}
+    )
+    fetch.assert_called_once()
+
+    # warm but failed to patch
+    with (
+        patch("bollard.utils.api.get_json", return_value=[]) as get,
+        patch("bollard.image.events.apply_events", return_value=False),
+        patch("bollard.image.events.fetch_events"),
+    ):
+        assert t.list_default_summaries() == []
+    get.assert_called_once()
+
+
+def test_sync_dangling_summaries():
+    tagged = {"Id": "sha256:aaaa", "RepoTags": ["foo:latest"]}
+    removed = {"Id": "sha256:bbbb", "RepoTags": []}
+    kept = {"Id": "sha256:cccc", "RepoTags": []}
+    added = {
+        "Id": "sha256:dddd",
+        "Created": 1680674825,
+        "RepoDigests": None,
+        "RepoTags": ["<none>:<none>"],
+        "Size": 1234,
+    }
+
+    listing = {d["Id"]: d for d in (tagged, removed, kept)}
+    with patch("bollard.utils.api.get_json", return_value=[kept, added]):
+        assert t.sync_dangling_summaries(listing) is True
+    assert listing == {
+        "sha256:aaaa": tagged,
+        "sha256:cccc": kept,
+        "sha256:dddd": {
+            "Id": "sha256:dddd",
+            "Created": 1680674825,
+            "ParentId": "",
+            "RepoDigests": [],
+            "RepoTags": [],
+            "Size": 1234,
+        },
+    }
+
+    with patch("bollard.utils.api.get_json", return_value=[kept]):
+        assert t.sync_dangling_summaries({"sha256:cccc": kept}) is False
+
+
+def test_list_image_ids_cli():
+    with (
+        patch("bollard.utils.api.get_json", side_effect=ConnectionError),
+        patch.object(
+            t, "check_docker_output", return_value=b"sha256:aaaa\nsha256:aaaa\n"
+        ) as chk,
+    ):
+        assert t.list_image_ids() == ["sha256:aaaa"]
+    chk.assert_called_once_with(["images", "--quiet", "--no-trunc"], use_context=False)
+
+
+def test_inspect_image_api():
+    from bollard.utils.api import Response
+
+    def mock_pipeline(requests):
+        assert [r.path for r in requests] == [
+            "/images/sha256:aaaa/json",
+            "/images/sha256:bbbb/json",
+        ]
+        return [
+            Response(200, "OK", {}, b'{"Id": "sha256:aaaa"}'),
+            Response(404, "Not Found", {}, b'{"message": "No such image"}'),
+        ]
+
+    with patch("bollard.utils.api.pipeline", mock_pipeline):
+        assert list(t.inspect_image_api(["sha256:aaaa", "sha256:bbbb"])) == [
+            {"Id": "sha256:aaaa"}
+        ]
+
+
+@pytest.mark.parametrize(
+    ("columns", "selectors", "sources"),
+    [
+        (["id", "repository", "tag", "created", "size"], [], ["summary"]),
+        (["id", "repo_tag"], ["foo"], ["summary"]),
+        (["id", "platform"], [], ["inspect"]),
+        (["architecture"], ["foo"], ["inspect"]),
+    ],
+)
+def test_plan_sources(columns, selectors, sources):
+    assert t.plan_sources(columns, selectors) == sources
+
+
+def test_get_image_data():
+    record_a = ImageRecord("sha256:" + "a" * 64)
+    record_b = ImageRecord("sha256:" + "b" * 64)
+
+    summary = t.PrefixDict()
+    summary[record_a.id] = record_a
+    with (
+        patch.object(t, "__cache_image_summary", summary),
+        patch.object(t, "inspect_image", return_value=[record_b]) as inspect,
+    ):
+        # summary is used
+        assert t.get_image_data(["aaaa", "bbbb"], ["summary"]) == [record_a, record_b]
+        inspect.assert_called_once_with(["bbbb"])
+
+        # summary is skipped
+        inspect.reset_mock()
+        assert t.get_image_data(["bbbb"], ["inspect"]) == [record_b]
+        inspect.assert_called_once_with(["bbbb"])
+
+
+def test_inspect_image_persisted():
+    image_id = "sha256:" + "a" * 64
+    summary = t.PrefixDict()
+    summary[image_id] = ImageRecord(image_id, repo_tags=(RepoTag.parse("foo:new"),))
+
+    with (
+        patch.object(t, "__cache_image_data", t.PrefixDict()),
+        patch.object(t, "__cache_image_summary", summary),
+        patch.object(
+            t,
+            "query_image_data",
+            return_value=[{"Id": image_id, "RepoTags": ["foo:old"], "Size": 1}],
+        ) as query,
+    ):
+        (record,) = t.inspect_image([image_id])
+        assert record.repo_tags == (RepoTag("", "foo", "old"),)
+
+    # a new process; immutable fields from disk and mutable fields from summary
+    with (
+        patch.object(t, "__cache_image_data", t.PrefixDict()),
+        patch.object(t, "__cache_image_summary", summary),
+        patch.object(t, "__cache_disk", None),
+        patch.object(t, "query_image_data") as query,
+    ):
+        (record,) = t.inspect_image(["aaaa"])
+        assert record.repo_tags == (RepoTag("", "foo", "new"),)
+        assert record.size == 1
+        query.assert_not_called()
+
+
+def test_get_cached_image():
+    image_id = "sha256:" + "a" * 64
+
+    # in-memory
+    data = t.PrefixDict()
+    data[image_id] = record = ImageRecord(image_id)
+    with patch.object(t, "__cache_image_data", data):
+        assert t.get_cached_image("aaaa") is record
+
+        # ambiguous
+        data["sha256:" + "a" * 8 + "b" * 56] = ImageRecord("sha256:aaaab")
+        assert t.get_cached_image("aaaa") is None
+
+    # persisted
+    disk_cache = t.get_disk_cache()
+    disk_cache.put({"Id": image_id, "Size": 1})
+    disk_cache.set_listing([{"Id": image_id, "RepoTags": ["foo:latest"]}], 1)
+    with (
+        patch.object(t, "__cache_image_data", None),
+        patch.object(t, "inspect_image") as inspect,
+    ):
+        record = t.get_cached_image("aaaa")
+        assert record.size == 1
+        assert record.repo_tags == (RepoTag("", "foo", "latest"),)
+        inspect.assert_not_called()
+
+    # not cached
+    with (
+        patch.object(t, "__cache_image_data", None),
+        patch.object(t, "inspect_image", return_value=[]) as inspect,
+    ):
+        assert t.get_cached_image("bbbb") is None
+        inspect.assert_called_once_with(["bbbb"])
+
+
+def test_match_images():
+    records = [
+        ImageRecord("sha256:aaaa", (RepoTag.parse("foo:latest"),)),
+        ImageRecord("sha256:bbbb", (RepoTag.parse("bar:latest"),)),
+    ]
+    index = t.get_image_index()
+    index.add(records[0])
+    index.add(records[1])
+
+    selector = compile_selectors(["foo", "baz"])
+    with patch.object(t, "get_image_data", return_value=records[:1]) as get:
+        assert t.match_images(
+            ["sha256:aaaa", "sha256:bbbb", "sha256:cccc"], selector
+        ) == ["sha256:aaaa"]
+
+    # bbbb is excluded by index; cccc is not indexed
+    get.assert_called_once_with(["sha256:aaaa", "sha256:cccc"], ("inspect",))
+
+
+def test_match_images_no_index():
+    records = [
+        ImageRecord("sha256:aaaa", (RepoTag.parse("foo:latest"),)),
+        ImageRecord("sha256:bbbb", (RepoTag.parse("bar:latest"),)),
+    ]
+
+    # single selector; not worth to build the index
+    selector = compile_selectors(["foo"])
+    with patch.object(t, "get_image_data", return_value=records) as get:
+        assert t.match_images(["sha256:aaaa", "sha256:bbbb"], selector) == [
+            "sha256:aaaa"
+        ]
+    get.assert_called_once_with(["sha256:aaaa", "sha256:bbbb"], ("inspect",))
+    assert t.__image_index is None
+
+
+def test_get_image_index():
+    record = ImageRecord("sha256:aaaa", (RepoTag.parse("foo:latest"),))
+    t.index_records([record])
+    assert t.__image_index is None
+
+    # built from the loaded records
+    summaries = t.PrefixDict()
+    summaries[record.id] = record
+    with patch.object(t, "__cache_image_summary", summaries):
+        index = t.get_image_index()
+    assert record.id in index
+
+    # kept in sync afterward
+    t.index_records([ImageRecord("sha256:bbbb")])
+    assert "sha256:bbbb" in index
+
+
 def test_prefix_dict():
     d = t.PrefixDict()
     d["a" * 64] = 1
@@ -58,30 +372,137 @@ def test_prefix_dict():
     assert d["aaaa"] == 3
     assert d["bbbb"] == 2
     assert d.get("cccc") is None
+    assert len(d) == 2
+
+    # ambiguous
+    d["a" * 8 + "b" * 56] = 4
+    assert d["aaaaaaaab"] == 4
+    with pytest.raises(t.AmbiguousPrefixError, match="multiple IDs found"):
+        d["aaaa"]
+    assert d.get("aaaa") is None
+    assert d.get("aaaa", 0) == 0
+    assert "aaaa" not in d
+    assert d.pop("aaaa", None) is None
+    assert len(d) == 3
+    with pytest.raises(KeyError):
+        del d["aaaa"]
+
+    # short key
+    d["sha256:cccc"] = 5
+    assert d["cc"] == 5
+
+
+def test_prefix_dict_update():
+    d = t.PrefixDict()
+    d["c" * 64] = 0
+    d.update({"b" * 64: 1, "sha256:" + "a" * 64: 2})
+    d.update([("c" * 64, 3)], **{"d" * 64: 4})
+
+    assert d._keys == sorted(d._keys)
+    assert d["aa"] == 2
+    assert d["bb"] == 1
+    assert d["cc"] == 3
+    assert d["dd"] == 4
+    assert len(d) == 4
+
+
+def test_prefix_dict_delete():
+    d = t.PrefixDict()
+    d.update({"a" * 64: 1, "ab" + "c" * 62: 2})
+
+    del d["ab"]
+    assert len(d) == 1
+    assert d["aa"] == 1
+    assert d.pop("ab", None) is None
+
+    with pytest.raises(KeyError):
+        del d["ffff"]
+
+
+def test_prefix_dict_lru():
+    d = t.PrefixDict(max_entries=2)
+    d["a" * 64] = 1
+    d["b" * 64] = 2
+    assert d["aa"] == 1
+    d["c" * 64] = 3
+
+    # b is least recently used
+    assert set(d) == {"a" * 64, "c" * 64}
+    assert d.get("bb") is None
+    assert d.stats == {
+        "entries": 2,
+        "bytes": 0,
+        "hits": 1,
+        "misses": 1,
+        "evictions": 1,
+    }
+
+
+def test_prefix_dict_max_bytes():
+    d = t.PrefixDict(max_bytes=t.estimate_size("x" * 100) * 2)
+    d.update({"a" * 64: "x" * 100, "b" * 64: "x" * 100})
+    assert len(d) == 2
+
+    d["c" * 64] = "x" * 100
+    assert len(d) == 2
+    assert d.get("aa") is None
+    assert d.stats["bytes"] <= d.max_bytes
+
+
+def test_discard_images():
+    image_id = "sha256:" + "a" * 64
+    data = t.PrefixDict()
+    data[image_id] = ImageRecord(image_id)
+
+    disk_cache = t.get_disk_cache()
+    disk_cache.put({"Id": image_id})
+    disk_cache.set_listing([{"Id": image_id}], 1)
+
+    with patch.object(t, "__cache_image_data", data):
+        t.discard_images(["aaaa"])
+
+    assert len(data) == 0
+    assert image_id not in disk_cache
+    assert disk_cache.listing == {}
+
+    # ambiguous prefix is ignored
+    data.update({"a" * 64: ImageRecord("a"), "a" * 8 + "b" * 56: ImageRecord("b")})
+    with patch.object(t, "__cache_image_data", data):
+        t.discard_images(["aaaa"])
+    assert len(data) == 2
+
+
+IMAGE_AAAA = ImageRecord.from_dict(
+    {
+        "Id": "sha256:aaaa",
+        "Created": "2023-04-05T06:07:05.910Z",
+        "RepoDigests": ["example.com/name@sha256:bbbb"],
+        "RepoTags": ["name:latest", "example.com/foo:2023.2.0"],
+        "Size": 1234,
+        "Architecture": "arm64",
+        "Os": "linux",
+    }
+)
+
+IMAGE_BBBB = ImageRecord.from_dict(
+    {
+        "Id": "sha256:bbbb",
+        "RepoTags": ["bar:latest", "bar:1.0"],
+        "RepoDigests": [
+            "foo.example.com/foo@sha256:ffff",
+            "bar.example.com/bar@sha256:eeee",
+        ],
+    }
+)
 
 
 @pytest.fixture()
 def _patch_inspect(monkeypatch: pytest.MonkeyPatch):
     def mock_inspect(ids: list[str]):
         if "sha256:aaaa" in ids:
-            yield {
-                "Id": "sha256:aaaa",
-                "Created": "2023-04-05T06:07:05.910Z",
-                "RepoDigests": ["example.com/name@sha256:bbbb"],
-                "RepoTags": ["name:latest", "example.com/foo:2023.2.0"],
-                "Size": 1234,
-                "Architecture": "arm64",
-                "Os": "linux",
-            }
+            yield IMAGE_AAAA
         if "sha256:bbbb" in ids:
-            yield {
-                "Id": "sha256:bbbb",
-                "RepoTags": ["bar:latest", "bar:1.0"],
-                "RepoDigests": [
-                    "foo.example.com/foo@sha256:ffff",
-                    "bar.example.com/bar@sha256:eeee",
-                ],
-            }
+            yield IMAGE_BBBB
 
     monkeypatch.setattr("bollard.image.data.inspect_image", mock_inspect)
 
@@ -173,25 +594,128 @@ def test_explode_rows(source: dict, expect: list):
     ],
 )
 @pytest.mark.usefixtures("_patch_inspect")
-def test_get_field_data(column: str, output: list):
+def test_collect_fields_column(column: str, output: list):
     with (
-        patch.object(t, "get_architecture", return_value="arm64"),
+        patch.object(t, "format_architecture", return_value="arm64"),
         patch("bollard.utils.format_iso_time", return_value="2099-01-01..."),
     ):
-        assert list(t.get_field_data("sha256:aaaa", column)) == output
+        rows = t.collect_fields([IMAGE_AAAA.id], [column])
+    assert [row[column] for row in rows] == output
+
+
+def test_iter_raw_fields():
+    with patch.object(t, "collect_raw_fields", return_value=[{}]) as collect:
+        rows = t.iter_raw_fields(
+            ["sha256:aaaa", "sha256:bbbb", "sha256:cccc"], ["id"], 2
+        )
+        assert next(rows) == {}
+        collect.assert_called_once_with(["sha256:aaaa", "sha256:bbbb"], ["id"])
+        assert list(rows) == [{}]
+    collect.assert_called_with(["sha256:cccc"], ["id"])
+
+
+def test_extract_column():
+    records = [
+        ImageRecord("sha256:aaaa", size=9100000),
+        ImageRecord("sha256:bbbb", size=10200000000),
+    ]
+    assert t.extract_column(records, "size") == [[9100000], [10200000000]]
+
+
+def test_format_rows():
+    rows = [
+        {"id": "sha256:aaaa", "platform": ("linux", "amd64", ""), "size": 1234},
+        {"id": "sha256:bbbb", "platform": ("linux", "arm64", "v8"), "size": None},
+    ]
+    with patch("platform.machine", return_value="amd64") as machine:
+        assert list(
+            t.format_rows(
+                ["id", "platform", "size"], rows, {"highlight_architecture": False}
+            )
+        ) == [
+            {"id": "aaaa", "platform": "linux/amd64", "size": "1.2 kB"},
+            {"id": "bbbb", "platform": "linux/arm64/v8", "size": None},
+        ]
+    machine.assert_called_once()
 
 
-def test_get_architecture():
+def test_query_disk_usage():
+    from bollard.utils.api import Response
+
+    resp = Response(
+        200,
+        "OK",
+        {},
+        b'{"Images": ['
+        b'{"Id": "sha256:aaaa", "Size": 150, "SharedSize": 100},'
+        b'{"Id": "sha256:bbbb", "Size": 100, "SharedSize": -1}'
+        b"]}",
+    )
+    with patch("bollard.utils.api.request", return_value=resp) as req:
+        assert t.query_disk_usage() == {"sha256:aaaa": (150, 100)}
+        assert t.query_disk_usage() == {"sha256:aaaa": (150, 100)}
+    req.assert_called_once_with("GET", "/system/df", {"type": "image"})
+
+    # removal invalidates the result
+    t.discard_images([])
+    with patch("bollard.utils.api.request", side_effect=ConnectionError):
+        assert t.query_disk_usage() == {}
+
+    # malformed body
+    t.reset_disk_usage()
+    resp = Response(200, "OK", {}, b"not json")
+    with patch("bollard.utils.api.request", return_value=resp):
+        assert t.query_disk_usage() == {}
+
+
+def test_build_layer_index():
+    usage = {
+        "sha256:aaaa": (150, 100),
+        "sha256:bbbb": (120, 100),
+        "sha256:cccc": (50, 0),
+    }
+    records = [
+        ImageRecord("sha256:aaaa", layers=("sha256:1111", "sha256:2222")),
+        ImageRecord("sha256:bbbb", layers=("sha256:1111", "sha256:3333")),
+    ]
+    with (
+        patch.object(t, "query_disk_usage", return_value=usage),
+        patch.object(t, "get_image_data", return_value=records) as get,
+    ):
+        index = t.build_layer_index()
+
+    # only the images that share layers are inspected
+    get.assert_called_once_with(["sha256:aaaa", "sha256:bbbb"], ["inspect"])
+    assert len(index) == 3
+    assert index.reclaimable_size(["sha256:cccc"]) == 50
+    assert index.reclaimable_size(["sha256:aaaa"]) == 50
+    assert index.reclaimable_size(["sha256:aaaa", "sha256:bbbb"]) == 170
+
+
+def test_extract_column_usage():
+    records = [ImageRecord("sha256:aaaa"), ImageRecord("sha256:bbbb")]
+    with (
+        patch.object(
+            t, "query_disk_usage_api", return_value={"sha256:aaaa": (150, 100)}
+        ) as query,
+        patch.object(t, "get_image_data", return_value=records[:1]),
+    ):
+        assert t.extract_column(records, "shared_size") == [[100], [None]]
+        assert t.extract_column(records, "unique_size") == [[50], [None]]
+        assert "sha256:aaaa" in t.build_layer_index()
+
+    # queried once in an invocation
+    query.assert_called_once()
+
+
+def test_format_architecture():
     # match
     with patch("platform.machine", return_value="amd64"):
-        assert t.get_architecture({"Architecture": "amd64"}, {}) == "amd64"
+        assert t.format_architecture("amd64", None, {}) == "amd64"
     with patch("platform.machine", return_value="arm64"):
-        assert (
-            t.get_architecture({"Architecture": "arm64", "Variant": "v8"}, {})
-            == "arm64/v8"
-        )
+        assert t.format_architecture("arm64", "v8", {}) == "arm64/v8"
 
     # not match
     colored = click.style("test", fg="yellow", bold=True)
     with patch("platform.machine", return_value="foo"):
-        assert t.get_architecture({"Architecture": "test"}, {}) == colored
+        assert t.format_architecture("test", None, {}) == colored
@@ -23,3 +23,70 @@ def test_print_table_1(capsys: pytest.CaptureFixture):
     t.print_table(["name"], [])
     captured = capsys.readouterr()
     assert "No data selected" in captured.out
+
+
+@pytest.mark.parametrize(
+    ("output", "expected"),
+    [
+        (
+            "jsonl",
+            '{"id": "sha256:aaaa", "platform": "linux/arm64/v8", "size": 1234}\n'
+            '{"id": "sha256:bbbb", "platform": "linux/amd64", "size": null}\n',
+        ),
+        (
+            "csv",
+            "id,platform,size\n"
+            "sha256:aaaa,linux/arm64/v8,1234\n"
+            "sha256:bbbb,linux/amd64,\n",
+        ),
+        (
+            "tsv",
+            "id\tplatform\tsize\n"
+            "sha256:aaaa\tlinux/arm64/v8\t1234\n"
+            "sha256:bbbb\tlinux/amd64\t\n",
+        ),
+    ],
+)
+def test_write_rows(capsys: pytest.CaptureFixture, output: str, expected: str):
+    t.write_rows(
+        ["id", "platform", "size"],
+        [
+            {"id": "sha256:aaaa", "platform": ("linux", "arm64", "v8"), "size": 1234},
+            {"id": "sha256:bbbb", "platform": ("linux", "amd64", ""), "size": None},
+        ],
+        output,
+    )
+    assert capsys.readouterr().out == expected
+
+
+def test_print_formatted(capsys: pytest.CaptureFixture):
+    template = t.compile_format("table {{.Repository}}:{{.Tag}}\\t{{.Size}}")
+    data = [
+        {
+            "id": "sha256:aaaa",
+            "repository": "foo",
+            "tag": "latest",
+            "digest": None,
+            "created": 1672531200,
+            "size": 1234567,
+        },
+        {
+            "id": "sha256:bbbb",
+            "repository": None,
+            "tag": None,
+            "digest": None,
+            "created": 1672531200,
+            "size": 1000,
+        },
+    ]
+
+    t.print_formatted(template, data)
+    assert capsys.readouterr().out == (
+        "REPOSITORY:TAG   SIZE\n" "foo:latest       1.23MB\n" "<none>:<none>    1kB\n"
+    )
+
+
+def test_compile_format():
+    assert t.compile_format("table").is_table
+    with pytest.raises(ValueError, match="can't evaluate field Name"):
+        t.compile_format("{{.Name}}")
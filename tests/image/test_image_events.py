@@ -0,0 +1,79 @@
+from unittest.mock import patch
+
+import bollard.image.events as t
+from bollard.utils.api import Response
+
+
+def test_format_timestamp():
+    assert t.format_timestamp(1680674825000000123) == "1680674825.000000123"
+
+
+def test_parse_json_stream():
+    data = b'{"Action": "tag"}\n{"Action": "untag"}\n'
+    assert list(t.parse_json_stream(data)) == [{"Action": "tag"}, {"Action": "untag"}]
+    assert list(t.parse_json_stream(b"")) == []
+
+
+def test_fetch_events():
+    resp = Response(200, "OK", {}, b'{"Type": "image", "Action": "tag"}\n')
+    with patch("bollard.utils.api.request", return_value=resp) as req:
+        assert t.fetch_events(10**9, 2 * 10**9) == [{"Type": "image", "Action": "tag"}]
+
+    _, path, query = req.call_args.args
+    assert path == "/events"
+    assert query["since"] == "1.000000000"
+    assert query["until"] == "2.000000000"
+
+
+def _event(action: str, actor: str, type_: str = "image"):
+    return {"Type": type_, "Action": action, "Actor": {"ID": actor}}
+
+
+def test_apply_events():
+    listing = {
+        "sha256:aaaa": {
+            "Id": "sha256:aaaa",
+            "Created": 1,
+            "RepoTags": ["foo:latest", "foo:1.0"],
+            "RepoDigests": [],
+            "Size": 10,
+        },
+        "sha256:bbbb": {
+            "Id": "sha256:bbbb",
+            "Created": 2,
+            "RepoTags": ["bar:latest"],
+            "RepoDigests": [],
+            "Size": 20,
+        },
+    }
+    inspected = {
+        "foo:latest": {
+            "Id": "sha256:cccc",
+            "Created": "2023-04-05T06:07:05.910Z",
+            "RepoTags": ["foo:latest"],
+            "RepoDigests": ["foo@sha256:dddd"],
+            "Size": 30,
+        },
+    }
+
+    with patch.object(t, "query_refs", lambda refs: [inspected.get(r) for r in refs]):
+        assert t.apply_events(
+            listing,
+            [
+                _event("pull", "foo:latest"),
+                _event("delete", "sha256:bbbb"),
+            ],
+        )
+
+    # new image pulled, tag moved from old image
+    assert list(listing) == ["sha256:cccc", "sha256:aaaa"]
+    assert listing["sha256:aaaa"]["RepoTags"] == ["foo:1.0"]
+    assert listing["sha256:cccc"]["Created"] == 1680674825
+
+
+def test_apply_events_fail():
+    # container commit creates new image without image event
+    assert t.apply_events({}, [_event("commit", "abcd", "container")]) is False
+
+    # events are discarded by daemon
+    assert t.apply_events({}, [_event("tag", "abcd")] * t.EVENTS_LIMIT) is False
@@ -0,0 +1,57 @@
+import bollard.image.index as t
+from bollard.image.record import ImageRecord
+
+RECORD_AAAA = ImageRecord.from_dict(
+    {
+        "Id": "sha256:aaaa",
+        "RepoTags": ["nginx:1.25", "myreg.example.com/app/nginx:v1.2"],
+        "RepoDigests": ["nginx@sha256:cccc"],
+    }
+)
+
+RECORD_BBBB = ImageRecord.from_dict(
+    {
+        "Id": "sha256:bbbb",
+        "RepoTags": ["nginx-proxy:Latest"],
+    }
+)
+
+
+def test_image_index():
+    index = t.ImageIndex()
+    index.add(RECORD_AAAA)
+    index.add(RECORD_BBBB)
+    assert len(index) == 2
+    assert "sha256:aaaa" in index
+
+    # exact
+    assert index.lookup("NAME", "nginx") == {"sha256:aaaa"}
+    assert index.lookup("TAG", "latest") == {"sha256:bbbb"}
+    assert index.lookup("REGISTRY", "myreg.example.com/app") == {"sha256:aaaa"}
+    assert index.lookup("REPO_TAG", "nginx:v1.2") == {"sha256:aaaa"}
+    assert index.lookup("NAME", "redis") == set()
+
+    # prefix
+    assert index.lookup("NAME", "nginx*") == {"sha256:aaaa", "sha256:bbbb"}
+    assert index.lookup("TAG", "v1.*") == {"sha256:aaaa"}
+    assert index.lookup("ID", "sha256:bb*") == {"sha256:bbbb"}
+    assert index.lookup("DIGEST", "sha256:cc*") == {"sha256:aaaa"}
+
+    # infix
+    assert index.lookup("NAME", "*proxy") is None
+    assert index.lookup("NAME", "ng*x") is None
+
+
+def test_image_index_update():
+    index = t.ImageIndex()
+    index.add(RECORD_AAAA)
+    assert index.lookup("NAME", "ngi*") == {"sha256:aaaa"}
+
+    # tags moved
+    index.add(ImageRecord.from_dict({"Id": "sha256:aaaa", "RepoTags": ["redis:7"]}))
+    assert index.lookup("NAME", "ngi*") == set()
+    assert index.lookup("NAME", "redis") == {"sha256:aaaa"}
+
+    index.discard("sha256:aaaa")
+    assert len(index) == 0
+    assert index.lookup("NAME", "redis") == set()
@@ -0,0 +1,34 @@
+import pytest
+
+import bollard.image.layers as t
+
+
+@pytest.fixture()
+def index() -> t.LayerIndex:
+    index = t.LayerIndex()
+    index.add("base", ["a"], 100, 100)
+    index.add("app", ["a", "b"], 150, 150)
+    index.add("app-debug", ["a", "b", "c"], 180, 150)
+    index.add("other", ["a", "d"], 130, 100)
+    index.add("alone", ["x", "y"], 70, 0)
+    # branched without image on the common layer
+    index.add("foo", ["p", "q"], 60, 40)
+    index.add("bar", ["p", "r"], 80, 40)
+    return index
+
+
+@pytest.mark.parametrize(
+    ("image_ids", "size"),
+    [
+        ([], 0),
+        (["base"], 0),
+        (["app-debug"], 30),
+        (["app", "app-debug"], 80),
+        (["base", "app", "app-debug", "other"], 210),
+        (["alone", "no-such-image"], 70),
+        (["foo"], 20),
+        (["foo", "bar"], 100),
+    ],
+)
+def test_reclaimable_size(index: t.LayerIndex, image_ids: list, size: int):
+    assert index.reclaimable_size(image_ids) == size
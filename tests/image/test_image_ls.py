@@ -4,6 +4,7 @@ import click.testing
 import pytest
 
 import bollard.image.ls as t
+from bollard.image.record import ImageRecord, RepoTag
 
 
 def test_cli(runner):
@@ -25,6 +26,60 @@ def test_get_columns():
     assert t.get_columns([], flag_quiet=True, flag_digest=True) == ["id"]
 
 
+def test_is_quiet():
+    assert t.is_quiet(None, True) is True
+    assert t.is_quiet("table", True) is True
+    assert t.is_quiet("{{.Repository}}", True) is False
+    assert t.is_quiet("table {{.ID}}", True) is False
+    assert t.is_quiet(None, False) is False
+
+
+def test_cli_quiet_format(runner: click.testing.CliRunner):
+    with (
+        patch.object(t, "is_docker_ready", return_value=True),
+        patch.object(t, "select_images", return_value=["sha256:aaaa"]),
+        patch("bollard.image.data.collect_raw_fields", return_value=[]),
+        patch("bollard.image.display.print_formatted") as print_formatted,
+        patch("bollard.image.display.print_table") as print_table,
+    ):
+        # custom template is honored
+        rv = runner.invoke(t.list_images, ["-q", "--format", "{{.Repository}}"])
+        assert rv.exit_code == 0
+        print_formatted.assert_called_once()
+        print_table.assert_not_called()
+
+        # quiet on table format
+        rv = runner.invoke(t.list_images, ["-q", "--format", "table"])
+        assert rv.exit_code == 0
+        print_formatted.assert_called_once()
+        assert print_table.call_args.args[0] == ["id"]
+
+
+def test_cli_stream_rows(runner: click.testing.CliRunner):
+    rows = [{"id": "sha256:bbbb", "size": 1}, {"id": "sha256:aaaa", "size": 2}]
+    with (
+        patch.object(t, "is_docker_ready", return_value=True),
+        patch.object(t, "select_images", return_value=["sha256:aaaa"]),
+        patch("bollard.image.data.iter_raw_fields", return_value=iter(rows)) as it,
+        patch("bollard.image.data.collect_raw_fields", return_value=rows) as collect,
+        patch("bollard.image.display.write_rows") as write_rows,
+    ):
+        # rows are streamed
+        rv = runner.invoke(t.list_images, ["-C", "id", "--output", "jsonl"])
+        assert rv.exit_code == 0
+        it.assert_called_once()
+        collect.assert_not_called()
+        assert write_rows.call_args.args[1] is it.return_value
+
+        # rows are collected for sorting
+        rv = runner.invoke(
+            t.list_images, ["-C", "id", "--order-by", "id", "--output", "jsonl"]
+        )
+        assert rv.exit_code == 0
+        collect.assert_called_once()
+        assert write_rows.call_args.args[1] == rows[::-1]
+
+
 def test_norm_columns():
     assert t.norm_columns(["default", "arch", "repo", "platform"]) == [
         "id",
@@ -53,9 +108,9 @@ def test_select_images():
         patch(
             "bollard.image.data.inspect_image",
             return_value=[
-                {"Id": "sha256:aaaa", "RepoTags": ["test:latest"]},
-                {"Id": "sha256:bbbb", "RepoTags": ["foo:latest"]},
-                {"Id": "sha256:cccc", "RepoTags": ["foo:2023.2.0"]},
+                ImageRecord("sha256:aaaa", (RepoTag.parse("test:latest"),)),
+                ImageRecord("sha256:bbbb", (RepoTag.parse("foo:latest"),)),
+                ImageRecord("sha256:cccc", (RepoTag.parse("foo:2023.2.0"),)),
             ],
         ),
     ):
@@ -70,6 +125,17 @@ def test_select_images():
         ]
 
 
+def test_select_images_push_down():
+    with (
+        patch("bollard.image.data.list_image_ids", return_value=[]) as list_ids,
+        patch("bollard.image.data.can_push_down_filters", return_value=True),
+    ):
+        t.select_images(("myreg/app:*", ":latest"), False, ("dangling=false",))
+    list_ids.assert_called_once_with(
+        incl_interm_img=False, filters=["dangling=false", "reference=myreg/app"]
+    )
+
+
 def test_parse_top_n_arg():
     assert t.parse_top_n_arg(["foo", "~3", "bar", "~1"]) == (["foo", "bar"], 1)
 
@@ -77,13 +143,71 @@ def test_parse_top_n_arg():
 def test_order_dict():
     data = [
         {"foo": 10, "bar": 10},
+        {"foo": None, "bar": 30},
         {"foo": 20, "bar": 20},
+        {"foo": 9, "bar": 40},
     ]
     assert t.order_dict(data, "foo", True) == [
         {"foo": 20, "bar": 20},
         {"foo": 10, "bar": 10},
+        {"foo": 9, "bar": 40},
+        {"foo": None, "bar": 30},
     ]
     assert t.order_dict(data, "foo", False) == [
+        {"foo": 9, "bar": 40},
         {"foo": 10, "bar": 10},
         {"foo": 20, "bar": 20},
+        {"foo": None, "bar": 30},
     ]
+
+
+def test_pick_top_images():
+    ids = ["sha256:aaaa", "sha256:bbbb", "sha256:cccc", "sha256:dddd"]
+    records = [
+        ImageRecord(ids[0], size=10),
+        ImageRecord(ids[1], size=None),
+        ImageRecord(ids[2], size=20),
+        ImageRecord(ids[3], size=9),
+    ]
+
+    assert t.pick_top_images(ids, None, 2) == ids[:2]
+
+    with patch(
+        "bollard.image.data.get_image_data", return_value=records
+    ) as get_image_data:
+        assert t.pick_top_images(ids, (True, "size"), 2) == [ids[0], ids[2]]
+        assert t.pick_top_images(ids, (False, "size"), 2) == [ids[0], ids[3]]
+        assert t.pick_top_images(ids, (False, "size"), 4) == ids
+    get_image_data.assert_called_with(ids, ["summary"])
+
+
+def test_pick_top_images_missing():
+    # image removed after listing; no record for bbbb
+    ids = ["sha256:aaaa", "sha256:bbbb", "sha256:cccc", "sha256:dddd"]
+    records = [
+        ImageRecord(ids[0], size=10),
+        ImageRecord(ids[2], size=30),
+        ImageRecord(ids[3], size=20),
+    ]
+    with patch("bollard.image.data.get_image_data", return_value=records):
+        assert t.pick_top_images(ids, (True, "size"), 3) == [ids[0], ids[2], ids[3]]
+        assert t.pick_top_images(ids, (True, "size"), 2) == [ids[2], ids[3]]
+        assert t.pick_top_images(ids, (False, "size"), 1) == [ids[0]]
+
+
+def test_pick_top_images_multi_values():
+    ids = ["sha256:aaaa", "sha256:bbbb", "sha256:cccc"]
+    records = [
+        ImageRecord(ids[0], repo_tags=(RepoTag("", "foo", "b"),)),
+        ImageRecord(ids[1], repo_tags=()),
+        ImageRecord(ids[2], repo_tags=(RepoTag("", "foo", "c"), RepoTag("", "a", "a"))),
+    ]
+    with patch("bollard.image.data.get_image_data", return_value=records):
+        assert t.pick_top_images(ids, (False, "tag"), 1) == [ids[2]]
+        assert t.pick_top_images(ids, (True, "tag"), 2) == [ids[0], ids[2]]
+
+
+def test_is_format_supported():
+    assert t.is_format_supported(None)
+    assert t.is_format_supported("{{.ID}}\\t{{json .}}")
+    assert not t.is_format_supported("{{if .Tag}}{{.Tag}}{{end}}")
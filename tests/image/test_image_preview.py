@@ -0,0 +1,64 @@
+from unittest.mock import patch
+
+import click
+import click.testing
+
+import bollard.image.preview as t
+from bollard.image.record import ImageRecord
+
+IMAGE = ImageRecord.from_dict(
+    {
+        "Id": "sha256:aaaa",
+        "RepoTags": ["foo:latest"],
+        "Created": 1680674825,
+        "Size": 1234,
+        "Architecture": "amd64",
+        "Os": "linux",
+        "Config": {"Labels": {"maintainer": "me"}},
+        "RootFS": {"Layers": [f"sha256:{i:02}" + "f" * 62 for i in range(25)]},
+    }
+)
+
+
+def test_cli(runner: click.testing.CliRunner):
+    with (
+        patch("bollard.image.data.get_cached_image", return_value=IMAGE),
+        patch.object(t, "list_image_containers", return_value=[]),
+    ):
+        rv = runner.invoke(t.preview_image, ["aaaa"])
+    assert rv.exit_code == 0
+    assert "ID: sha256:aaaa" in rv.output
+
+    with patch("bollard.image.data.get_cached_image", return_value=None):
+        rv = runner.invoke(t.preview_image, ["bbbb"])
+    assert rv.exit_code == 0
+    assert "No such image: bbbb" in rv.output
+
+
+def test_render_preview():
+    containers = [{"Names": ["/web"], "State": "running"}]
+    lines = [click.unstyle(s) for s in t.render_preview(IMAGE, containers)]
+
+    assert "Tag: foo:latest" in lines
+    assert "Size: 1.2 kB" in lines
+    assert "Containers (1):" in lines
+    assert "  web (running)" in lines
+    assert "  maintainer=me" in lines
+    assert "Layers (25):" in lines
+    assert lines[-2:] == ["  19ffffffffff", "  ..."]
+
+    # containers not available
+    lines = [click.unstyle(s) for s in t.render_preview(IMAGE, None)]
+    assert not any(s.startswith("Containers") for s in lines)
+
+
+def test_list_image_containers():
+    containers = [
+        {"Names": ["/foo"], "ImageID": "sha256:aaaa"},
+        {"Names": ["/bar"], "ImageID": "sha256:bbbb"},
+    ]
+    with patch("bollard.image.data.list_containers", return_value=containers):
+        assert t.list_image_containers("sha256:aaaa") == containers[:1]
+
+    with patch("bollard.image.data.list_containers", return_value=None):
+        assert t.list_image_containers("sha256:aaaa") is None
@@ -0,0 +1,61 @@
+import bollard.image.record as t
+
+
+def test_repo_tag():
+    repo_tag = t.RepoTag.parse("example.com/foo/bar:1.0")
+    assert repo_tag == ("example.com/foo", "bar", "1.0")
+    assert repo_tag.repository == "example.com/foo/bar"
+    assert str(repo_tag) == "example.com/foo/bar:1.0"
+
+    repo_tag = t.RepoTag.parse("bar:latest")
+    assert repo_tag.repository == "bar"
+    assert str(repo_tag) == "bar:latest"
+
+
+def test_image_record_from_inspect():
+    record = t.ImageRecord.from_dict(
+        {
+            "Id": "sha256:aaaa",
+            "RepoTags": ["foo:latest"],
+            "RepoDigests": ["foo@sha256:bbbb"],
+            "Parent": "",
+            "Created": "2023-04-05T06:07:05.910Z",
+            "Size": 1234,
+            "Architecture": "arm64",
+            "Variant": "v8",
+            "Os": "linux",
+            "Config": {"Env": ["PATH=/usr/bin"], "Labels": {"foo": "bar"}},
+            "RootFS": {"Type": "layers", "Layers": ["sha256:cccc"]},
+        }
+    )
+    assert record == t.ImageRecord(
+        id="sha256:aaaa",
+        repo_tags=(t.RepoTag("", "foo", "latest"),),
+        repo_digests=("foo@sha256:bbbb",),
+        created=1680674825,
+        size=1234,
+        architecture="arm64",
+        variant="v8",
+        os="linux",
+        parent=None,
+        layers=("sha256:cccc",),
+        labels={"foo": "bar"},
+    )
+    assert not hasattr(record, "__dict__")
+
+
+def test_image_record_from_summary():
+    record = t.ImageRecord.from_dict(
+        {
+            "Id": "sha256:aaaa",
+            "ParentId": "sha256:bbbb",
+            "RepoTags": None,
+            "RepoDigests": None,
+            "Created": 1680674825,
+            "Size": 1234,
+            "Labels": None,
+        }
+    )
+    assert record == t.ImageRecord(
+        id="sha256:aaaa", created=1680674825, size=1234, parent="sha256:bbbb"
+    )
@@ -1,8 +1,12 @@
+from subprocess import CompletedProcess
 from unittest.mock import patch
 
 import click.testing
+import pytest
 
 import bollard.image.rm as t
+from bollard.image.record import ImageRecord, RepoTag
+from bollard.utils.api import APIError, Response
 
 
 def test_cli(runner: click.testing.CliRunner):
@@ -14,7 +18,12 @@ def test_cli(runner: click.testing.CliRunner):
     # removed
     with (
         patch.object(t, "select_images", return_value=["aaaa"]),
-        patch.object(t, "run_docker") as dkr,
+        patch.object(
+            t, "plan_removal", return_value=t.RemovalPlan([{"aaaa": ["aaaa"]}], {}, {})
+        ),
+        patch.object(t, "estimate_reclaimable", return_value=None),
+        patch.object(t, "remove_image_api", side_effect=ConnectionError),
+        patch.object(t, "run_docker", return_value=CompletedProcess([], 0)) as dkr,
         patch("bollard.image.data.collect_fields"),
         patch("bollard.image.display.print_table"),
     ):
@@ -23,15 +32,198 @@ def test_cli(runner: click.testing.CliRunner):
     dkr.assert_any_call(["image", "rm", "-f", "aaaa"])
 
 
+def test_remove_image_api():
+    # success
+    resp = Response(
+        200, "OK", {}, b'[{"Untagged": "foo:latest"}, {"Deleted": "sha256:aaaa"}]'
+    )
+    with patch("bollard.utils.api.request", return_value=resp) as req:
+        assert t.remove_image_api("aaaa", {"force": True}) == [
+            "Untagged: foo:latest",
+            "Deleted: sha256:aaaa",
+        ]
+    req.assert_called_once_with(
+        "DELETE", "/images/aaaa", {"force": True, "noprune": None}
+    )
+
+    # conflict
+    resp = Response(409, "Conflict", {}, b'{"message": "image is being used"}')
+    with (
+        patch("bollard.utils.api.request", return_value=resp),
+        pytest.raises(APIError, match="image is being used"),
+    ):
+        t.remove_image_api("aaaa", {})
+
+
+def test_execute_removal(capsys: pytest.CaptureFixture):
+    def remove_image_api(image_id: str, options: dict):
+        if image_id == "bbbb":
+            raise APIError(409, "image is being used")
+        if image_id == "cccc":
+            raise ConnectionError
+        return [f"Deleted: {image_id}"]
+
+    with (
+        patch.object(t, "remove_image_api", side_effect=remove_image_api),
+        patch.object(t, "run_docker", return_value=CompletedProcess([], 0)) as dkr,
+    ):
+        plan = t.RemovalPlan(
+            [{id_: [id_] for id_ in ("aaaa", "bbbb", "cccc", "dddd")}],
+            {"eeee": {"aaaa"}},
+            {"ffff": "image has dependent child images"},
+        )
+        result = t.execute_removal(plan, {})
+
+    assert sorted(result.removed) == ["aaaa", "cccc", "dddd", "eeee"]
+    assert result.failed == {
+        "bbbb": "image is being used",
+        "ffff": "image has dependent child images",
+    }
+    assert result.summary() == "Removed 4 images, 2 failed"
+    dkr.assert_called_once_with(["image", "rm", "cccc"])
+
+    captured = capsys.readouterr()
+    assert "Deleted: dddd" in captured.out
+    assert "Error response from daemon: image is being used" in captured.err
+
+
+def test_execute_removal_interrupted():
+    with patch.object(t, "remove_images_api", side_effect=KeyboardInterrupt):
+        plan = t.RemovalPlan([{"aaaa": ["aaaa"]}, {"bbbb": ["bbbb"]}], {}, {})
+        result = t.execute_removal(plan, {})
+    assert result.cancelled == ["aaaa", "bbbb"]
+
+
+def test_get_all_records():
+    summaries = [
+        {"Id": "sha256:aaaa", "Created": 1, "RepoTags": ["foo:1"], "Size": 1},
+        {"Id": "sha256:bbbb", "Created": 2, "ParentId": "sha256:aaaa", "Size": 2},
+    ]
+    with (
+        patch("bollard.utils.api.get_json", return_value=summaries),
+        patch("bollard.image.data.inspect_image") as inspect,
+    ):
+        records = t.get_all_records()
+    inspect.assert_not_called()
+    assert list(records) == ["sha256:aaaa", "sha256:bbbb"]
+    assert records["sha256:bbbb"].parent == "sha256:aaaa"
+
+
+def test_plan_removal():
+    records = [
+        # base <- middle (untagged) <- leaf; base is also parent of other
+        ImageRecord("sha256:base", (RepoTag.parse("base:1"),)),
+        ImageRecord("sha256:middle", parent="sha256:base"),
+        ImageRecord(
+            "sha256:leaf",
+            (RepoTag.parse("app:1"), RepoTag.parse("example.com/app:1")),
+            parent="sha256:middle",
+        ),
+        ImageRecord("sha256:other", (RepoTag.parse("other:1"),), parent="sha256:base"),
+        ImageRecord("sha256:single", (RepoTag.parse("foo:1"), RepoTag.parse("foo:2"))),
+    ]
+    ids = [r.id for r in records]
+
+    with (
+        patch("bollard.image.data.list_image_ids", return_value=ids),
+        patch("bollard.image.data.get_image_data", return_value=records),
+    ):
+        plan = t.plan_removal(["base", "middle", "leaf", "single"], {})
+        assert plan.waves == [
+            {
+                "sha256:leaf": ["app:1", "sha256:leaf"],
+                "sha256:single": ["sha256:single"],
+            },
+        ]
+        assert plan.pruned == {"sha256:middle": {"sha256:leaf"}}
+        assert plan.conflicts == {"sha256:base": "image has dependent child images"}
+
+        plan = t.plan_removal(["sha256:base", "other", "middle", "leaf"], {"force": 1})
+        assert plan.waves == [
+            {"sha256:other": ["sha256:other"], "sha256:leaf": ["sha256:leaf"]},
+            {"sha256:base": ["sha256:base"]},
+        ]
+        assert plan.conflicts == {}
+
+        plan = t.plan_removal(["base", "other", "middle", "leaf"], {"no_prune": 1})
+        assert plan.waves[1] == {"sha256:middle": ["sha256:middle"]}
+        assert plan.waves[2] == {"sha256:base": ["sha256:base"]}
+        assert plan.pruned == {}
+
+
+def test_plan_removal_untagged_chain():
+    # base <- parent <- child <- leaf; only leaf is selected
+    records = [
+        ImageRecord("sha256:base", (RepoTag.parse("base:1"),)),
+        ImageRecord("sha256:parent", parent="sha256:base"),
+        ImageRecord("sha256:child", parent="sha256:parent"),
+        ImageRecord("sha256:leaf", (RepoTag.parse("app:1"),), parent="sha256:child"),
+    ]
+    ids = [r.id for r in records]
+
+    with (
+        patch("bollard.image.data.list_image_ids", return_value=ids),
+        patch("bollard.image.data.get_image_data", return_value=records),
+    ):
+        plan = t.plan_removal(["leaf"], {})
+    assert plan.waves == [{"sha256:leaf": ["sha256:leaf"]}]
+    assert plan.pruned == {
+        "sha256:child": {"sha256:leaf"},
+        "sha256:parent": {"sha256:child"},
+    }
+
+
+def test_collect_pruned():
+    pruned = {"child": {"leaf"}, "parent": {"child"}, "other": {"failed"}}
+
+    result = t.RemovalResult(["leaf"], {"failed": "error"}, [])
+    t.collect_pruned(pruned, result)
+    assert result.removed == ["leaf", "child", "parent"]
+    assert result.failed == {
+        "failed": "error",
+        "other": "image has dependent child images",
+    }
+
+
+def test_print_plan_notes(capsys: pytest.CaptureFixture):
+    plan = t.RemovalPlan([{"sha256:aaaa": ["sha256:aaaa"]}], {}, {"sha256:bbbb": "x"})
+    with patch.object(t, "estimate_reclaimable", return_value=1000) as estimate:
+        t.print_plan_notes(plan, show_estimate=False)
+        estimate.assert_not_called()
+        assert "Skip bbbb: x" in capsys.readouterr().err
+
+        t.print_plan_notes(plan, show_estimate=True)
+        assert "Total reclaimed space: 1.0 kB" in capsys.readouterr().out
+
+
+def test_remove_images_cli():
+    result = t.RemovalResult([], {}, [])
+    with (
+        patch.object(t, "run_docker", return_value=CompletedProcess([], 1)),
+        patch(
+            "bollard.image.data.list_image_ids",
+            return_value=["sha256:bbbb000000000000"],
+        ),
+    ):
+        t.remove_images_cli(
+            {"aaaa": ["aaaa"], "bbbb": ["bbbb"]}, {}, result, t.Progress(2)
+        )
+    assert result.removed == ["aaaa"]
+    assert list(result.failed) == ["bbbb"]
+
+
 def test_select_images():
     with (
-        patch("bollard.image.data.list_image_ids"),
+        patch(
+            "bollard.image.data.list_image_ids",
+            return_value=["sha256:aaaa", "sha256:bbbb", "sha256:cccc"],
+        ),
         patch(
             "bollard.image.data.inspect_image",
             return_value=[
-                {"Id": "sha256:aaaa", "RepoTags": ["test:latest"]},
-                {"Id": "sha256:bbbb", "RepoTags": ["foo:latest"]},
-                {"Id": "sha256:cccc", "RepoTags": ["foo:2023.2.0"]},
+                ImageRecord("sha256:aaaa", (RepoTag.parse("test:latest"),)),
+                ImageRecord("sha256:bbbb", (RepoTag.parse("foo:latest"),)),
+                ImageRecord("sha256:cccc", (RepoTag.parse("foo:2023.2.0"),)),
             ],
         ),
     ):
@@ -40,27 +232,47 @@ def test_select_images():
 
 
 def test_interactive_select_image():
+    def _select(prompt, header, items, preview):
+        assert preview.endswith("-m bollard image preview {1}")
+        lines = list(items)
+        assert len(lines) == 2
+        # fixed-width columns: repo_tag starts at the same position on every line
+        assert header.index("REPO") == 48
+        assert click.unstyle(lines[0]).index("foo:2023.2.0") == 48
+        assert click.unstyle(lines[1]).index("bar:latest") == 48
+        return ["aaaa ...", "aaaa ..."]
+
     with (
-        patch("bollard.image.data.list_image_ids"),
+        patch("bollard.image.data.list_image_ids", return_value=["sha256:aaaa"]),
+        patch("bollard.image.data.iter_raw_fields"),
         patch(
-            "bollard.image.data.collect_fields",
-            return_value=[
-                {
-                    "id": "aaaa",
-                    "size": "10 kB",
-                    "created": "when",
-                    "repo_tag": "foo:2023.2.0",
-                },
-                {
-                    "id": "aaaa",
-                    "size": "10 kB",
-                    "created": "when",
-                    "repo_tag": "bar:latest",
-                },
-            ],
-        ),
-        patch(
-            "bollard.utils.interactive_select", return_value=["aaaa ...", "aaaa ..."]
+            "bollard.image.data.format_rows",
+            return_value=iter(
+                [
+                    {
+                        "id": "aaaa",
+                        "size": "10 kB",
+                        "created": "when",
+                        "repo_tag": "foo:2023.2.0",
+                    },
+                    {
+                        "id": "aaaa",
+                        "size": "10 kB",
+                        "created": "when",
+                        "repo_tag": "bar:latest",
+                    },
+                ]
+            ),
         ),
+        patch("bollard.utils.interactive_select", side_effect=_select),
     ):
         assert t.interactive_select_image() == {"aaaa"}
+
+
+def test_interactive_select_image_empty():
+    with (
+        patch("bollard.image.data.list_image_ids", return_value=[]),
+        patch("bollard.utils.interactive_select") as select,
+    ):
+        assert t.interactive_select_image() == set()
+    select.assert_not_called()
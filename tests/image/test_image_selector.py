@@ -1,9 +1,12 @@
 import re
 import typing
+from unittest.mock import patch
 
 import pytest
 
 import bollard.image.selector as t
+from bollard.image.index import ImageIndex
+from bollard.image.record import ImageRecord
 
 
 @pytest.mark.parametrize(
@@ -33,7 +36,7 @@ import bollard.image.selector as t
         ("name:2023.2.0*", True),
     ],
 )
-def test_is_image_match_selector(selector: str, result: bool):
+def test_match_selector(selector: str, result: bool):
     data = {
         "Id": "sha256:00000000ffffffffffffffffffffffffffffffffffffffffffffffffffffffff",
         "RepoTags": [
@@ -45,7 +48,73 @@ def test_is_image_match_selector(selector: str, result: bool):
             "example.com/sample@sha256:22222222dddddddddddddddddddddddddddddddddddddddddddddddddddddddd",
         ],
     }
-    assert t.is_image_match_selector(data, selector) is result
+    record = ImageRecord.from_dict(data)
+    assert t.compile_selectors([selector]).match(record) is result
+
+
+def test_compile_selectors():
+    records = [
+        ImageRecord.from_dict({"Id": "sha256:aaaa", "RepoTags": ["foo:2023.1"]}),
+        ImageRecord.from_dict({"Id": "sha256:bbbb", "RepoTags": ["myreg/bar:2023.2"]}),
+        ImageRecord.from_dict({"Id": "sha256:cccc", "RepoTags": ["myreg/foo:latest"]}),
+    ]
+
+    with patch.object(t, "translate_globs", wraps=t.translate_globs) as tr:
+        match_any = t.compile_selectors(["myreg/*", ":2023*", "FOO"])
+        match_all = t.compile_selectors(["myreg/*", ":2023*"], match_all=True)
+    assert tr.call_count == 5
+
+    assert [match_any.match(r) for r in records] == [True, True, True]
+    assert [match_all.match(r) for r in records] == [False, True, False]
+
+    # invalid selector matches nothing
+    assert not t.compile_selectors(["-foo"]).match(records[0])
+    assert not t.compile_selectors(["foo", "-foo"], match_all=True).match(records[0])
+
+
+def test_compiled_selector_candidates():
+    index = ImageIndex()
+    index.add(ImageRecord.from_dict({"Id": "sha256:aaaa", "RepoTags": ["foo:1.0"]}))
+    index.add(ImageRecord.from_dict({"Id": "sha256:bbbb", "RepoTags": ["bar:1.0"]}))
+
+    # OR
+    assert t.compile_selectors(["foo", "ba*"]).candidates(index) == {
+        "sha256:aaaa",
+        "sha256:bbbb",
+    }
+    assert t.compile_selectors(["foo", "*ar"]).candidates(index) is None
+
+    # AND
+    selector = t.compile_selectors([":1.0", "fo*"], match_all=True)
+    assert selector.candidates(index) == {"sha256:aaaa"}
+    selector = t.compile_selectors([":1.0", "*oo"], match_all=True)
+    assert selector.candidates(index) == {"sha256:aaaa", "sha256:bbbb"}
+
+
+@pytest.mark.parametrize(
+    ("selectors", "match_all", "filters"),
+    [
+        (["myreg.example.com/app"], False, ["reference=myreg.example.com/app"]),
+        (["myreg:5000/App:v1.*"], False, ["reference=myreg:5000/app"]),
+        (["myreg/app:*", "myreg/app:1"], False, ["reference=myreg/app"]),
+        (
+            ["myreg/foo", "myreg/bar"],
+            False,
+            ["reference=myreg/foo", "reference=myreg/bar"],
+        ),
+        # not expressible
+        (["nginx"], False, []),
+        ([":latest"], False, []),
+        (["myreg/*"], False, []),
+        (["*/nginx:latest"], False, []),
+        (["myreg/foo", "nginx"], False, []),
+        # AND - any one is enough
+        (["nginx", "myreg/foo", "myreg/bar"], True, ["reference=myreg/foo"]),
+        (["nginx", ":latest"], True, []),
+    ],
+)
+def test_to_reference_filters(selectors: list, match_all: bool, filters: list):
+    assert t.to_reference_filters(selectors, match_all) == filters
 
 
 @pytest.mark.parametrize(
@@ -77,8 +146,8 @@ def test_is_image_match_selector(selector: str, result: bool):
         ("example.com/name:*", ["REPO_TAG"]),
     ],
 )
-def test_translate_selector(selector: str, expected_keys: list[str]):
-    output = {k: v for k, v in t.translate_selector(selector)}
+def test_translate_globs(selector: str, expected_keys: list[str]):
+    output = {glob.field: glob.to_regex() for glob in t.translate_globs(selector)}
     assert set(expected_keys) == set(output)
     assert all(isinstance(v, typing.Pattern) for v in output.values())
 
@@ -90,6 +159,6 @@ def test_translate_selector(selector: str, expected_keys: list[str]):
         ":-tag",
     ],
 )
-def test_translate_selector_fail(selector: str, caplog: pytest.LogCaptureFixture):
-    assert t.translate_selector(selector) == []
+def test_translate_globs_fail(selector: str, caplog: pytest.LogCaptureFixture):
+    assert t.translate_globs(selector) == []
     assert re.search(r"Selector '.+' is not a valid pattern", caplog.text)
@@ -0,0 +1,77 @@
+import click
+import pytest
+
+import bollard.passthrough as t
+
+
+@pytest.mark.parametrize(
+    ("argv", "expect"),
+    [
+        (["ps", "-a"], ["ps", "-a"]),
+        (["containers"], ["container", "ls"]),
+        (["image", "build", "."], ["image", "build", "."]),
+        # handled by bollard
+        ([], None),
+        (["--help"], None),
+        (["-D"], None),
+        (["version"], None),
+        (["images", "-a"], None),
+        (["rmi", "foo"], None),
+        (["image"], None),
+        (["image", "--help"], None),
+        (["image", "ls"], None),
+        (["image", "rmi", "foo"], None),
+    ],
+)
+def test_get_passthrough_args(argv: list, expect: list | None):
+    assert t.get_passthrough_args(argv) == expect
+
+
+def test_get_passthrough_args_options():
+    argv = ["-H", "unix:///tmp/d.sock", "--tls", "logs", "foo"]
+    assert t.get_passthrough_args(argv) == argv
+
+    argv = ["--context=prod", "-D", "exec", "-it", "foo", "sh"]
+    assert t.get_passthrough_args(argv) == argv
+
+
+def test_exec_unwrapped(monkeypatch: pytest.MonkeyPatch):
+    calls = []
+    monkeypatch.setattr("os.execvp", lambda *args: calls.append(args))
+
+    t.exec_unwrapped(["image", "ls"])
+    assert calls == []
+
+    t.exec_unwrapped(["ps", "-a"])
+    assert calls == [("docker", ["docker", "ps", "-a"])]
+
+    # completion
+    monkeypatch.setenv("_BOLLARD_COMPLETE", "bash_source")
+    t.exec_unwrapped(["ps"])
+    assert len(calls) == 1
+
+
+def test_exec_unwrapped_not_found(monkeypatch: pytest.MonkeyPatch):
+    def mock_execvp(*_):
+        raise FileNotFoundError
+
+    monkeypatch.setattr("os.execvp", mock_execvp)
+    t.exec_unwrapped(["ps"])  # no raise
+
+
+def test_wrapped_commands():
+    from bollard.cli import main
+
+    def is_wrapped(cmd: click.Command) -> bool:
+        return cmd.callback.__name__ != "invoke_docker"
+
+    expect = {}
+    for name, cmd in main.commands.items():
+        if isinstance(cmd, click.Group):
+            names = {n for n, c in cmd.commands.items() if is_wrapped(c)}
+            expect[name] = frozenset(names | set(cmd.aliases))
+        elif is_wrapped(cmd):
+            expect[name] = None
+
+    assert t.WRAPPED_COMMANDS == expect
+    assert t.ALIASES == main.aliases
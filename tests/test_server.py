@@ -0,0 +1,126 @@
+import threading
+from unittest.mock import patch
+
+import click
+import pytest
+
+import bollard.server as t
+from bollard.image.cache import ImageCache
+
+
+def test_is_daemon_running(tmp_path):
+    path = tmp_path / "bollard.sock"
+    assert t.is_daemon_running(str(path)) is False
+
+    # stale socket file
+    path.touch()
+    assert t.is_daemon_running(str(path)) is False
+    assert not path.exists()
+
+
+def test_handle_request(monkeypatch: pytest.MonkeyPatch):
+    from bollard.constants import pkg_version
+
+    monkeypatch.setenv("DOCKER_HOST", "unix:///tmp/docker.sock")
+    request = {
+        "args": ["--help"],
+        "color": False,
+        "endpoint": "/tmp/docker.sock",
+        "version": pkg_version,
+    }
+
+    with patch("bollard.image.data.get_disk_cache") as get_disk_cache:
+        rv = t.handle_request(request)
+    get_disk_cache.return_value.save.assert_called_once()
+    assert rv["status"] == "ok"
+    assert rv["exit_code"] == 0
+    assert "Usage: bollard" in rv["stdout"]
+
+    assert t.handle_request({**request, "version": "0.0.0"}) == {
+        "status": "unsupported"
+    }
+    assert t.handle_request({**request, "endpoint": "/other.sock"}) == {
+        "status": "unsupported"
+    }
+
+    # malformed
+    del request["args"]
+    assert t.handle_request(request)["status"] == "error"
+    assert t.handle_request([])["status"] == "error"
+
+
+def test_daemon_server_busy(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    from bollard.core.daemon import send
+
+    monkeypatch.setattr(t, "BUSY_TIMEOUT", 0.01)
+    monkeypatch.setattr(t, "handle_request", lambda _: {"status": "ok"})
+
+    path = str(tmp_path / "bollard.sock")
+    server = t.DaemonServer(path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    try:
+        assert send(path, {}) == {"status": "ok"}
+        with server.lock:
+            assert send(path, {}) == {"status": "busy"}
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_run_command():
+    exit_code, stdout, stderr = t.run_command(["--no-such-option"], False)
+    assert exit_code == 2
+    assert stdout == ""
+    assert "No such option" in stderr
+
+
+def test_capture_outputs(capsys: pytest.CaptureFixture):
+    import io
+
+    def other_thread():
+        print("from other thread")
+        click.echo("warning from other thread", err=True)
+
+    stdout, stderr = io.StringIO(), io.StringIO()
+    with t.capture_outputs(stdout, stderr):
+        click.echo("from command")
+        click.echo("error from command", err=True)
+        thread = threading.Thread(target=other_thread)
+        thread.start()
+        thread.join()
+
+    assert stdout.getvalue() == "from command\n"
+    assert stderr.getvalue() == "error from command\n"
+
+    captured = capsys.readouterr()
+    assert captured.out == "from other thread\n"
+    assert captured.err == "warning from other thread\n"
+
+
+def test_apply_event():
+    cache = ImageCache()
+    t.apply_event(cache, {"Type": "image", "Action": "tag", "timeNano": 10})
+    assert cache.listing is None
+
+    cache.set_listing([{"Id": "sha256:aaaa", "RepoTags": [], "Created": 1}], 5)
+    event = {
+        "Type": "image",
+        "Action": "delete",
+        "Actor": {"ID": "sha256:aaaa"},
+        "timeNano": 10,
+    }
+    with (
+        patch("bollard.image.events.query_refs", return_value=[]),
+        patch("bollard.image.data.discard_images") as discard,
+    ):
+        t.apply_event(cache, event)
+    assert cache.listing == {}
+    discard.assert_called_once_with(["sha256:aaaa"], save=False)
+    assert cache.checkpoint == 10
+
+    # container commit requires full refresh
+    t.apply_event(cache, {"Type": "container", "Action": "commit", "timeNano": 20})
+    assert cache.listing is None
+    assert cache.checkpoint == 0
@@ -0,0 +1,247 @@
+import socket
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+import bollard.utils.api as t
+
+
+@pytest.fixture()
+def conn_pair():
+    client, server = socket.socketpair()
+    conn = t.Connection("/test.sock")
+    conn._sock = client
+    conn._fp = client.makefile("rb")
+    yield conn, server
+    conn.close()
+    server.close()
+
+
+def test_get_socket_path(monkeypatch: pytest.MonkeyPatch, tmp_path):
+    monkeypatch.setenv("DOCKER_CONFIG", str(tmp_path))
+    monkeypatch.delenv("DOCKER_CONTEXT", raising=False)
+    monkeypatch.delenv("DOCKER_HOST", raising=False)
+    assert t.get_socket_path() == "/var/run/docker.sock"
+    monkeypatch.setenv("DOCKER_HOST", "unix:///tmp/docker.sock")
+    assert t.get_socket_path() == "/tmp/docker.sock"
+    monkeypatch.setenv("DOCKER_HOST", "tcp://127.0.0.1:2375")
+    assert t.get_socket_path() is None
+
+
+def test_get_socket_path_context(monkeypatch: pytest.MonkeyPatch, tmp_path):
+    import hashlib
+    import json
+
+    monkeypatch.setenv("DOCKER_CONFIG", str(tmp_path))
+    monkeypatch.delenv("DOCKER_CONTEXT", raising=False)
+    monkeypatch.delenv("DOCKER_HOST", raising=False)
+
+    def add_context(name: str, host: str):
+        digest = hashlib.sha256(name.encode()).hexdigest()
+        meta_dir = tmp_path / "contexts" / "meta" / digest
+        meta_dir.mkdir(parents=True)
+        meta = {"Name": name, "Endpoints": {"docker": {"Host": host}}}
+        (meta_dir / "meta.json").write_text(json.dumps(meta))
+
+    add_context("local", "unix:///run/user/1000/docker.sock")
+    add_context("remote", "ssh://user@example.com")
+
+    # current context in config file
+    (tmp_path / "config.json").write_text('{"currentContext": "local"}')
+    assert t.get_socket_path() == "/run/user/1000/docker.sock"
+
+    # env overrides config file
+    monkeypatch.setenv("DOCKER_CONTEXT", "remote")
+    assert t.get_socket_path() is None
+    monkeypatch.setenv("DOCKER_CONTEXT", "no-this-context")
+    assert t.get_socket_path() is None
+    monkeypatch.setenv("DOCKER_CONTEXT", "default")
+    assert t.get_socket_path() == "/var/run/docker.sock"
+
+    # DOCKER_HOST overrides context
+    monkeypatch.setenv("DOCKER_HOST", "unix:///tmp/docker.sock")
+    assert t.get_socket_path() == "/tmp/docker.sock"
+
+
+def test_build_request():
+    req = t.build_request("GET", "/images/json", {"all": True, "digests": None})
+    head, _, body = req.partition(b"\r\n")
+    assert head == b"GET /images/json?all=1 HTTP/1.1"
+    assert req.endswith(b"\r\n\r\n")
+
+    req = t.build_request("POST", "/test", body={"foo": "bar"})
+    assert b"Content-Length: 14\r\n" in req
+    assert req.endswith(b'\r\n\r\n{"foo": "bar"}')
+
+
+def test_encode_query():
+    assert t.encode_query(
+        {"a": True, "b": False, "c": None, "d": 1, "e": {"f": ["g"]}}
+    ) == {"a": "1", "b": "0", "d": "1", "e": '{"f": ["g"]}'}
+    assert t.encode_query(None) == {}
+
+
+def test_build_filters():
+    assert t.build_filters(["dangling=true", "label=a=b", "label=c"]) == {
+        "dangling": ["true"],
+        "label": ["a=b", "c"],
+    }
+    with pytest.raises(ValueError, match="Bad format of filter"):
+        t.build_filters(["foo"])
+
+
+def test_connection_content_length(conn_pair):
+    conn, server = conn_pair
+    server.sendall(
+        b"HTTP/1.1 200 OK\r\n"
+        b"Content-Type: application/json\r\n"
+        b"Content-Length: 13\r\n"
+        b"\r\n"
+        b'{"foo":"bar"}'
+    )
+    rv = conn.request("GET", "/test")
+    assert rv.status == 200
+    assert rv.reason == "OK"
+    assert rv.headers["content-type"] == "application/json"
+    assert rv.json() == {"foo": "bar"}
+    assert server.recv(1024).startswith(b"GET /test HTTP/1.1\r\n")
+
+
+def test_connection_chunked(conn_pair):
+    conn, server = conn_pair
+    server.sendall(
+        b"HTTP/1.1 200 OK\r\n"
+        b"Transfer-Encoding: chunked\r\n"
+        b"\r\n"
+        b"4\r\nfoo \r\n3\r\nbar\r\n0\r\n\r\n"
+    )
+    rv = conn.read_response()
+    assert rv.body == b"foo bar"
+
+
+def test_connection_closed(conn_pair):
+    conn, server = conn_pair
+    server.close()
+    with pytest.raises(ConnectionError):
+        conn.read_response()
+
+
+def test_connection_stream(conn_pair):
+    conn, server = conn_pair
+    server.sendall(
+        b"HTTP/1.1 200 OK\r\n"
+        b"Transfer-Encoding: chunked\r\n"
+        b"\r\n"
+        b"4\r\nfoo \r\n3\r\nbar\r\n"
+    )
+    stream = conn.stream("GET", "/events")
+    assert next(stream) == b"foo "
+    assert next(stream) == b"bar"
+
+    server.sendall(b"0\r\n\r\n")
+    assert list(stream) == []
+    assert not conn.is_connected
+
+
+def test_connection_stream_error(conn_pair):
+    conn, server = conn_pair
+    server.sendall(
+        b"HTTP/1.1 400 Bad Request\r\n"
+        b"Content-Length: 22\r\n"
+        b"\r\n"
+        b'{"message": "bad arg"}'
+    )
+    with pytest.raises(t.APIError, match="bad arg"):
+        next(conn.stream("GET", "/events"))
+
+
+def test_response_raise_for_status():
+    t.Response(200, "OK", {}, b"").raise_for_status()
+
+    with pytest.raises(t.APIError) as e:
+        t.Response(
+            404, "Not Found", {}, b'{"message": "No such image"}'
+        ).raise_for_status()
+    assert e.value.status == 404
+    assert e.value.message == "No such image"
+
+    with pytest.raises(t.APIError, match="Internal Server Error"):
+        t.Response(500, "Internal Server Error", {}, b"").raise_for_status()
+
+
+def test_request_unavailable(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("DOCKER_HOST", "tcp://127.0.0.1:2375")
+    with pytest.raises(ConnectionError):
+        t.request("GET", "/_ping")
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connection_count += 1
+
+    def address_string(self):
+        return "test"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        body = self.path.encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture()
+def daemon_socket(tmp_path):
+    class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+        connection_count = 0
+
+    path = str(tmp_path / "docker.sock")
+    server = Server(path, _KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_connection_pool(daemon_socket):
+    pool = t.ConnectionPool(daemon_socket.server_address, window=2)
+
+    # keep-alive
+    assert pool.request("GET", "/_ping").body == b"/_ping"
+    assert pool.request("GET", "/foo").body == b"/foo"
+
+    # pipelining
+    rvs = pool.pipeline([t.Request("GET", f"/test/{i}") for i in range(5)])
+    assert [rv.body for rv in rvs] == [f"/test/{i}".encode() for i in range(5)]
+
+    assert daemon_socket.connection_count == 1
+    pool.close()
+
+
+def test_connection_pool_reconnect(daemon_socket):
+    pool = t.ConnectionPool(daemon_socket.server_address)
+    assert pool.request("GET", "/foo").status == 200
+
+    # idle connection is closed by server
+    (conn,) = pool._idle
+    conn._sock.shutdown(socket.SHUT_RDWR)
+
+    assert pool.request("GET", "/bar").body == b"/bar"
+    assert daemon_socket.connection_count == 2
+    pool.close()
+
+
+def test_get_pool(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("DOCKER_HOST", "unix:///tmp/test.sock")
+    assert t.get_pool() is t.get_pool()
+    assert t.get_pool().path == "/tmp/test.sock"
@@ -4,6 +4,7 @@ import re
 import zoneinfo
 
 import freezegun
+import pytest
 
 import bollard.utils.format as t
 
@@ -24,6 +25,7 @@ def test_format_iso_time():
 def test_format_relative_time():
     assert t.format_relative_time("2023-04-05T06:07:05.910Z") == "3 seconds ago"
     assert t.format_relative_time("2023-01-01T00:00:00.000Z") == "3 months ago"
+    assert t.format_relative_time(1680674825) == "3 seconds ago"
 
 
 def test_format_digest():
@@ -34,3 +36,20 @@ def test_format_digest():
 
 def test_format_size():
     assert t.format_size(1234) == "1.2 kB"
+
+
+def test_parse_duration():
+    assert t.parse_duration("30s") == 30
+    assert t.parse_duration("12h") == 43200
+    assert t.parse_duration("2W") == 1209600
+    with pytest.raises(ValueError, match="invalid duration"):
+        t.parse_duration("1y")
+
+
+def test_parse_size():
+    assert t.parse_size("123") == 123
+    assert t.parse_size("1.5kB") == 1500
+    assert t.parse_size("10 GB") == 10_000_000_000
+    assert t.parse_size("2MiB") == 2_097_152
+    with pytest.raises(ValueError, match="invalid size"):
+        t.parse_size("many")
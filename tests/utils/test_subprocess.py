@@ -1,3 +1,4 @@
+import io
 import re
 import subprocess
 from unittest.mock import Mock
@@ -55,20 +56,30 @@ def test_check_docker_output_fail(monkeypatch: pytest.MonkeyPatch):
 def test_interactive_select(monkeypatch: pytest.MonkeyPatch):
     monkeypatch.setattr(t, "get_command_path", lambda _: "/test/fzf")
 
-    def mock_run(args, **kwargs):
-        assert kwargs["input"] == b"aaa\nbbb\nccc"
+    popen_cls = subprocess.Popen
 
-        rv = Mock(spec=subprocess.CompletedProcess)
-        rv.stdout = b"aaa\nbbb"
-        return rv
+    def mock_popen(args, **kwargs):
+        assert args[0] == "/test/fzf"
+        assert args[args.index("--preview") + 1] == "preview {1}"
+        proc = Mock(spec=popen_cls)
+        proc.stdin = io.BytesIO()
+        proc.stdin.close = Mock()
+        proc.stdin.flush = Mock()
+        proc.stdout = io.BytesIO(b"aaa\nbbb\n")
+        popen.append(proc)
+        return proc
 
-    monkeypatch.setattr("subprocess.run", mock_run)
+    popen = []
+    monkeypatch.setattr("subprocess.Popen", mock_popen)
 
     assert t.interactive_select(
-        ["aaa", "bbb", "ccc"],
+        iter(["aaa", "bbb", "ccc"]),
         header="test header",
         prompt="test prompt",
+        preview="preview {1}",
     ) == ["aaa", "bbb"]
+    assert popen[0].stdin.getvalue() == b"aaa\nbbb\nccc\n"
+    assert popen[0].stdin.flush.call_count == 3
 
     assert t.interactive_select([]) == []
 
@@ -17,3 +17,27 @@ def test_tabulate():
 
     # fail
     assert "No data selected" in t.tabulate({}, [])
+
+
+def test_tabulate_layout():
+    columns = {"name": {"title": "N"}, "size": {"title": "SIZE", "align": "right"}}
+    data = [
+        {"name": "foo", "size": "1.0"},
+        {"name": "中文字", "size": "22"},
+    ]
+    assert t.tabulate(columns, data) == (
+        "N         SIZE\n"  # header is padded
+        "foo        1.0\n"
+        "中文字      22"
+    )
+
+
+def test_render_table_lookahead():
+    columns = {"name": None, "id": {"width": 4}}
+    data = ({"name": "x" * i, "id": "abcd"} for i in range(1, 4))
+
+    lines = t.render_table(columns, data, show_header=False, lookahead=2)
+    assert next(lines) == "x   abcd"
+    assert next(lines) == "xx  abcd"
+    # cells out of the window are not truncated
+    assert next(lines) == "xxx  abcd"
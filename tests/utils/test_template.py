@@ -0,0 +1,48 @@
+import pytest
+
+import bollard.utils.template as t
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        ("{{.Name}}:{{.Tag}}", "foo:<none>"),
+        ("{{ .Name }}\\t{{.Size}}", "foo\t1kB"),
+        ("{{json .}}", '{"Name":"foo","Size":"1kB","Tag":"\\u003cnone\\u003e"}'),
+        ("{{json .Name}}", '"foo"'),
+        ("{{upper .Name}} {{.Name | title}}", "FOO Foo"),
+        ("{{truncate .Name 2}}", "fo"),
+        ("a  {{- .Name -}}  b", "afoob"),
+    ],
+)
+def test_compile_template(text: str, expected: str):
+    template = t.compile_template(text)
+    assert not template.is_table
+    assert template.render({"Name": "foo", "Tag": "<none>", "Size": "1kB"}) == expected
+
+
+def test_compile_template_table():
+    template = t.compile_template("table {{.Name}}\\t{{.Tag}}")
+    assert template.is_table
+    assert template.render({"Name": "NAME", "Tag": "TAG"}) == "NAME\tTAG"
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "{{if .Name}}yes{{end}}",
+        "{{printf .Name}}",
+        "{{}}",
+        "{{.Name",
+        '{{.Name | printf "%s"}}',
+    ],
+)
+def test_compile_template_unsupported(text: str):
+    with pytest.raises(t.TemplateError):
+        t.compile_template(text)
+
+
+def test_render_missing_field():
+    template = t.compile_template("{{.Foo}}")
+    with pytest.raises(t.TemplateError):
+        template.render({})